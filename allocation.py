@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+# Kolom nilai per order di income -> kolom hasil alokasi per baris pesanan
+LINE_VALUE_COLUMNS = {
+    'Total settlement amount': 'Line settlement amount',
+    'Total revenue': 'Line revenue',
+    'Total fees': 'Line fees',
+    'TikTok Shop commission fee': 'Line TikTok Shop commission fee',
+    'Affiliate commission': 'Line Affiliate commission',
+    'Dynamic Commission': 'Line Dynamic Commission',
+}
+
+LINE_SHARE_COLUMN = 'Line share'
+
+
+def allocate_order_lines(merged, group_col, weight_col='SKU Subtotal After Discount'):
+    """Bagi nilai settlement & fee tiap baris income ke baris-baris pesanannya
+
+    Bobot tiap baris = weight_col / total weight_col dalam grup yang sama. Jika
+    total bobot 0 atau kolom bobot tidak ada, nilai dibagi rata per baris.
+    Semua langkah memakai groupby-transform sehingga tidak ada loop per order.
+    """
+    groups = merged[group_col]
+    if weight_col in merged.columns:
+        weights = pd.to_numeric(merged[weight_col], errors='coerce').fillna(0.0).clip(lower=0.0)
+    else:
+        weights = pd.Series(0.0, index=merged.index)
+
+    total_weight = weights.groupby(groups).transform('sum').to_numpy(dtype='float64')
+    line_count = groups.groupby(groups).transform('size').to_numpy(dtype='float64')
+    weights = weights.to_numpy(dtype='float64')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(total_weight > 0, weights / total_weight, 1.0 / line_count)
+
+    merged[LINE_SHARE_COLUMN] = share
+    for source, target in LINE_VALUE_COLUMNS.items():
+        if source in merged.columns:
+            merged[target] = pd.to_numeric(merged[source], errors='coerce').to_numpy(dtype='float64') * share
+    return merged
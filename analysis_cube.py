@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from costing import lookup_costs, LINE_COST_COLUMN
+
+# Kolom tanggal yang dikenali (urutan = prioritas)
+POSSIBLE_DATE_COLUMNS = [
+    'Order created time(UTC)', 'Order creation time', 'Order Creation Time',
+    'Creation Time', 'Date', 'Order Date', 'Order created time', 'Created time'
+]
+
+CUBE_DIMENSIONS = ['Order Date', 'Product Name', 'Variation', 'Seller SKU', 'Channel']
+CUBE_MEASURES = ['Quantity', 'Lines', 'Orders', 'Revenue', 'Fees', 'Cost', 'Profit']
+
+
+def find_date_column(df):
+    """Kolom tanggal pertama yang tersedia di DataFrame (None jika tidak ada)"""
+    return next((col for col in POSSIBLE_DATE_COLUMNS if col in df.columns), None)
+
+
+def _numeric(df, col, default=0.0):
+    if col not in df.columns:
+        return np.full(len(df), default)
+    return pd.to_numeric(df[col], errors='coerce').fillna(default).to_numpy(dtype='float64')
+
+
+def build_cube(merged, cost_table):
+    """Agregasi merged_data sekali ke tanggal × produk × variasi × SKU × channel
+
+    Measure: Quantity, Lines (jumlah baris pesanan), Orders (jumlah order hasil
+    alokasi, tepat saat dijumlahkan di slice mana pun), Revenue, Fees, Cost, Profit.
+    Baris income tanpa pasangan pesanan tetap masuk dengan produk kosong supaya
+    total revenue cube sama dengan total income.
+    """
+    frame = pd.DataFrame(index=merged.index)
+
+    date_col = find_date_column(merged)
+    if date_col:
+        frame['Order Date'] = pd.to_datetime(merged[date_col], errors='coerce').dt.normalize()
+    else:
+        frame['Order Date'] = pd.NaT
+
+    for col in ['Product Name', 'Variation', 'Seller SKU']:
+        frame[col] = merged[col].astype('string') if col in merged.columns else pd.NA
+
+    affiliate = _numeric(merged, 'Affiliate commission')
+    frame['Channel'] = np.where(affiliate < 0, 'Affiliate', 'Toko')
+
+    quantity = _numeric(merged, 'Quantity')
+    revenue = _numeric(merged, 'Line settlement amount')
+    if LINE_COST_COLUMN in merged.columns:
+        # Biaya per baris dari process_data (sudah memperhitungkan riwayat biaya)
+        cost = _numeric(merged, LINE_COST_COLUMN)
+    else:
+        cost = quantity * np.nan_to_num(lookup_costs(frame['Product Name'], cost_table), nan=0.0)
+
+    frame['Quantity'] = quantity
+    frame['Lines'] = merged['Product Name'].notna().to_numpy(dtype='int64') if 'Product Name' in merged.columns else 0
+    frame['Orders'] = _numeric(merged, 'Line share', default=1.0)
+    frame['Revenue'] = revenue
+    frame['Fees'] = _numeric(merged, 'Line fees')
+    frame['Cost'] = cost
+    frame['Profit'] = revenue - cost
+
+    return frame.groupby(CUBE_DIMENSIONS, as_index=False, dropna=False, observed=True)[CUBE_MEASURES].sum()
+
+
+def slice_cube(cube, by, measures=None, dropna=True):
+    """Jumlahkan measure cube per dimensi `by` (baris dengan dimensi kosong dibuang jika dropna)"""
+    by = [by] if isinstance(by, str) else list(by)
+    measures = measures or CUBE_MEASURES
+    if cube is None or cube.empty:
+        return pd.DataFrame(columns=by + list(measures))
+    return cube.groupby(by, as_index=False, dropna=dropna, observed=True)[list(measures)].sum()
+
+
+def cube_totals(cube):
+    """Total semua measure cube sebagai dict"""
+    if cube is None or cube.empty:
+        return {measure: 0.0 for measure in CUBE_MEASURES}
+    return cube[CUBE_MEASURES].sum().to_dict()
@@ -0,0 +1,205 @@
+"""Benchmark skala: waktu ingestion, merge, agregasi, dan penulisan laporan per ukuran data
+
+Contoh:
+    python benchmark.py --sizes 1000 10000 100000
+    python benchmark.py --sizes 1000000 --max-excel-rows 200000
+    python benchmark.py --sizes 100000 1000000 --report-memory
+
+Hasil tiap run ditambahkan ke file history JSON dan dibandingkan dengan run
+sebelumnya untuk ukuran yang sama.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+import pandas as pd
+import config
+from analysis_cube import slice_cube
+from data_processor import IncomeApp
+from dtype_optimizer import optimize_dtypes
+from ingestion import load_pesanan, load_income, clear_memory_cache
+from synthetic_data import generate_exports, make_catalog, catalog_costs, write_exports
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_HISTORY = "benchmark_history.json"
+# Selisih waktu (rasio) yang dianggap regresi saat dibandingkan dengan run sebelumnya
+REGRESSION_RATIO = 1.25
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _timed(timings, name, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    timings[name] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def _peak_mb(func, *args, **kwargs):
+    """Puncak alokasi memori Python (MB) selama func berjalan"""
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024 / 1024, 1)
+
+
+def _tab_aggregations(cube):
+    """Agregasi yang dihitung tab dashboard/analisis dari cube"""
+    slice_cube(cube, 'Product Name')
+    slice_cube(cube, ['Order Date', 'Product Name'])
+    slice_cube(cube, 'Seller SKU')
+    slice_cube(cube, 'Channel')
+
+
+def _as_parsed(frame, kind):
+    """Tiru hasil parse Excel tanpa file: header di-strip, kolom dipangkas, teks angka jadi angka"""
+    frame = frame.copy()
+    frame.columns = [str(c).strip() for c in frame.columns]
+    frame = frame[[c for c in frame.columns if c in config.ANALYSIS_COLUMNS[kind]]]
+    for col in frame.columns:
+        try:
+            frame[col] = pd.to_numeric(frame[col])
+        except (ValueError, TypeError):
+            pass
+    return frame
+
+
+def run_size(n_lines, workdir, max_excel_rows, seed=0, report_memory=False):
+    """Jalankan semua tahap untuk satu ukuran data, kembalikan dict hasil"""
+    catalog = make_catalog(seed=seed)
+    cost_data = catalog_costs(catalog)
+    pesanan_raw, income_raw = generate_exports(n_lines, catalog=catalog, seed=seed)
+    timings = {}
+
+    if n_lines <= max_excel_rows:
+        pesanan_path = os.path.join(workdir, f"pesanan_{n_lines}.xlsx")
+        income_path = os.path.join(workdir, f"income_{n_lines}.xlsx")
+        write_exports(pesanan_raw, income_raw, pesanan_path, income_path)
+        # Cold load: cache Parquet diarahkan ke folder sementara yang masih kosong
+        clear_memory_cache()
+        pesanan = _timed(timings, 'ingest_pesanan', load_pesanan, pesanan_path)
+        income = _timed(timings, 'ingest_income', load_income, income_path)
+        clear_memory_cache()
+        _timed(timings, 'ingest_cached', lambda: (load_pesanan(pesanan_path), load_income(income_path)))
+    else:
+        # File Excel sebesar ini terlalu lama dibuat; ukur normalisasi tipe saja
+        pesanan = _timed(timings, 'ingest_pesanan', optimize_dtypes, _as_parsed(pesanan_raw, 'pesanan'))
+        income = _timed(timings, 'ingest_income', optimize_dtypes, _as_parsed(income_raw, 'income'))
+
+    app = IncomeApp(cost_data=cost_data)
+    merged, summary = _timed(timings, 'merge', app.process_data, pesanan, income, cost_data)
+    trace = app.last_artifacts['trace']
+    cube = app.last_artifacts['cube']
+    metrics = app.last_artifacts['metrics']
+    _timed(timings, 'aggregate', _tab_aggregations, cube)
+    _timed(timings, 'report', app.create_excel_report, merged, summary, cost_data, metrics=metrics)
+
+    report_peak_mb = None
+    if report_memory:
+        # Puncak memori penulisan laporan ke file: mode biasa (in-memory) vs streaming
+        report_path = os.path.join(workdir, f"report_{n_lines}.xlsx")
+        report_peak_mb = {}
+        for mode, streaming in (('default', False), ('streaming', True)):
+            start = time.perf_counter()
+            report_peak_mb[mode] = _peak_mb(
+                app.create_excel_report, merged, summary, cost_data,
+                metrics=metrics, output=report_path, streaming=streaming
+            )
+            timings[f'report_file_{mode}'] = round(time.perf_counter() - start, 4)
+
+    return {
+        'rows': n_lines,
+        'pesanan_rows': len(pesanan),
+        'income_rows': len(income),
+        'merged_rows': len(merged),
+        'excel_ingest': n_lines <= max_excel_rows,
+        'timings': timings,
+        'process_stages': {record['stage']: record['seconds'] for record in trace.stages},
+        'report_peak_mb': report_peak_mb,
+    }
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def compare(result, history):
+    """Bandingkan dengan hasil terakhir di history untuk ukuran yang sama"""
+    for run in reversed(history):
+        previous = next((r for r in run['results'] if r['rows'] == result['rows']), None)
+        if previous is None:
+            continue
+        lines = []
+        for stage, elapsed in result['timings'].items():
+            before = previous['timings'].get(stage)
+            if not before:
+                continue
+            ratio = elapsed / before
+            flag = " ⚠️ regresi" if ratio >= REGRESSION_RATIO else ""
+            lines.append(f"    {stage:<16} {before:>8.3f}s → {elapsed:>8.3f}s ({ratio:.2f}x){flag}")
+        return f"  vs {run.get('commit') or run['timestamp']}:\n" + "\n".join(lines)
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark skala pipeline analisis")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Jumlah baris pesanan")
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help="File history JSON")
+    parser.add_argument('--max-excel-rows', type=int, default=200000,
+                        help="Di atas ukuran ini ingestion diukur tanpa file Excel")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--report-memory', action='store_true',
+                        help="Ukur puncak memori laporan Excel (mode biasa vs streaming)")
+    args = parser.parse_args(argv)
+
+    history = load_history(args.history)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        config.INGEST_CACHE_CONFIG["dir"] = os.path.join(workdir, "ingest_cache")
+        for size in args.sizes:
+            result = run_size(size, workdir, args.max_excel_rows, seed=args.seed,
+                              report_memory=args.report_memory)
+            results.append(result)
+            total = sum(result['timings'].values())
+            print(f"📏 {size:,} baris: " + ", ".join(f"{k} {v:.3f}s" for k, v in result['timings'].items())
+                  + f" (total {total:.2f}s)")
+            if result['report_peak_mb']:
+                print("  🧠 puncak memori laporan: "
+                      + ", ".join(f"{mode} {mb:,.1f} MB" for mode, mb in result['report_peak_mb'].items()))
+            comparison = compare(result, history)
+            if comparison:
+                print(comparison)
+
+    history.append({
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'results': results,
+    })
+    with open(args.history, 'w') as f:
+        json.dump(history, f, indent=2)
+    print(f"💾 History disimpan ke {args.history}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
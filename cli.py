@@ -0,0 +1,156 @@
+"""Mode batch tanpa Streamlit: proses export pesanan + income dan tulis laporan Excel
+
+Contoh:
+    python cli.py process --pesanan "Selesai pesanan-2025-07-23.xlsx" --income income_20250723.xlsx \\
+        --costs product_costs.csv --out report.xlsx
+    python cli.py process --input-dir exports/ --costs product_costs.csv --out-dir reports/
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from config import FILE_PATTERNS
+from costing import load_cost_file, load_cost_history, load_variant_cost_file
+from data_processor import IncomeApp
+from ingestion import load_pesanan, load_income
+
+
+class StageTimer:
+    """Catat durasi tiap tahap (load, proses, laporan) dalam detik"""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def describe(self):
+        return ", ".join(f"{name} {elapsed:.2f}s" for name, elapsed in self.timings.items())
+
+
+def find_export_pairs(input_dir):
+    """Pasangkan file pesanan & income di folder berdasarkan tanggal di nama file"""
+    patterns = {kind: re.compile(pattern, re.IGNORECASE) for kind, pattern in FILE_PATTERNS.items()}
+    found = {'income': {}, 'pesanan': {}}
+    for fname in sorted(os.listdir(input_dir)):
+        if not fname.lower().endswith(('.xlsx', '.xls')):
+            continue
+        for kind, pattern in patterns.items():
+            match = pattern.search(fname.lower())
+            if match:
+                # Tanggal dinormalisasi ke YYYYMMDD supaya income_20250723xxxx cocok dengan pesanan-2025-07-23
+                tanggal = match.group(1).replace('-', '')[:8]
+                found[kind][tanggal] = os.path.join(input_dir, fname)
+                break
+
+    pairs = []
+    for tanggal in sorted(set(found['income']) | set(found['pesanan'])):
+        pesanan = found['pesanan'].get(tanggal)
+        income = found['income'].get(tanggal)
+        if pesanan and income:
+            pairs.append((tanggal, pesanan, income))
+        else:
+            print(f"⚠️ Dilewati {tanggal}: pasangan file pesanan/income tidak lengkap", file=sys.stderr)
+    return pairs
+
+
+def run_job(app, pesanan_path, income_path, cost_data, out_path, cost_history=None, variant_costs=None):
+    """Jalankan satu job load → proses → laporan, kembalikan timing per tahap"""
+    timer = StageTimer()
+    with timer.stage('load_pesanan'):
+        pesanan = load_pesanan(pesanan_path)
+    with timer.stage('load_income'):
+        income = load_income(income_path)
+    with timer.stage('process'):
+        merged, summary = app.process_data(pesanan, income, cost_data, cost_history, variant_costs)
+    if merged is None:
+        raise ValueError("; ".join(app.last_artifacts['trace'].warnings) or "Tidak ditemukan data yang cocok")
+    with timer.stage('report'):
+        # Laporan ditulis langsung ke file tujuan (streaming untuk data besar)
+        app.create_excel_report(
+            merged, summary, cost_data,
+            metrics=app.last_artifacts.get('metrics'),
+            output=out_path
+        )
+    return timer
+
+
+def cmd_process(args):
+    cost_data = load_cost_file(args.costs) if args.costs else {}
+    cost_history = load_cost_history(args.cost_history) if args.cost_history else None
+    variant_costs = load_variant_cost_file(args.variant_costs) if args.variant_costs else None
+    app = IncomeApp(cost_data=cost_data, cost_history=cost_history, variant_costs=variant_costs)
+
+    if args.input_dir:
+        out_dir = args.out_dir or args.input_dir
+        os.makedirs(out_dir, exist_ok=True)
+        jobs = [
+            (pesanan, income, os.path.join(out_dir, f"income_report_{tanggal}.xlsx"))
+            for tanggal, pesanan, income in find_export_pairs(args.input_dir)
+        ]
+        if not jobs:
+            print("❌ Tidak ada pasangan file pesanan & income di folder", file=sys.stderr)
+            return 1
+    else:
+        if not (args.pesanan and args.income):
+            print("❌ Gunakan --pesanan dan --income, atau --input-dir", file=sys.stderr)
+            return 2
+        jobs = [(args.pesanan, args.income, args.out or "income_report.xlsx")]
+
+    results = []
+    failed = 0
+    for pesanan, income, out_path in jobs:
+        try:
+            timer = run_job(app, pesanan, income, cost_data, out_path, cost_history, variant_costs)
+        except Exception as e:
+            failed += 1
+            print(f"❌ {os.path.basename(pesanan)}: {e}", file=sys.stderr)
+            continue
+        results.append({
+            'pesanan': pesanan, 'income': income, 'out': out_path, 'timings': timer.timings,
+            'process_trace': app.last_artifacts['trace'].to_dict(),
+            'cost_tiers': app.last_artifacts.get('cost_tiers')
+        })
+        print(f"✅ {out_path} ({timer.describe()})")
+
+    if args.timings_json:
+        with open(args.timings_json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Analisis pendapatan & pesanan TikTok Shop tanpa Streamlit")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    process = sub.add_parser('process', help="Proses export dan buat laporan Excel")
+    process.add_argument('--pesanan', help="File Excel pesanan")
+    process.add_argument('--income', help="File Excel income")
+    process.add_argument('--input-dir', help="Folder berisi pasangan export pesanan & income")
+    process.add_argument('--costs', help="File biaya produk (.csv product_name,cost_per_unit atau .json)")
+    process.add_argument('--cost-history',
+                         help="Riwayat biaya bertanggal (.csv/.xlsx product_name,cost_per_unit,valid_from)")
+    process.add_argument('--variant-costs',
+                         help="Biaya per SKU/variasi (.csv/.xlsx seller_sku,variation,cost_per_unit)")
+    process.add_argument('--out', help="File laporan (mode satu pasangan)")
+    process.add_argument('--out-dir', help="Folder laporan (mode --input-dir, default = input-dir)")
+    process.add_argument('--timings-json', help="Simpan timing per tahap ke file JSON")
+    process.set_defaults(func=cmd_process)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
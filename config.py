@@ -1,6 +1,4 @@
-import streamlit as st
-import gspread
-from google.oauth2.service_account import Credentials
+import sys
 
 # Konfigurasi halaman Streamlit
 PAGE_CONFIG = {
@@ -99,15 +97,114 @@ REQUIRED_COLUMNS = {
     "income": ['Order/adjustment ID', 'Total settlement amount']
 }
 
+# Kolom yang dibaca saat ingest (wajib + opsional yang dipakai analisis/laporan)
+ANALYSIS_COLUMNS = {
+    "pesanan": REQUIRED_COLUMNS["pesanan"] + [
+        'Order Substatus', 'SKU ID', 'SKU Unit Original Price', 'SKU Subtotal Before Discount',
+        'SKU Subtotal After Discount', 'Created Time', 'Province', 'Product Category', 'Purchase Channel'
+    ],
+    "income": REQUIRED_COLUMNS["income"] + [
+        'Type', 'Order created time(UTC)', 'Order settled time(UTC)', 'Total revenue', 'Total fees',
+        'TikTok Shop commission fee', 'Affiliate commission', 'Dynamic Commission',
+        'Customer payment', 'Customer refund', 'Related order ID', 'Order Source'
+    ]
+}
+
+# Konfigurasi normalisasi tipe data setelah ingest
+DTYPE_CONFIG = {
+    "enabled": True,
+    "id_columns": ['Order ID', 'Order/adjustment ID', 'SKU ID', 'Related order ID', 'Package ID'],
+    "date_formats": {
+        'Created Time': '%d/%m/%Y %H:%M:%S',
+        'Order created time(UTC)': '%Y/%m/%d',
+        'Order settled time(UTC)': '%Y/%m/%d'
+    },
+    # Kolom teks dijadikan category jika rasio nilai unik <= batas ini
+    "category_max_ratio": 0.5
+}
+
 # Konfigurasi cache
+# stale_while_revalidate: cache kedaluwarsa tetap dipakai, refresh berjalan di latar
 CACHE_CONFIG = {
     "file_name": "cost_data_cache.json",
-    "expiry_hours": 1
+    "expiry_hours": 1,
+    "stale_while_revalidate": True
 }
 
+# Penyimpanan biaya produk: "google_sheets", "sqlite", "csv", atau "memory" (stand-in lokal tanpa jaringan)
+# sync_window_seconds: edit dalam jendela ini digabung jadi satu kiriman ke sheet
+# csv_path juga dipakai sebagai data awal saat database SQLite masih kosong
+COST_STORE_CONFIG = {
+    "backend": "google_sheets",
+    "retry_seconds": 60,
+    "sync_window_seconds": 2.0,
+    "sqlite_path": "product_costs.db",
+    "csv_path": "product_costs.csv",
+    # Riwayat biaya bertanggal (product_name,cost_per_unit,valid_from); opsional
+    "history_path": "product_cost_history.csv",
+    # Biaya per SKU/variasi (seller_sku,variation,cost_per_unit); opsional, didahulukan dari nama produk
+    "variant_path": "product_variant_costs.csv"
+}
+
+# Konfigurasi cache file upload (hasil parse Excel disimpan sebagai Parquet)
+INGEST_CACHE_CONFIG = {
+    "dir": ".ingest_cache",
+    "max_mb": 512
+}
+
+# Konfigurasi laporan Excel: mode streaming (constant_memory) dipakai otomatis jika
+# data pesanan/income >= streaming_min_rows; hasil di-spool ke disk di atas spool_max_bytes.
+# Laporan dari UI dibuat di latar oleh `workers` thread; `max_results` hasil terakhir disimpan.
+# charts: tambahkan lembar grafik native Excel (pendapatan harian, produk teratas, fee, affiliate vs toko).
+REPORT_CONFIG = {
+    "charts": True,
+    "streaming_min_rows": 100000,
+    "spool_max_bytes": 32 * 1024 * 1024,
+    "tmpdir": None,
+    "workers": 1,
+    "max_results": 8,
+    "poll_seconds": 1.0
+}
+
+# Cache laporan Excel jadi (.xlsx per kunci data + versi template), LRU berdasarkan ukuran total
+REPORT_CACHE_CONFIG = {
+    "enabled": True,
+    "dir": ".report_cache",
+    "max_mb": 256
+}
+
+# Konfigurasi parser Excel (engine dicoba berurutan, yang tidak tersedia dilewati)
+# reader: "pandas", "stream" (openpyxl read-only per potongan baris), atau "auto"
+# (streaming untuk file >= stream_threshold_mb)
+INGEST_CONFIG = {
+    "engines": ["calamine", "openpyxl", "xlrd"],
+    "prune_columns": True,
+    "reader": "auto",
+    "stream_threshold_mb": 50,
+    "stream_chunk_rows": 20000
+}
+
+# Pola nama file export TikTok Shop (grup 1 = tanggal)
+FILE_PATTERNS = {
+    "income": r'income[_-](\d{8,})',
+    "pesanan": r'selesai[ _-]pesanan[-_]?([\d-]+)'
+}
+
+def show_error(message):
+    """Tampilkan error di UI Streamlit jika aplikasi berjalan di Streamlit, selain itu ke stderr"""
+    if "streamlit" in sys.modules:
+        import streamlit as st
+        st.error(message)
+    else:
+        print(message, file=sys.stderr)
+
 def get_google_credentials():
     """Mendapatkan kredensial Google Sheets"""
     try:
+        # Import di sini supaya modul ini bisa dipakai tanpa Streamlit (mis. dari CLI)
+        import streamlit as st
+        import gspread
+        from google.oauth2.service_account import Credentials
         service_account_info = st.secrets["google_credentials"]
         creds = Credentials.from_service_account_info(
             service_account_info, 
@@ -116,5 +213,5 @@ def get_google_credentials():
         gc = gspread.authorize(creds)
         return gc
     except Exception as e:
-        st.error(f"Gagal menginisialisasi Google Sheets: {str(e)}")
+        show_error(f"Gagal menginisialisasi Google Sheets: {str(e)}")
         return None 
\ No newline at end of file
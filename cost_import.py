@@ -0,0 +1,102 @@
+import json
+import numpy as np
+import pandas as pd
+
+# Nama kolom yang diterima di file import -> kolom kanonik
+IMPORT_COLUMN_ALIASES = {
+    'product_name': 'Product Name',
+    'product name': 'Product Name',
+    'nama produk': 'Product Name',
+    'cost_per_unit': 'Cost per Unit',
+    'cost per unit': 'Cost per Unit',
+    'biaya': 'Cost per Unit',
+}
+
+IMPORT_STATUSES = ['baru', 'berubah', 'sama', 'ditolak']
+
+
+def read_cost_import(file, file_name=None):
+    """Baca daftar biaya dari CSV/XLSX (layout product_costs.csv) atau JSON {nama: biaya}"""
+    name = str(file_name or getattr(file, 'name', file)).lower()
+    if name.endswith('.json'):
+        if hasattr(file, 'read'):
+            data = json.load(file)
+        else:
+            with open(file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("Format JSON tidak valid. Harus berupa key-value {nama produk: biaya}")
+        return pd.DataFrame({'Product Name': list(data.keys()), 'Cost per Unit': list(data.values())})
+    if name.endswith(('.xlsx', '.xls')):
+        frame = pd.read_excel(file, dtype=object)
+    else:
+        frame = pd.read_csv(file, dtype=object)
+
+    frame = frame.rename(columns=lambda c: IMPORT_COLUMN_ALIASES.get(str(c).strip().lower(), str(c).strip()))
+    missing = [col for col in ('Product Name', 'Cost per Unit') if col not in frame.columns]
+    if missing:
+        raise ValueError(f"Kolom tidak ditemukan: {', '.join(missing)} (gunakan product_name,cost_per_unit)")
+    return frame[['Product Name', 'Cost per Unit']]
+
+
+def validate_cost_import(frame, current_costs, known_products=None):
+    """Validasi massal daftar biaya dan bandingkan dengan biaya saat ini
+
+    Setiap baris diberi Status: baru / berubah / sama / ditolak, dan Issue jika
+    ada masalah (nama kosong, biaya bukan angka, biaya negatif, duplikat). Nama
+    yang tidak ada di pesanan saat ini hanya ditandai lewat kolom In Pesanan.
+    """
+    names = frame['Product Name'].astype(object)
+    names = names.where(names.notna(), '').astype(str).str.strip()
+    costs = pd.to_numeric(frame['Cost per Unit'], errors='coerce')
+
+    empty_name = (names == '').to_numpy()
+    not_numeric = costs.isna().to_numpy()
+    negative = (costs < 0).to_numpy()
+    # Nama yang muncul lebih dari sekali: baris terakhir yang dipakai
+    duplicate = names.duplicated(keep='last').to_numpy() & ~empty_name
+
+    issue = np.select(
+        [empty_name, not_numeric, negative, duplicate],
+        ['nama produk kosong', 'biaya bukan angka', 'biaya negatif', 'duplikat (dipakai baris terakhir)'],
+        default=''
+    )
+    rejected = issue != ''
+
+    current = pd.Series(current_costs or {}, dtype='float64')
+    current_cost = current.reindex(pd.Index(names)).to_numpy()
+    is_new = np.isnan(current_cost)
+    unchanged = ~is_new & np.isclose(costs.to_numpy(dtype='float64'), current_cost)
+
+    report = pd.DataFrame({
+        'Row': np.arange(2, len(frame) + 2),
+        'Product Name': names.to_numpy(),
+        'Cost per Unit': costs.to_numpy(dtype='float64'),
+        'Current Cost': current_cost,
+        'Status': pd.Categorical(
+            np.select([rejected, is_new, unchanged], ['ditolak', 'baru', 'sama'], default='berubah'),
+            categories=IMPORT_STATUSES
+        ),
+        'Issue': issue,
+    })
+    if known_products is not None:
+        report['In Pesanan'] = names.isin(pd.Index(known_products).astype(str)).to_numpy()
+    return report
+
+
+def accepted_costs(report, only_known=False):
+    """Dictionary {nama: biaya} yang akan ditulis: baris baru dan berubah saja"""
+    selected = report['Status'].isin(['baru', 'berubah'])
+    if only_known and 'In Pesanan' in report.columns:
+        selected &= report['In Pesanan']
+    rows = report[selected]
+    return dict(zip(rows['Product Name'], rows['Cost per Unit'].astype(float)))
+
+
+def summarize_import(report):
+    """Jumlah baris per status (untuk ringkasan pratinjau)"""
+    counts = report['Status'].value_counts().reindex(IMPORT_STATUSES, fill_value=0)
+    summary = {status: int(count) for status, count in counts.items()}
+    if 'In Pesanan' in report.columns:
+        summary['tidak ada di pesanan'] = int((~report['In Pesanan'] & (report['Status'] != 'ditolak')).sum())
+    return summary
@@ -0,0 +1,625 @@
+import atexit
+from abc import ABC, abstractmethod
+import csv
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+from config import GOOGLE_SHEETS_CONFIG, CACHE_CONFIG, COST_STORE_CONFIG, get_google_credentials, show_error
+from cost_sync import SheetSync
+from costing import load_cost_file, load_cost_history, load_variant_cost_file
+
+COST_HEADER = ["product_name", "cost_per_unit"]
+
+
+@contextmanager
+def file_lock(path):
+    """Kunci eksklusif antar proses/thread lewat file `<path>.lock`"""
+    fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        yield
+    finally:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+
+def atomic_write(path, write):
+    """Tulis lewat file sementara di folder yang sama lalu os.replace, di bawah file_lock
+
+    Pembaca selalu melihat file lama atau file baru yang utuh, tidak pernah setengah jadi.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with file_lock(path):
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp membuat file 0600; pertahankan izin file lama
+            if os.path.exists(path):
+                os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return os.stat(path).st_mtime_ns
+
+
+def _parse_cell(cell):
+    """'A2' -> (baris, kolom) berbasis 1"""
+    match = re.fullmatch(r'([A-Z]+)(\d+)', cell)
+    letters, row = match.groups()
+    col = 0
+    for letter in letters:
+        col = col * 26 + ord(letter) - ord('A') + 1
+    return int(row), col
+
+
+class InMemoryWorksheet:
+    """Pengganti worksheet gspread di memori (subset API yang dipakai aplikasi)
+
+    Dipakai untuk mode offline dan untuk menguji sinkronisasi tanpa jaringan.
+    Setiap pemanggilan API dicatat di `calls` supaya jumlah request bisa dihitung.
+    """
+
+    def __init__(self, rows=None):
+        self.rows = [list(row) for row in (rows or [])]
+        self.calls = []
+
+    def get_all_values(self):
+        self.calls.append('get_all_values')
+        return [list(row) for row in self.rows]
+
+    def get_all_records(self):
+        self.calls.append('get_all_records')
+        if not self.rows:
+            return []
+        header = self.rows[0]
+        return [dict(zip(header, row)) for row in self.rows[1:]]
+
+    def row_values(self, index):
+        self.calls.append('row_values')
+        return list(self.rows[index - 1]) if index <= len(self.rows) else []
+
+    def clear(self):
+        self.calls.append('clear')
+        self.rows = []
+
+    def _write(self, values, range_name):
+        row, col = _parse_cell(range_name.split(':')[0])
+        for offset, value_row in enumerate(values):
+            index = row - 1 + offset
+            while len(self.rows) <= index:
+                self.rows.append([])
+            target = self.rows[index]
+            while len(target) < col - 1 + len(value_row):
+                target.append('')
+            target[col - 1:col - 1 + len(value_row)] = list(value_row)
+
+    def update(self, values=None, range_name='A1'):
+        self.calls.append('update')
+        self._write(values, range_name)
+
+    def batch_update(self, data):
+        self.calls.append('batch_update')
+        for item in data:
+            self._write(item['values'], item['range'])
+
+    def append_rows(self, values):
+        self.calls.append('append_rows')
+        self.rows.extend(list(row) for row in values)
+
+    def delete_rows(self, start_index, end_index=None):
+        self.calls.append('delete_rows')
+        end_index = start_index if end_index is None else end_index
+        del self.rows[start_index - 1:end_index]
+
+
+def connect_google_worksheet():
+    """Buka worksheet biaya di Google Sheets (None jika kredensial tidak tersedia)"""
+    client = get_google_credentials()
+    if client is None:
+        return None
+    return client.open_by_key(GOOGLE_SHEETS_CONFIG["SHEET_ID"]).worksheet(GOOGLE_SHEETS_CONFIG["SHEET_NAME"])
+
+
+class CostStore(ABC):
+    """Antarmuka penyimpanan biaya produk (nama produk -> biaya per unit)
+
+    Implementasi: GoogleSheetsCostStore (juga stand-in "memory"), SQLiteCostStore,
+    dan CSVCostStore. Dipilih lewat COST_STORE_CONFIG["backend"].
+    """
+
+    backend = None
+
+    def __init__(self):
+        self.last_health = None
+        # Hasil refresh terakhir dari sumber: {'at', 'latency_ms', 'error'}
+        self.last_refresh = None
+        self.history_path = COST_STORE_CONFIG.get("history_path")
+        self.variant_path = COST_STORE_CONFIG.get("variant_path")
+        # path -> (mtime_ns, hasil loader) untuk file biaya pelengkap
+        self._side_files = {}
+
+    @abstractmethod
+    def load(self):
+        """Semua biaya sebagai dictionary baru (aman diubah oleh pemanggil)"""
+
+    @abstractmethod
+    def save(self, cost_dict):
+        """Samakan isi store dengan cost_dict, kembalikan jumlah produk yang berubah"""
+
+    @abstractmethod
+    def ping(self):
+        """Cek singkat bahwa sumber bisa diakses (raise jika tidak)"""
+
+    def upsert(self, product_name, cost, seller_sku=None):
+        cost_data = self.load()
+        cost_data[product_name] = float(cost)
+        return self.save(cost_data)
+
+    def bulk_upsert(self, items):
+        """items: iterable (nama, biaya) atau (nama, biaya, seller_sku)"""
+        cost_data = self.load()
+        for item in items:
+            cost_data[item[0]] = float(item[1])
+        return self.save(cost_data)
+
+    def delete(self, product_names):
+        cost_data = self.load()
+        for name in product_names:
+            cost_data.pop(name, None)
+        return self.save(cost_data)
+
+    def _load_side_file(self, path, loader, label):
+        """Baca file biaya pelengkap (None jika tidak ada); dibaca ulang hanya jika mtime berubah"""
+        if not path:
+            return None
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self._side_files.pop(path, None)
+            return None
+        cached = self._side_files.get(path)
+        if cached is None or cached[0] != mtime:
+            try:
+                cached = (mtime, loader(path))
+            except Exception as e:
+                show_error(f"Gagal membaca {label}: {str(e)}")
+                return None
+            self._side_files[path] = cached
+        return cached[1]
+
+    def load_history(self):
+        """Riwayat biaya bertanggal (DataFrame) atau None jika file riwayat tidak ada"""
+        return self._load_side_file(self.history_path, load_cost_history, "riwayat biaya")
+
+    def load_variant_costs(self):
+        """Tabel biaya per (Seller SKU, Variation) atau None jika file tidak ada"""
+        return self._load_side_file(self.variant_path, load_variant_cost_file, "biaya SKU/variasi")
+
+    def refresh(self):
+        return self.load()
+
+    def refresh_async(self):
+        pass
+
+    def flush(self):
+        return True
+
+    @property
+    def refreshing(self):
+        return False
+
+    @property
+    def pending(self):
+        """Jumlah perubahan yang belum terkirim ke sumber"""
+        return 0
+
+    @property
+    def last_sync(self):
+        """Hasil kiriman terakhir ke sumber: {'at', 'error', 'failures', 'next_retry'} (None jika belum ada)"""
+        return None
+
+    def cache_age_seconds(self):
+        return None
+
+    def health_check(self):
+        """Ping sumber dan simpan hasilnya di last_health"""
+        start = time.perf_counter()
+        result = {'backend': self.backend, 'ok': False, 'latency_ms': None, 'error': None,
+                  'checked_at': datetime.now().isoformat(timespec='seconds')}
+        try:
+            self.ping()
+            result['ok'] = True
+        except Exception as e:
+            result['error'] = str(e)
+            self.reset()
+        result['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        self.last_health = result
+        return result
+
+    def reset(self):
+        """Lupakan koneksi supaya dibuka ulang pada pemakaian berikutnya"""
+
+
+class GoogleSheetsCostStore(CostStore):
+    """Biaya produk di worksheet (Google Sheets / stand-in) + cache JSON lokal
+
+    Koneksi dibuka malas saat pertama kali dibutuhkan lalu dipakai ulang oleh
+    semua rerun dan sesi di proses yang sama. Jika koneksi gagal, percobaan
+    berikutnya baru dilakukan setelah `retry_seconds`.
+    """
+
+    def __init__(self, worksheet_factory, cache_file=None, backend="google_sheets", retry_seconds=60, use_cache=True,
+                 sync_window_seconds=0):
+        super().__init__()
+        self.worksheet_factory = worksheet_factory
+        self.cache_file = cache_file or CACHE_CONFIG["file_name"]
+        self.use_cache = use_cache
+        self.backend = backend
+        self.retry_seconds = retry_seconds
+        # (timestamp, data) terbaru; diganti utuh dengan satu assignment supaya
+        # pembaca tidak pernah melihat dictionary setengah jadi
+        self._snapshot = None
+        self._cache_mtime = None
+        self._refresh_thread = None
+        # Naik setiap save(); refresh yang dimulai sebelum save tidak menimpa snapshot
+        self._generation = 0
+        self._worksheet = None
+        self._failed_at = None
+        self._lock = threading.RLock()
+        self.sync = SheetSync(self.worksheet, COST_HEADER, window_seconds=sync_window_seconds,
+                              on_error=self._sync_error, retry_seconds=retry_seconds)
+
+    def _sync_error(self, error):
+        # Bisa dipanggil dari thread timer (tanpa konteks Streamlit): cukup buka ulang
+        # koneksi; pesan error ditampilkan sidebar dari last_sync
+        self.reset()
+
+    def worksheet(self):
+        """Worksheet yang sudah terhubung (None jika tidak tersedia)"""
+        with self._lock:
+            if self._worksheet is not None:
+                return self._worksheet
+            if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_seconds:
+                return None
+            try:
+                self._worksheet = self.worksheet_factory()
+            except Exception as e:
+                show_error(f"Gagal membuka worksheet biaya: {str(e)}")
+                self._worksheet = None
+            self._failed_at = None if self._worksheet is not None else time.monotonic()
+            return self._worksheet
+
+    def reset(self):
+        """Lupakan koneksi supaya dibuka ulang pada pemakaian berikutnya"""
+        with self._lock:
+            self._worksheet = None
+            self._failed_at = None
+
+    def ping(self):
+        sheet = self.worksheet()
+        if sheet is None:
+            raise ConnectionError("Worksheet tidak tersedia")
+        sheet.row_values(1)
+
+    @property
+    def pending(self):
+        return self.sync.pending
+
+    @property
+    def last_sync(self):
+        return self.sync.last_sync
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            return datetime.fromisoformat(cached['timestamp']), cached['data']
+        except Exception:
+            return None
+
+    def _write_cache(self, cost_data, timestamp):
+        if not self.use_cache:
+            return
+        payload = {'data': cost_data, 'timestamp': timestamp.isoformat()}
+        # mtime tulisan sendiri dicatat supaya tidak dibaca ulang pada rerun berikutnya
+        self._cache_mtime = atomic_write(self.cache_file, lambda f: json.dump(payload, f))
+
+    def fetch(self):
+        """Baca semua biaya langsung dari worksheet (sekaligus menyegarkan salinan untuk sinkronisasi)"""
+        sheet = self.worksheet()
+        if sheet is None:
+            return None
+        rows, dirty = self.sync.reload(sheet)
+        if not rows:
+            return {}
+        name_col = rows[0].index("product_name")
+        cost_col = rows[0].index("cost_per_unit")
+        cost_data = {row[name_col]: float(row[cost_col]) for row in rows[1:] if len(row) > cost_col and row[name_col]}
+        # Edit yang belum terkirim tetap berlaku
+        for name, cost in dirty.items():
+            if cost is None:
+                cost_data.pop(name, None)
+            else:
+                cost_data[name] = float(cost)
+        return cost_data
+
+    def _current(self):
+        """Snapshot di memori; file cache hanya di-parse ulang jika mtime-nya berubah
+
+        Perubahan mtime berarti proses lain menulis cache. Isinya dipakai jika lebih
+        baru dari snapshot di memori.
+        """
+        if not self.use_cache:
+            return self._snapshot
+        try:
+            mtime = os.stat(self.cache_file).st_mtime_ns
+        except OSError:
+            return self._snapshot
+        if mtime != self._cache_mtime:
+            cached = self._read_cache()
+            if cached is not None and (self._snapshot is None or cached[0] >= self._snapshot[0]):
+                self._snapshot = cached
+            self._cache_mtime = mtime
+        return self._snapshot
+
+    def refresh(self):
+        """Ambil biaya terbaru dari worksheet, simpan ke cache, dan tukar snapshot"""
+        start = time.perf_counter()
+        generation = self._generation
+        info = {'at': datetime.now().isoformat(timespec='seconds'), 'latency_ms': None, 'error': None}
+        try:
+            cost_data = self.fetch()
+        except Exception as e:
+            self.reset()
+            info['error'] = str(e)
+            cost_data = None
+        info['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        self.last_refresh = info
+        if cost_data is None:
+            return None
+
+        with self._lock:
+            if self._generation != generation:
+                # save() terjadi selama fetch: isi sheet yang dibaca sudah usang
+                return dict(self._snapshot[1])
+            timestamp = datetime.now()
+            self._write_cache(cost_data, timestamp)
+            self._snapshot = (timestamp, cost_data)
+        return cost_data
+
+    def refresh_async(self):
+        """Jalankan refresh di thread latar (tidak dobel jika masih berjalan)"""
+        with self._lock:
+            if self.refreshing:
+                return
+            self._refresh_thread = threading.Thread(target=self.refresh, name="cost-refresh", daemon=True)
+            self._refresh_thread.start()
+
+    @property
+    def refreshing(self):
+        return self._refresh_thread is not None and self._refresh_thread.is_alive()
+
+    def cache_age_seconds(self):
+        snapshot = self._current()
+        return (datetime.now() - snapshot[0]).total_seconds() if snapshot is not None else None
+
+    def load(self):
+        """Load cost data dengan strategi cache (salinan, aman diubah oleh pemanggil)"""
+        # 1. Coba load dari cache (max CACHE_CONFIG["expiry_hours"])
+        snapshot = self._current()
+        if snapshot is not None:
+            timestamp, data = snapshot
+            if timestamp > datetime.now() - timedelta(hours=CACHE_CONFIG["expiry_hours"]):
+                return dict(data)
+            # 2a. Cache kedaluwarsa: sajikan yang lama, perbarui di latar
+            if CACHE_CONFIG["stale_while_revalidate"]:
+                self.refresh_async()
+                return dict(data)
+
+        # 2b. Tidak ada cache (atau SWR mati) → ambil dari worksheet sekarang
+        cost_data = self.refresh()
+        if cost_data is None:
+            if self.last_refresh and self.last_refresh['error']:
+                show_error(f"Gagal load dari Google: {self.last_refresh['error']}")
+            return dict(snapshot[1]) if snapshot is not None else {}
+        return dict(cost_data)
+
+    def save(self, cost_dict):
+        """Simpan ke cache lokal, lalu kirim hanya baris yang berubah ke worksheet"""
+        previous = self._current()
+        timestamp = datetime.now()
+        cost_dict = dict(cost_dict)
+        with self._lock:
+            self._generation += 1
+            self._write_cache(cost_dict, timestamp)
+            self._snapshot = (timestamp, cost_dict)
+        # Isi sebelumnya jadi pembanding jika sheet belum terbaca dan sedang offline
+        return self.sync.stage(cost_dict, baseline=previous[1] if previous is not None else None)
+
+    def flush(self):
+        """Kirim edit yang masih tertunda sekarang juga"""
+        return self.sync.flush()
+
+
+class SQLiteCostStore(CostStore):
+    """Biaya produk di database SQLite lokal
+
+    product_name adalah PRIMARY KEY, jadi upsert/hapus per baris O(log n); seller_sku
+    disimpan sebagai keterangan. Import massal memakai satu transaksi executemany.
+    Jika tabel masih kosong dan seed_csv ada, isinya diimport sekali.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path, seed_csv=None):
+        super().__init__()
+        self.path = path
+        self._lock = threading.RLock()
+        # Satu koneksi dipakai bersama semua thread, dijaga oleh _lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS product_costs ("
+                " product_name TEXT PRIMARY KEY,"
+                " seller_sku TEXT,"
+                " cost_per_unit REAL NOT NULL,"
+                " updated_at TEXT NOT NULL)"
+            )
+        if seed_csv and os.path.exists(seed_csv) and self.count() == 0:
+            self.bulk_upsert(load_cost_file(seed_csv).items())
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM product_costs").fetchone()[0]
+
+    def load(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT product_name, cost_per_unit FROM product_costs").fetchall()
+        return dict(rows)
+
+    def _upsert_many(self, rows):
+        self._conn.executemany(
+            "INSERT INTO product_costs (product_name, seller_sku, cost_per_unit, updated_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(product_name) DO UPDATE SET"
+            " cost_per_unit = excluded.cost_per_unit,"
+            " seller_sku = COALESCE(excluded.seller_sku, product_costs.seller_sku),"
+            " updated_at = excluded.updated_at",
+            rows
+        )
+
+    def bulk_upsert(self, items):
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = [(item[0], item[2] if len(item) > 2 else None, float(item[1]), now) for item in items]
+        with self._lock, self._conn:
+            self._upsert_many(rows)
+        return len(rows)
+
+    def upsert(self, product_name, cost, seller_sku=None):
+        return self.bulk_upsert([(product_name, cost, seller_sku)])
+
+    def delete(self, product_names):
+        names = [(name,) for name in product_names]
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM product_costs WHERE product_name = ?", names)
+        return len(names)
+
+    def save(self, cost_dict):
+        """Hanya baris yang berubah/hilang yang ditulis, dalam satu transaksi"""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock, self._conn:
+            current = dict(self._conn.execute("SELECT product_name, cost_per_unit FROM product_costs").fetchall())
+            changed = [(name, None, float(cost), now) for name, cost in cost_dict.items()
+                       if current.get(name) != float(cost)]
+            removed = [(name,) for name in current if name not in cost_dict]
+            self._upsert_many(changed)
+            self._conn.executemany("DELETE FROM product_costs WHERE product_name = ?", removed)
+        return len(changed) + len(removed)
+
+    def ping(self):
+        with self._lock:
+            self._conn.execute("SELECT 1").fetchone()
+
+
+class CSVCostStore(CostStore):
+    """Biaya produk di file CSV (product_name,cost_per_unit), dibaca ulang hanya jika mtime berubah"""
+
+    backend = "csv"
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._snapshot = None
+        self._lock = threading.RLock()
+
+    def load(self):
+        with self._lock:
+            if not os.path.exists(self.path):
+                return {}
+            mtime = os.stat(self.path).st_mtime_ns
+            if self._snapshot is None or self._snapshot[0] != mtime:
+                self._snapshot = (mtime, load_cost_file(self.path))
+            return dict(self._snapshot[1])
+
+    def save(self, cost_dict):
+        with self._lock:
+            current = self.load()
+            changed = sum(1 for name, cost in cost_dict.items() if current.get(name) != float(cost))
+            changed += sum(1 for name in current if name not in cost_dict)
+            if not changed:
+                return 0
+            def write(f):
+                writer = csv.writer(f)
+                writer.writerow(COST_HEADER)
+                writer.writerows([name, float(cost)] for name, cost in cost_dict.items())
+
+            mtime = atomic_write(self.path, write)
+            self._snapshot = (mtime, {k: float(v) for k, v in cost_dict.items()})
+            return changed
+
+    def ping(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        if not os.access(directory, os.W_OK):
+            raise PermissionError(f"Folder {directory} tidak bisa ditulis")
+
+
+def create_cost_store(backend=None):
+    """Buat CostStore sesuai COST_STORE_CONFIG["backend"] ("google_sheets", "sqlite", "csv", atau "memory")"""
+    backend = backend or COST_STORE_CONFIG["backend"]
+    if backend == "google_sheets":
+        return GoogleSheetsCostStore(connect_google_worksheet, backend=backend,
+                                     retry_seconds=COST_STORE_CONFIG["retry_seconds"],
+                                     sync_window_seconds=COST_STORE_CONFIG["sync_window_seconds"])
+    if backend == "sqlite":
+        return SQLiteCostStore(COST_STORE_CONFIG["sqlite_path"], seed_csv=COST_STORE_CONFIG["csv_path"])
+    if backend == "csv":
+        return CSVCostStore(COST_STORE_CONFIG["csv_path"])
+    if backend == "memory":
+        sheet = InMemoryWorksheet([COST_HEADER])
+        return GoogleSheetsCostStore(lambda: sheet, backend=backend, use_cache=False)
+    raise ValueError(f"Backend biaya tidak dikenal: {backend}")
+
+
+# Satu CostStore per proses, dipakai bersama oleh semua rerun dan sesi browser
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_cost_store():
+    """CostStore bersama untuk seluruh proses (dibuat sekali)"""
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = create_cost_store()
+                # Edit yang masih menunggu jendela sinkron tetap terkirim saat proses berhenti
+                atexit.register(_STORE.flush)
+    return _STORE
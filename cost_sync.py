@@ -0,0 +1,236 @@
+import bisect
+import threading
+from datetime import datetime, timedelta
+
+HEADER_ROW = 1
+# Jeda percobaan ulang setelah gagal kirim: retry_seconds, 2x, 4x, ... maksimal kelipatan ini
+MAX_BACKOFF_FACTOR = 8
+
+
+def _same_cost(cell, cost):
+    try:
+        return float(cell) == float(cost)
+    except (TypeError, ValueError):
+        return False
+
+
+def _row_ranges(rows):
+    """Kelompokkan nomor baris menjadi rentang berurutan, dari bawah ke atas"""
+    ranges = []
+    for row in sorted(rows, reverse=True):
+        if ranges and ranges[-1][0] == row + 1:
+            ranges[-1][0] = row
+        else:
+            ranges.append([row, row])
+    return [tuple(r) for r in ranges]
+
+
+class SheetSync:
+    """Sinkronisasi biaya ke worksheet berbasis selisih
+
+    Menyimpan salinan isi sheet (nama -> nomor baris & nilai) dan mencatat kunci
+    yang berubah. Perubahan yang masuk dalam `window_seconds` digabung lalu dikirim
+    sekaligus: satu batch_update untuk baris yang berubah, delete_rows per rentang
+    baris yang dihapus, dan satu append_rows untuk produk baru.
+
+    Jika pengiriman gagal, edit tetap tertunda dan dikirim ulang otomatis dengan
+    jeda yang makin panjang (mulai `retry_seconds`). Hasil kiriman terakhir ada di
+    `last_sync` supaya UI bisa menampilkannya (timer berjalan di luar Streamlit).
+    """
+
+    def __init__(self, get_worksheet, header, window_seconds=2.0, on_error=None, retry_seconds=60):
+        self.get_worksheet = get_worksheet
+        self.header = list(header)
+        self.window_seconds = window_seconds
+        self.on_error = on_error
+        self.retry_seconds = retry_seconds
+        # Hasil kiriman terakhir: {'at', 'error', 'failures', 'retry_in', 'next_retry'}
+        self.last_sync = None
+        self.failures = 0
+        self.row_of = {}
+        self.values = {}
+        self.has_header = False
+        self.loaded = False
+        self.dirty = {}
+        self.flushes = 0
+        self._timer = None
+        self._lock = threading.RLock()
+
+    def load_snapshot(self, rows):
+        """Isi salinan sheet dari hasil get_all_values (baris pertama = header)"""
+        with self._lock:
+            self.row_of = {}
+            self.values = {}
+            self.has_header = bool(rows)
+            for index, row in enumerate(rows[1:], start=HEADER_ROW + 1):
+                if not row or not row[0]:
+                    continue
+                self.row_of[row[0]] = index
+                self.values[row[0]] = row[1] if len(row) > 1 else ''
+            self.loaded = True
+
+    def reload(self, sheet):
+        """Baca ulang sheet dan salinannya secara atomik terhadap flush; kembalikan (rows, edit tertunda)
+
+        Tanpa kunci, flush dari timer bisa menggeser baris di antara get_all_values
+        dan load_snapshot sehingga nomor baris di salinan tidak cocok lagi.
+        """
+        with self._lock:
+            rows = sheet.get_all_values()
+            self.load_snapshot(rows)
+            return rows, dict(self.dirty)
+
+    def _ensure_snapshot(self, sheet):
+        if not self.loaded:
+            self.load_snapshot(sheet.get_all_values())
+
+    def stage(self, cost_dict, baseline=None):
+        """Bandingkan dictionary biaya dengan isi sheet, tandai kunci yang berubah lalu jadwalkan kirim
+
+        baseline: biaya tersimpan sebelum edit ini (mis. cache lokal), dipakai sebagai
+        pembanding jika sheet belum pernah terbaca dan sedang tidak bisa dihubungi.
+        """
+        with self._lock:
+            if not self.loaded:
+                sheet = self.get_worksheet()
+                if sheet is None:
+                    return self._stage_offline(cost_dict, baseline or {})
+                self._ensure_snapshot(sheet)
+
+            # Selalu dibandingkan dengan isi sheet, jadi kunci yang kembali ke nilai
+            # semula sebelum sempat dikirim tidak ikut dikirim
+            known = self.values
+            for name, cost in cost_dict.items():
+                if name not in known or not _same_cost(known[name], cost):
+                    self.dirty[name] = cost
+                else:
+                    self.dirty.pop(name, None)
+            for name in list(self.dirty):
+                if name not in cost_dict and name not in known:
+                    del self.dirty[name]
+            for name in known:
+                if name not in cost_dict:
+                    self.dirty[name] = None
+            changed = len(self.dirty)
+            self._schedule()
+            return changed
+
+    def _stage_offline(self, cost_dict, baseline):
+        """Catat perubahan terhadap baseline tanpa membaca sheet, lalu jadwalkan percobaan ulang
+
+        Kunci yang sudah tertunda tidak dilepas (isi sheet belum diketahui), hanya
+        nilainya diperbarui ke edit terbaru.
+        """
+        for name, cost in cost_dict.items():
+            if name in self.dirty or name not in baseline or not _same_cost(baseline[name], cost):
+                self.dirty[name] = cost
+        for name in set(baseline) | set(self.dirty):
+            if name not in cost_dict:
+                self.dirty[name] = None
+        if self.dirty and self._timer is None:
+            self._failed("Worksheet tidak tersedia")
+        return len(self.dirty)
+
+    def _schedule(self):
+        if not self.dirty:
+            return
+        if self.window_seconds <= 0:
+            self.flush()
+            return
+        if self._timer is None:
+            self._arm(self.window_seconds)
+
+    def _arm(self, delay):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _failed(self, error):
+        """Catat kegagalan lalu jadwalkan kirim ulang dengan backoff"""
+        self.failures += 1
+        delay = self.retry_seconds * min(2 ** (self.failures - 1), MAX_BACKOFF_FACTOR)
+        now = datetime.now()
+        self.last_sync = {'at': now.isoformat(timespec='seconds'), 'error': error, 'failures': self.failures,
+                          'retry_in': delay,
+                          'next_retry': (now + timedelta(seconds=delay)).isoformat(timespec='seconds')}
+        self._arm(delay)
+        return False
+
+    @property
+    def pending(self):
+        return len(self.dirty)
+
+    def flush(self):
+        """Kirim semua perubahan tertunda ke worksheet (dipanggil timer atau langsung)"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self.dirty:
+                return True
+            sheet = self.get_worksheet()
+            if sheet is None:
+                return self._failed("Worksheet tidak tersedia")
+            dirty = dict(self.dirty)
+            try:
+                self._ensure_snapshot(sheet)
+                updates, appends, deletes = [], [], []
+                for name, cost in dirty.items():
+                    row = self.row_of.get(name)
+                    if cost is None:
+                        if row is not None:
+                            deletes.append(row)
+                    elif row is not None:
+                        updates.append({'range': f"A{row}", 'values': [[name, cost]]})
+                    else:
+                        appends.append([name, cost])
+
+                if not self.has_header:
+                    updates.insert(0, {'range': f"A{HEADER_ROW}", 'values': [self.header]})
+                # Urutan: update dulu (nomor baris masih valid), hapus dari bawah, lalu tambah
+                if updates:
+                    sheet.batch_update(updates)
+                for start, end in _row_ranges(deletes):
+                    sheet.delete_rows(start, end)
+                if appends:
+                    sheet.append_rows(appends)
+            except Exception as e:
+                # Salinan sheet mungkin tidak cocok lagi; baca ulang pada percobaan berikutnya
+                self.loaded = False
+                if self.on_error is not None:
+                    self.on_error(e)
+                return self._failed(str(e))
+
+            self._apply(dirty, deletes)
+            for name, cost in dirty.items():
+                if self.dirty.get(name, object()) == cost:
+                    del self.dirty[name]
+            self.flushes += 1
+            self.failures = 0
+            self.last_sync = {'at': datetime.now().isoformat(timespec='seconds'), 'error': None,
+                              'failures': 0, 'retry_in': None, 'next_retry': None}
+            if self.dirty:
+                # Edit baru masuk selama pengiriman
+                self._schedule()
+            return True
+
+    def _apply(self, dirty, deletes):
+        """Perbarui salinan sheet sesuai perubahan yang baru dikirim"""
+        self.has_header = True
+        for name, cost in dirty.items():
+            if cost is None:
+                self.row_of.pop(name, None)
+                self.values.pop(name, None)
+            else:
+                self.values[name] = cost
+        if deletes:
+            removed = sorted(deletes)
+            for name, row in self.row_of.items():
+                self.row_of[name] = row - bisect.bisect_left(removed, row)
+        next_row = max(self.row_of.values(), default=HEADER_ROW) + 1
+        for name, cost in dirty.items():
+            if cost is not None and name not in self.row_of:
+                self.row_of[name] = next_row
+                next_row += 1
@@ -0,0 +1,243 @@
+import json
+import numpy as np
+import pandas as pd
+
+
+def load_cost_file(path):
+    """Baca dictionary biaya dari file CSV (product_name,cost_per_unit) atau JSON"""
+    if str(path).lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            return {str(k): float(v) for k, v in json.load(f).items()}
+    table = pd.read_csv(path, dtype={'product_name': str})
+    costs = pd.to_numeric(table['cost_per_unit'], errors='coerce').fillna(0.0)
+    return dict(zip(table['product_name'], costs.astype(float)))
+
+
+# Kolom biaya per baris pesanan yang diisi process_data
+LINE_UNIT_COST_COLUMN = 'Line unit cost'
+LINE_COST_COLUMN = 'Line cost'
+
+
+def build_cost_history(records):
+    """Normalisasi riwayat biaya (product_name, cost_per_unit, valid_from) jadi DataFrame terurut per tanggal"""
+    if records is None:
+        return None
+    frame = pd.DataFrame(records).rename(columns={
+        'product_name': 'Product Name',
+        'cost_per_unit': 'Cost per Unit'
+    })
+    if frame.empty:
+        return None
+    frame['Product Name'] = frame['Product Name'].astype(str)
+    frame['Cost per Unit'] = pd.to_numeric(frame['Cost per Unit'], errors='coerce')
+    frame['valid_from'] = pd.to_datetime(frame['valid_from'], errors='coerce').astype('datetime64[ns]')
+    frame = frame.dropna(subset=['Cost per Unit', 'valid_from'])
+    return frame.sort_values('valid_from', kind='stable').reset_index(drop=True)
+
+
+def load_cost_history(path):
+    """Baca riwayat biaya dari CSV/XLSX (product_name, cost_per_unit, valid_from)"""
+    if str(path).lower().endswith(('.xlsx', '.xls')):
+        records = pd.read_excel(path, dtype={'product_name': str})
+    else:
+        records = pd.read_csv(path, dtype={'product_name': str})
+    return build_cost_history(records)
+
+
+def build_cost_table(cost_data):
+    """Bangun tabel biaya (indeks = nama produk) sekali dari dictionary biaya"""
+    costs = pd.to_numeric(pd.Series(cost_data or {}, dtype=object), errors='coerce')
+    table = pd.DataFrame({'Cost per Unit': costs.fillna(0.0).astype('float64')})
+    table.index = table.index.astype(str)
+    table.index.name = 'Product Name'
+    return table
+
+
+def lookup_costs(names, cost_table):
+    """Join biaya per baris secara massal, nilai NaN berarti produk tidak ada di tabel biaya
+
+    Nama difaktorisasi dulu, jadi join hanya dilakukan untuk nama unik.
+    """
+    codes, uniques = pd.factorize(pd.Series(names))
+    keys = pd.Index(np.asarray(uniques, dtype=object).astype(str))
+    unique_costs = cost_table['Cost per Unit'].reindex(keys).to_numpy(dtype='float64')
+    # Kode -1 (nama kosong) mengambil elemen terakhir = NaN
+    return np.append(unique_costs, np.nan)[codes]
+
+
+def asof_costs(names, dates, history):
+    """Biaya per baris yang berlaku pada tanggal baris (record valid_from terakhir <= tanggal)
+
+    Satu merge_asof terurut per nama produk; NaN jika belum ada record yang berlaku.
+    """
+    result = np.full(len(names), np.nan)
+    if history is None or history.empty:
+        return result
+    lines = pd.DataFrame({
+        'Product Name': pd.Series(names).astype(str).to_numpy(),
+        'date': pd.to_datetime(pd.Series(dates), errors='coerce').astype('datetime64[ns]').to_numpy(),
+        '_pos': np.arange(len(names)),
+    })
+    lines = lines.dropna(subset=['date']).sort_values('date', kind='stable')
+    matched = pd.merge_asof(
+        lines,
+        history[['Product Name', 'valid_from', 'Cost per Unit']],
+        left_on='date',
+        right_on='valid_from',
+        by='Product Name',
+        direction='backward'
+    )
+    result[matched['_pos'].to_numpy()] = matched['Cost per Unit'].to_numpy(dtype='float64')
+    return result
+
+
+def _key_text(values):
+    """Teks kunci yang dinormalisasi (strip, kosong untuk NaN)"""
+    series = pd.Series(values, dtype=object)
+    return series.where(series.notna(), '').astype(str).str.strip().to_numpy(dtype=object)
+
+
+def composite_keys(skus, variations):
+    """Hash 64-bit (Seller SKU, Variation); dihitung massal tanpa loop Python"""
+    frame = pd.DataFrame({'sku': _key_text(skus), 'variation': _key_text(variations)})
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def _pair_codes(skus, variations):
+    """Faktorisasi pasangan (Seller SKU, Variation) per baris
+
+    Mengembalikan (codes, sku_unik, variasi_unik): kunci hash cukup dihitung untuk
+    pasangan unik lalu disebar ke baris lewat codes.
+    """
+    sku_codes, sku_uniques = pd.factorize(pd.Series(skus))
+    var_codes, var_uniques = pd.factorize(pd.Series(variations))
+    width = len(var_uniques) + 1
+    combined = (sku_codes.astype('int64') + 1) * width + (var_codes + 1)
+    codes, pairs = pd.factorize(combined)
+    # Indeks -1 (nilai kosong) mengambil elemen terakhir = ''
+    sku_text = np.append(np.asarray(sku_uniques, dtype=object), '')[pairs // width - 1]
+    var_text = np.append(np.asarray(var_uniques, dtype=object), '')[pairs % width - 1]
+    return codes, sku_text, var_text
+
+
+def build_variant_cost_table(records):
+    """Tabel biaya per (Seller SKU, Variation) dengan indeks hash komposit
+
+    Variation kosong berarti biaya berlaku untuk semua variasi SKU tersebut.
+    Jika satu kunci muncul lebih dari sekali, record terakhir yang dipakai.
+    """
+    if records is None:
+        return None
+    frame = pd.DataFrame(records).rename(columns={
+        'seller_sku': 'Seller SKU',
+        'variation': 'Variation',
+        'cost_per_unit': 'Cost per Unit'
+    })
+    if frame.empty:
+        return None
+    if 'Variation' not in frame.columns:
+        frame['Variation'] = ''
+    frame['Seller SKU'] = _key_text(frame['Seller SKU'])
+    frame['Variation'] = _key_text(frame['Variation'])
+    frame['Cost per Unit'] = pd.to_numeric(frame['Cost per Unit'], errors='coerce')
+    frame = frame[(frame['Seller SKU'] != '') & frame['Cost per Unit'].notna()]
+    frame.index = pd.Index(composite_keys(frame['Seller SKU'], frame['Variation']), name='key')
+    return frame[~frame.index.duplicated(keep='last')][['Seller SKU', 'Variation', 'Cost per Unit']]
+
+
+def load_variant_cost_file(path):
+    """Baca biaya per SKU/variasi dari CSV/XLSX (seller_sku, variation, cost_per_unit)"""
+    dtype = {'seller_sku': str, 'variation': str}
+    if str(path).lower().endswith(('.xlsx', '.xls')):
+        records = pd.read_excel(path, dtype=dtype)
+    else:
+        records = pd.read_csv(path, dtype=dtype)
+    return build_variant_cost_table(records)
+
+
+def _lookup_keys(keys, variant_table):
+    positions = variant_table.index.get_indexer(keys)
+    costs = variant_table['Cost per Unit'].to_numpy(dtype='float64')
+    return np.where(positions >= 0, costs[positions], np.nan)
+
+
+# Tingkat sumber biaya per baris, dari yang paling spesifik
+COST_TIERS = ['sku_variation', 'sku', 'product_dated', 'product', 'missing']
+COST_TIER_COLUMN = 'Cost tier'
+
+
+def resolve_line_costs(names, cost_table, skus=None, variations=None, dates=None,
+                       variant_table=None, history=None):
+    """Biaya per unit tiap baris beserta tingkat sumbernya
+
+    Urutan: (Seller SKU, Variation) → Seller SKU saja → riwayat biaya per nama
+    produk (as-of tanggal order) → biaya nama produk saat ini. Setiap tingkat
+    adalah satu join massal, hanya untuk baris yang belum mendapat biaya.
+    Mengembalikan (unit_costs, tiers) dengan tiers = Categorical COST_TIERS.
+    """
+    n = len(names)
+    unit_costs = np.full(n, np.nan)
+    tier_codes = np.full(n, COST_TIERS.index('missing'), dtype='int8')
+
+    def fill(tier, costs):
+        hit = np.isnan(unit_costs) & ~np.isnan(costs)
+        unit_costs[hit] = costs[hit]
+        tier_codes[hit] = COST_TIERS.index(tier)
+
+    if variant_table is not None and not variant_table.empty and skus is not None:
+        variation_keys = variations if variations is not None else np.full(n, '', dtype=object)
+        codes, sku_text, var_text = _pair_codes(skus, variation_keys)
+        blank = np.full(len(sku_text), '', dtype=object)
+        exact = _lookup_keys(composite_keys(sku_text, var_text), variant_table)
+        # Variasi kosong cocok dengan record SKU (variasi kosong), jadi dihitung tingkat 'sku'
+        exact[var_text == ''] = np.nan
+        fill('sku_variation', exact[codes])
+        fill('sku', _lookup_keys(composite_keys(sku_text, blank), variant_table)[codes])
+    if history is not None and dates is not None:
+        fill('product_dated', asof_costs(names, dates, history))
+    fill('product', lookup_costs(names, cost_table))
+
+    tiers = pd.Categorical.from_codes(tier_codes, categories=COST_TIERS)
+    return unit_costs, tiers
+
+
+def tier_hit_rates(tiers):
+    """Jumlah dan persentase baris per tingkat sumber biaya"""
+    counts = pd.Series(tiers).value_counts().reindex(COST_TIERS, fill_value=0)
+    total = int(counts.sum())
+    return {
+        tier: {'lines': int(count), 'rate': round(count / total * 100, 2) if total else 0.0}
+        for tier, count in counts.items()
+    }
+
+
+def average_unit_costs(total_cost, qty):
+    """Biaya per unit rata-rata tertimbang dari total biaya dan qty (0 jika qty 0)"""
+    total_cost = np.asarray(total_cost, dtype='float64')
+    qty = np.asarray(qty, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(qty > 0, total_cost / qty, 0.0)
+
+
+def compute_profit(frame, unit_costs, qty_col='TotalQty', revenue_col='Revenue',
+                   cost_col='Cost per Unit', total_cost_col='Total Cost',
+                   profit_col='Profit', margin_col='Profit Margin %', shares=True):
+    """Isi kolom biaya, profit, margin (dan bagi hasil) dengan operasi array"""
+    unit_costs = np.nan_to_num(np.asarray(unit_costs, dtype='float64'), nan=0.0)
+    qty = frame[qty_col].to_numpy(dtype='float64')
+    revenue = frame[revenue_col].to_numpy(dtype='float64')
+
+    total_cost = qty * unit_costs
+    profit = revenue - total_cost
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin = np.round(profit / revenue * 100, 2)
+
+    frame[cost_col] = unit_costs
+    frame[total_cost_col] = total_cost
+    frame[profit_col] = profit
+    frame[margin_col] = margin
+    if shares:
+        frame['Share 60%'] = profit * 0.6
+        frame['Share 40%'] = profit * 0.4
+    return frame
+
@@ -1,294 +1,279 @@
+import numpy as np
 import pandas as pd
-import json
-import os
-from datetime import datetime, timedelta
-import io
-import streamlit as st
-from config import GOOGLE_SHEETS_CONFIG, REQUIRED_COLUMNS, CACHE_CONFIG, get_google_credentials
+from datetime import datetime
+from config import REQUIRED_COLUMNS, REPORT_CONFIG
+from cost_store import get_cost_store
+from costing import (build_cost_table, compute_profit, resolve_line_costs, tier_hit_rates, average_unit_costs,
+                     LINE_UNIT_COST_COLUMN, LINE_COST_COLUMN, COST_TIER_COLUMN)
+from allocation import allocate_order_lines
+from analysis_cube import build_cube, find_date_column
+from instrumentation import RunTrace
+from name_matching import suggest_costs
+from report_writer import open_workbook, use_streaming, write_frame, write_rows
+from report_metrics import build_report_metrics
+from report_charts import add_daily_revenue_chart, add_top_products_chart, add_fee_breakdown_chart, add_channel_chart
 
 class IncomeApp:
     """Class utama untuk memproses data pendapatan dan pesanan"""
     
-    def __init__(self):
-        self.CACHE_FILE = CACHE_CONFIG["file_name"]
-        self.gc = get_google_credentials()
-        self.cost_data = self.load_cost_data()
+    def __init__(self, cost_data=None, cost_history=None, variant_costs=None):
+        # Hasil sampingan dari process_data terakhir (mis. produk tanpa biaya)
+        self.last_artifacts = {}
+        if cost_data is not None:
+            # Mode offline (CLI/batch): biaya dari file, tanpa Google Sheets
+            self.store = None
+            self.cost_data = cost_data
+            self.cost_history = cost_history
+            self.variant_costs = variant_costs
+        else:
+            # Store (dan koneksi Google) dipakai bersama, jadi murah dibuat ulang tiap rerun
+            self.store = get_cost_store()
+            self.cost_data = self.load_cost_data()
+            self.cost_history = self.store.load_history()
+            self.variant_costs = self.store.load_variant_costs()
     
     def load_cost_data(self):
         """Load cost data dengan strategi cache"""
-        # 1. Coba load dari local cache (max 1 jam)
-        if os.path.exists(self.CACHE_FILE):
-            try:
-                with open(self.CACHE_FILE, 'r') as f:
-                    cached = json.load(f)
-                    # Cek expired (1 jam)
-                    if datetime.fromisoformat(cached['timestamp']) > datetime.now() - timedelta(hours=CACHE_CONFIG["expiry_hours"]):
-                        return cached['data']
-            except Exception:
-                pass
-        
-        # 2. Kalau cache ga ada/expired → ambil dari Google
-        if self.gc:
-            try:
-                sheet = self.gc.open_by_key(GOOGLE_SHEETS_CONFIG["SHEET_ID"]).worksheet(GOOGLE_SHEETS_CONFIG["SHEET_NAME"])
-                records = sheet.get_all_records()
-                cost_data = {row["product_name"]: float(row["cost_per_unit"]) for row in records}
-                
-                # 3. Simpan ke cache
-                with open(self.CACHE_FILE, 'w') as f:
-                    json.dump({
-                        'data': cost_data,
-                        'timestamp': datetime.now().isoformat()
-                    }, f)
-                
-                return cost_data
-                
-            except Exception as e:
-                st.error(f"Gagal load dari Google: {str(e)}")
-                return {}
-        else:
-            return {}
+        if self.store is None:
+            return dict(self.cost_data)
+        return self.store.load()
 
     def save_cost_data(self, cost_dict):
-        """Simpan ke Google + update cache lokal"""
-        if self.gc:
-            try:
-                # Save ke Google
-                sheet = self.gc.open_by_key(GOOGLE_SHEETS_CONFIG["SHEET_ID"]).worksheet(GOOGLE_SHEETS_CONFIG["SHEET_NAME"])
-                sheet.clear()
-                sheet.update(values=[["product_name", "cost_per_unit"]], range_name="A1")
-                rows = [[k, v] for k, v in cost_dict.items()]
-                sheet.update(values=rows, range_name="A2")
-                
-                # Update cache lokal
-                with open(self.CACHE_FILE, 'w') as f:
-                    json.dump({
-                        'data': cost_dict,
-                        'timestamp': datetime.now().isoformat()
-                    }, f)
-            except Exception as e:
-                st.error(f"Gagal menyimpan ke Google: {str(e)}")
+        """Simpan ke cache lokal + kirim baris yang berubah ke Google"""
+        if self.store is not None:
+            return self.store.save(cost_dict)
+        return 0
+    
+    def import_cost_data(self, cost_dict, skus=None):
+        """Tulis banyak biaya sekaligus (satu penulisan batch ke store); skus: {nama: Seller SKU}"""
+        if self.store is not None:
+            skus = skus or {}
+            return self.store.bulk_upsert((name, cost, skus.get(name)) for name, cost in cost_dict.items())
+        self.cost_data.update(cost_dict)
+        return len(cost_dict)
+    
+    def upsert_cost(self, product_name, cost, seller_sku=None):
+        """Simpan biaya satu produk (satu upsert per baris, bukan tulis ulang semua biaya)"""
+        if self.store is not None:
+            return self.store.upsert(product_name, cost, seller_sku=seller_sku)
+        self.cost_data[product_name] = float(cost)
+        return 1
+    
+    def delete_costs(self, product_names):
+        """Hapus biaya produk tertentu dari store"""
+        if self.store is not None:
+            return self.store.delete(product_names)
+        for name in product_names:
+            self.cost_data.pop(name, None)
+        return len(product_names)
+    
+    def product_skus(self, pesanan_data):
+        """Seller SKU pertama per nama produk dari data pesanan ({} jika tidak tersedia)"""
+        if pesanan_data is None or not {'Product Name', 'Seller SKU'} <= set(pesanan_data.columns):
+            return {}
+        pairs = pesanan_data[['Product Name', 'Seller SKU']].dropna().drop_duplicates('Product Name')
+        return dict(zip(pairs['Product Name'].astype(str), pairs['Seller SKU'].astype(str)))
     
     def get_product_cost(self, product_name, cost_data):
         """Mendapatkan biaya produk dari data biaya"""
         return float(cost_data.get(product_name, 0.0))
     
-    def process_data(self, pesanan_data, income_data, cost_data):
+    def process_data(self, pesanan_data, income_data, cost_data, cost_history=None, variant_costs=None):
         """Memproses dan menggabungkan data"""
+        trace = RunTrace('process_data')
+        # Trace selalu tersedia, juga saat proses berhenti di tengah jalan
+        self.last_artifacts = {'trace': trace}
+        
         # Validasi input data
-        if pesanan_data is None or income_data is None:
-            return None, None
-            
-        if pesanan_data.empty or income_data.empty:
-            return None, None
+        with trace.stage('validation', rows_in=income_data) as record:
+            if pesanan_data is None or income_data is None or pesanan_data.empty or income_data.empty:
+                trace.warn("Data pesanan atau income kosong")
+                return None, None
             
-        # Validasi kolom yang diperlukan
-        missing_pesanan_cols = [col for col in REQUIRED_COLUMNS["pesanan"] if col not in pesanan_data.columns]
-        missing_income_cols = [col for col in REQUIRED_COLUMNS["income"] if col not in income_data.columns]
-        
-        if missing_pesanan_cols or missing_income_cols:
-            print(f"Missing columns in pesanan_data: {missing_pesanan_cols}")
-            print(f"Missing columns in income_data: {missing_income_cols}")
-            return None, None
+            # Validasi kolom yang diperlukan
+            missing_pesanan_cols = [col for col in REQUIRED_COLUMNS["pesanan"] if col not in pesanan_data.columns]
+            missing_income_cols = [col for col in REQUIRED_COLUMNS["income"] if col not in income_data.columns]
+            if missing_pesanan_cols or missing_income_cols:
+                trace.warn(f"Kolom hilang - pesanan: {missing_pesanan_cols}, income: {missing_income_cols}")
+                return None, None
+            record['rows_out'] = income_data
         
         # =================================================================
         # LOGIKA BARU: Prioritaskan data dari income.xlsx
         # =================================================================
         
         # 1. Ambil data income yang bersih (tidak refund)
-        clean_income = income_data[income_data['Customer refund'] >= 0].copy()
-        
-        # Debug info
-        print(f"Total income records: {len(income_data)}")
-        print(f"Clean income records (non-refund): {len(clean_income)}")
-        print(f"Total revenue from income: Rp {clean_income['Total settlement amount'].sum():,.0f}")
-        print(f"Expected revenue (income.xlsx): Rp 5,202,419")
-        print(f"Difference: Rp {clean_income['Total settlement amount'].sum() - 5202419:,.0f}")
+        with trace.stage('refund_filter', rows_in=income_data) as record:
+            clean_income = income_data[income_data['Customer refund'] >= 0].copy()
+            record['rows_out'] = clean_income
+        trace.metric('income_revenue', float(clean_income['Total settlement amount'].sum()))
         
         if clean_income.empty:
-            print("No clean income data found (all orders are refunded)")
+            trace.warn("Semua order di income direfund")
             return None, None
         
         # 2. Filter pesanan selesai untuk mendapatkan info produk
-        df1 = pesanan_data[pesanan_data['Order Status'] == 'Selesai'].copy()
-        
-        # Debug info
-        print(f"Total pesanan records: {len(pesanan_data)}")
-        print(f"Completed orders: {len(df1)}")
-        print(f"Unique order IDs in pesanan: {df1['Order ID'].nunique()}")
+        with trace.stage('status_filter', rows_in=pesanan_data) as record:
+            df1 = pesanan_data[pesanan_data['Order Status'] == 'Selesai'].copy()
+            record['rows_out'] = df1
         
         if df1.empty:
-            print("No completed orders found")
+            trace.warn("Tidak ada pesanan berstatus Selesai")
             return None, None
         
-        # 3. Gabungkan dengan LEFT JOIN dari income ke pesanan
-        # Ini memastikan semua data income terambil, meskipun ada duplikat di pesanan
-        merged = pd.merge(
-            clean_income, 
-            df1, 
-            left_on='Order/adjustment ID', 
-            right_on='Order ID', 
-            how='left'
-        )
+        # Baris pesanan yang persis sama (export ganda) cukup dihitung sekali
+        with trace.stage('dedup', rows_in=df1) as record:
+            line_keys = [c for c in ['Order ID', 'SKU ID', 'Seller SKU', 'Product Name', 'Variation', 'Quantity'] if c in df1.columns]
+            df1 = df1.drop_duplicates(subset=line_keys)
+            record['rows_out'] = df1
         
-        # Debug info
-        print(f"Merged records: {len(merged)}")
-        print(f"Unique orders after merge: {merged['Order/adjustment ID'].nunique()}")
-        print(f"Total revenue after merge: Rp {merged['Total settlement amount'].sum():,.0f}")
-        
-        # Debug final result
-        unique_final = merged.drop_duplicates(subset=['Order/adjustment ID'])
-        final_revenue = unique_final['Total settlement amount'].sum()
-        print(f"Final unique orders: {len(unique_final)}")
-        print(f"Final total revenue: Rp {final_revenue:,.0f}")
-        print(f"Final vs Expected difference: Rp {final_revenue - 5202419:,.0f}")
+        with trace.stage('merge', rows_in=clean_income) as record:
+            # Nomor baris income dipakai sebagai grup alokasi ke baris pesanan
+            clean_income['_income_row'] = range(len(clean_income))
+            
+            # Samakan tipe kunci join (mis. int64 vs string setelah normalisasi dtype)
+            if clean_income['Order/adjustment ID'].dtype != df1['Order ID'].dtype:
+                clean_income['Order/adjustment ID'] = clean_income['Order/adjustment ID'].astype(str)
+                df1['Order ID'] = df1['Order ID'].astype(str)
+            
+            # 3. Gabungkan dengan LEFT JOIN dari income ke pesanan
+            # Ini memastikan semua data income terambil, meskipun ada duplikat di pesanan
+            merged = pd.merge(
+                clean_income, 
+                df1, 
+                left_on='Order/adjustment ID', 
+                right_on='Order ID', 
+                how='left'
+            )
+            record['rows_out'] = merged
+        trace.metric('unmatched_income_rows', int(merged['Order ID'].isna().sum()))
         
         if merged.empty:
-            print("No matching orders found between income and pesanan data")
+            trace.warn("Tidak ada order yang cocok antara income dan pesanan")
             return None, None
         
-        # 4. Hapus duplikat berdasarkan Order ID dari income (yang lebih akurat)
-        unique_orders = merged.drop_duplicates(subset=['Order/adjustment ID'])
-        
-        # 5. Buat ringkasan berdasarkan data yang ada
-        # Jika ada kolom produk yang kosong, gunakan default
-        summary_columns = ['Seller SKU', 'Product Name', 'Variation']
-        available_columns = [col for col in summary_columns if col in unique_orders.columns]
+        # 4. Alokasikan settlement & fee tiap order ke baris produknya
+        # (proporsional terhadap SKU Subtotal After Discount), jadi order multi-item
+        # tidak lagi diatribusikan seluruhnya ke SKU pertama
+        with trace.stage('allocation', rows_in=merged) as record:
+            merged = allocate_order_lines(merged, '_income_row').drop(columns=['_income_row'])
+            record['rows_out'] = merged
+        # Rekonsiliasi: hasil alokasi per baris harus menjumlah ke total income bersih
+        trace.metric('allocated_revenue', float(merged['Line settlement amount'].sum()))
+        trace.metric('revenue_difference', trace.metrics['allocated_revenue'] - trace.metrics['income_revenue'])
         
-        if len(available_columns) >= 2:  # Minimal ada Product Name
-            summary = unique_orders.groupby(available_columns, as_index=False).agg(
-                TotalQty=('Quantity', 'sum') if 'Quantity' in unique_orders.columns else ('Order/adjustment ID', 'count'),
-                Revenue=('Total settlement amount', 'sum')
-            )
-        else:
-            # Fallback: group by Order ID saja
-            summary = unique_orders.groupby('Order/adjustment ID', as_index=False).agg(
-                Revenue=('Total settlement amount', 'sum')
+        # 5. Biaya per baris pesanan: biaya per (Seller SKU, Variation) jika ada,
+        # lalu fallback ke nama produk (riwayat biaya as-of tanggal order, lalu biaya saat ini)
+        with trace.stage('costing', rows_in=merged) as record:
+            cost_table = build_cost_table(cost_data)
+            date_col = find_date_column(merged)
+            names = merged['Product Name'] if 'Product Name' in merged.columns else pd.Series('', index=merged.index)
+            unit_costs, tiers = resolve_line_costs(
+                names,
+                cost_table,
+                skus=merged['Seller SKU'] if 'Seller SKU' in merged.columns else None,
+                variations=merged['Variation'] if 'Variation' in merged.columns else None,
+                dates=merged[date_col] if date_col else None,
+                variant_table=variant_costs,
+                history=cost_history
             )
-            summary['TotalQty'] = 1
-            summary['Product Name'] = 'Unknown Product'
-            summary['Seller SKU'] = 'Unknown SKU'
-            summary['Variation'] = 'Unknown Variation'
+            quantity = pd.to_numeric(merged['Quantity'], errors='coerce').fillna(0).to_numpy(dtype='float64') \
+                if 'Quantity' in merged.columns else np.ones(len(merged))
+            merged[LINE_UNIT_COST_COLUMN] = unit_costs
+            merged[LINE_COST_COLUMN] = quantity * np.nan_to_num(unit_costs, nan=0.0)
+            merged[COST_TIER_COLUMN] = tiers
+            missing = np.isnan(unit_costs) & names.notna().to_numpy()
+            unmatched = sorted(pd.unique(names[missing].astype(str)).tolist())
+            cost_tiers = tier_hit_rates(tiers)
+            for tier, hits in cost_tiers.items():
+                trace.metric(f'cost_tier_{tier}_lines', hits['lines'])
+            record['rows_out'] = merged
         
-        # Tambahkan perhitungan biaya
-        summary['Cost per Unit'] = summary['Product Name'].apply(
-            lambda x: self.get_product_cost(x, cost_data)
-        )
-        summary['Total Cost'] = summary['TotalQty'] * summary['Cost per Unit']
-        summary['Profit'] = summary['Revenue'] - summary['Total Cost']
-        summary['Profit Margin %'] = (summary['Profit'] / summary['Revenue'] * 100).round(2)
-        summary['Share 60%'] = summary['Profit'] * 0.6
-        summary['Share 40%'] = summary['Profit'] * 0.4
+        # Usulan padanan nama (indeks n-gram) untuk produk yang belum punya biaya
+        with trace.stage('name_matching', rows_in=len(unmatched)) as record:
+            cost_suggestions = suggest_costs(unmatched, cost_data)
+            record['rows_out'] = cost_suggestions
         
-        return merged, summary
-    
-    def create_excel_report(self, merged_data, summary_data, cost_data):
-        """Membuat laporan Excel"""
-        output = io.BytesIO()
-        
-        # Hitung total
-        # Gunakan Order/adjustment ID sebagai primary key (sesuai dengan logika baru)
-        unique_orders = merged_data.drop_duplicates(subset=['Order/adjustment ID'])
-
-        total_orders  = unique_orders['Order/adjustment ID'].nunique()
-        total_revenue = unique_orders['Total settlement amount'].sum()
-        total_qty     = unique_orders['Quantity'].sum() if 'Quantity' in unique_orders.columns else 0
-        
-        # Ringkasan berdasarkan SKU
-        summary_by_sku = (
-            unique_orders.groupby('Seller SKU', as_index=False)
-            .agg({
-                'Quantity': 'sum' if 'Quantity' in unique_orders.columns else ('Order/adjustment ID', 'count'),
-                'Order/adjustment ID': 'nunique',
-                'Total settlement amount': 'sum'
-            })
-            .rename(columns={
-                'Quantity': 'Total Quantity',
-                'Order/adjustment ID': 'Total Orders',
-                'Total settlement amount': 'Total Revenue'
-            })
-        )
+        # 6. Buat ringkasan berdasarkan data yang ada
+        # Jika ada kolom produk yang kosong, gunakan default
+        summary_columns = ['Seller SKU', 'Product Name', 'Variation']
+        available_columns = [col for col in summary_columns if col in merged.columns]
         
-        # Dapatkan nama produk pertama untuk setiap SKU
-        sku_products = merged_data.groupby('Seller SKU')['Product Name'].first().to_dict()
-        summary_by_sku['Cost per Unit'] = summary_by_sku['Seller SKU'].map(
-            lambda sku: self.get_product_cost(sku_products.get(sku, ''), cost_data)
-        )
-        summary_by_sku['Total Cost'] = summary_by_sku['Total Quantity'] * summary_by_sku['Cost per Unit']
-        summary_by_sku['Profit'] = summary_by_sku['Total Revenue'] - summary_by_sku['Total Cost']
-        summary_by_sku['Profit Margin %'] = (summary_by_sku['Profit'] / summary_by_sku['Total Revenue'] * 100).round(2)
-        summary_by_sku['Share 60%'] = summary_by_sku['Profit'] * 0.6
-        summary_by_sku['Share 40%'] = summary_by_sku['Profit'] * 0.4
+        with trace.stage('groupby', rows_in=merged) as record:
+            if len(available_columns) >= 2:  # Minimal ada Product Name
+                summary = merged.groupby(available_columns, as_index=False, observed=True).agg(
+                    TotalQty=('Quantity', 'sum') if 'Quantity' in merged.columns else ('Order/adjustment ID', 'count'),
+                    Revenue=('Line settlement amount', 'sum'),
+                    LineCost=(LINE_COST_COLUMN, 'sum')
+                )
+                # Kolom category dikembalikan ke teks biasa supaya aman dipakai di tab (concat string, dll.)
+                for col in available_columns:
+                    if isinstance(summary[col].dtype, pd.CategoricalDtype):
+                        summary[col] = summary[col].astype(str)
+            else:
+                # Fallback: group by Order ID saja
+                unique_orders = merged.drop_duplicates(subset=['Order/adjustment ID'])
+                summary = unique_orders.groupby('Order/adjustment ID', as_index=False).agg(
+                    Revenue=('Total settlement amount', 'sum')
+                )
+                summary['TotalQty'] = 1
+                summary['LineCost'] = 0.0
+                summary['Product Name'] = 'Unknown Product'
+                summary['Seller SKU'] = 'Unknown SKU'
+                summary['Variation'] = 'Unknown Variation'
+            
+            # Biaya per unit = rata-rata tertimbang biaya baris (sama dengan biaya flat
+            # jika tidak ada riwayat biaya)
+            summary = compute_profit(summary, average_unit_costs(summary.pop('LineCost'), summary['TotalQty']))
+            record['rows_out'] = summary
         
-        # Hitung total biaya dan profit
-        total_cost = summary_by_sku['Total Cost'].sum()
-        total_profit = total_revenue - total_cost
-        total_share_60 = total_profit * 0.6
-        total_share_40 = total_profit * 0.4
+        # Cube agregasi dipakai bersama oleh laporan dan tab analisis
+        with trace.stage('cube', rows_in=merged) as record:
+            cube = build_cube(merged, cost_table)
+            record['rows_out'] = cube
         
-        # Analisis penjualan harian
-        date_column = None
-        possible_date_columns = [
-            'Order created time(UTC)', 'Order creation time', 'Order Creation Time', 
-            'Creation Time', 'Date', 'Order Date', 'Order created time', 'Created time'
-        ]
+        # Bundle metrik untuk laporan Excel dan tab UI (dihitung sekali di sini)
+        with trace.stage('metrics', rows_in=cube) as record:
+            metrics = build_report_metrics(merged, summary, cost_data, cube=cube, income_data=income_data)
+            record['rows_out'] = metrics['summary_by_sku']
         
-        for col in possible_date_columns:
-            if col in merged_data.columns:
-                date_column = col
-                break
+        self.last_artifacts.update({
+            'unmatched_products': unmatched,
+            'cost_tiers': cost_tiers,
+            'cost_suggestions': cost_suggestions,
+            'cube': cube,
+            'metrics': metrics,
+        })
         
-        if date_column:
-            try:
-                merged_data_copy = merged_data.copy()
-                merged_data_copy['Order Date'] = pd.to_datetime(merged_data_copy[date_column]).dt.date
+        return merged, summary
+    
+    def create_excel_report(self, merged_data, summary_data, cost_data, cube=None, income_data=None,
+                            output=None, streaming=None, progress=None, metrics=None):
+        """Membuat laporan Excel
 
-                daily_sales = (
-                    merged_data_copy[['Order Date', 'Order/adjustment ID', 'Quantity', 'Total settlement amount']]
-                    .drop_duplicates(subset=['Order/adjustment ID'])
-                    .groupby('Order Date', as_index=False)
-                    .agg(
-                        Daily_Quantity=('Quantity', 'sum') if 'Quantity' in merged_data_copy.columns else ('Order/adjustment ID', 'count'),
-                        Daily_Orders=('Order/adjustment ID', 'nunique'),
-                        Daily_Revenue=('Total settlement amount', 'sum')
-                    )
-                )
-            except:
-                daily_sales = pd.DataFrame({
-                    'Order Date': ['Data tidak tersedia'],
-                    'Daily Quantity': [0],
-                    'Daily Orders': [0],
-                    'Daily Revenue': [0]
-                })
-        else:
-            daily_sales = pd.DataFrame({
-                'Order Date': ['Kolom tanggal tidak ditemukan'],
-                'Daily Quantity': [0],
-                'Daily Orders': [0],
-                'Daily Revenue': [0]
-            })
+        metrics: bundle dari build_report_metrics (last_artifacts['metrics']);
+        jika kosong dihitung dari cube/income_data yang diberikan. Fungsi ini
+        hanya memformat dan menulis isi bundle.
+        output: path/file tujuan (default: objek file di memori yang dikembalikan).
+        streaming: tulis dengan constant_memory (default: otomatis untuk data besar).
+        progress: callback(tahap) sebelum tiap tahap REPORT_STEPS dan callback(None)
+        tiap potongan baris; boleh raise untuk membatalkan.
+        """
+        def step(name=None):
+            if progress is not None:
+                progress(name)
         
-        # Produk terbaik berdasarkan profit
-        top_products = (
-            unique_orders
-            .groupby('Product Name', as_index=False)
-            .agg(
-                TotalQty=('Quantity', 'sum'),
-                Revenue=('Total settlement amount', 'sum')
-            )
-            .assign(
-                Cost=lambda d: d['Product Name'].map(lambda x: self.get_product_cost(x, cost_data)),
-                Total_Cost=lambda d: d['TotalQty'] * d['Cost'],
-                Profit=lambda d: d['Revenue'] - d['Total_Cost'],
-                Profit_Margin=lambda d: (d['Profit'] / d['Revenue'] * 100).round(2)
-            )
-            .nlargest(10, 'Profit')
-        )
+        step('Agregasi')
+        if metrics is None:
+            metrics = build_report_metrics(merged_data, summary_data, cost_data, cube=cube, income_data=income_data)
+        totals = metrics['totals']
+        income_metrics = metrics['income']
         
         # Buat penulis Excel
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            workbook = writer.book
-            
+        if streaming is None:
+            streaming = use_streaming(merged_data, income_metrics['orders'] if income_metrics else None)
+        workbook, target = open_workbook(output, streaming)
+        with workbook:
             # Tentukan format
             title_format = workbook.add_format({
                 'bold': True, 'font_size': 16, 'align': 'center',
@@ -329,6 +314,7 @@ class IncomeApp:
             })
             
             # Lembar ringkasan
+            step('Ringkasan')
             overview_sheet = workbook.add_worksheet('Ringkasan')
             overview_sheet.set_column('A:B', 25)
             overview_sheet.set_column('C:C', 20)
@@ -338,16 +324,7 @@ class IncomeApp:
             row += 2
             
             # Rentang tanggal
-            if date_column and date_column in merged_data.columns:
-                try:
-                    date_range_start = pd.to_datetime(merged_data[date_column]).min()
-                    date_range_end = pd.to_datetime(merged_data[date_column]).max()
-                except:
-                    date_range_start = datetime.now()
-                    date_range_end = datetime.now()
-            else:
-                date_range_start = datetime.now()
-                date_range_end = datetime.now()
+            date_range_start, date_range_end = metrics['period'] or (datetime.now(), datetime.now())
             
             overview_sheet.write(row, 0, f'Periode:', header_format)
             overview_sheet.write(row, 1, f'{date_range_start.strftime("%d/%m/%Y")} - {date_range_end.strftime("%d/%m/%Y")}')
@@ -361,59 +338,51 @@ class IncomeApp:
             overview_sheet.write(row, 0, 'RINGKASAN PENJUALAN & PROFIT', header_format)
             row += 1
             overview_sheet.write(row, 0, 'Total Pesanan:')
-            overview_sheet.write(row, 1, total_orders, number_format)
+            overview_sheet.write(row, 1, totals['orders'], number_format)
             row += 1
             overview_sheet.write(row, 0, 'Total Kuantitas:')
-            overview_sheet.write(row, 1, total_qty, number_format)
+            overview_sheet.write(row, 1, totals['quantity'], number_format)
             row += 1
             overview_sheet.write(row, 0, 'Total Pendapatan:')
-            overview_sheet.write(row, 1, total_revenue, currency_format)
+            overview_sheet.write(row, 1, totals['revenue'], currency_format)
             row += 1
             overview_sheet.write(row, 0, 'Total Biaya:')
-            overview_sheet.write(row, 1, total_cost, currency_format)
+            overview_sheet.write(row, 1, totals['cost'], currency_format)
             row += 1
             overview_sheet.write(row, 0, 'Total Profit:')
-            overview_sheet.write(row, 1, total_profit, currency_format)
+            overview_sheet.write(row, 1, totals['profit'], currency_format)
             row += 1
             overview_sheet.write(row, 0, 'Bagian 60%:')
-            overview_sheet.write(row, 1, total_share_60, currency_format)
+            overview_sheet.write(row, 1, totals['share_60'], currency_format)
             row += 1
             overview_sheet.write(row, 0, 'Bagian 40%:')
-            overview_sheet.write(row, 1, total_share_40, currency_format)
+            overview_sheet.write(row, 1, totals['share_40'], currency_format)
             row += 2
             
-            # Hitung metrik tambahan
-            avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
-            avg_profit_per_order = total_profit / total_orders if total_orders > 0 else 0
-            overall_profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
-            
             overview_sheet.write(row, 0, 'Nilai Rata-rata Pesanan:')
-            overview_sheet.write(row, 1, avg_order_value, currency_format)
+            overview_sheet.write(row, 1, totals['avg_order_value'], currency_format)
             row += 1
             overview_sheet.write(row, 0, 'Rata-rata Profit per Pesanan:')
-            overview_sheet.write(row, 1, avg_profit_per_order, currency_format)
+            overview_sheet.write(row, 1, totals['avg_profit_per_order'], currency_format)
             row += 1
             overview_sheet.write(row, 0, 'Margin Profit Keseluruhan:')
-            overview_sheet.write(row, 1, overall_profit_margin / 100, percent_format)
+            overview_sheet.write(row, 1, totals['profit_margin'] / 100, percent_format)
             row += 2
             
             # Informasi tambahan
             overview_sheet.write(row, 0, 'INFORMASI TAMBAHAN', subtitle_format)
             row += 1
             overview_sheet.write(row, 0, 'Total SKU:')
-            overview_sheet.write(row, 1, len(summary_data), info_format)
+            overview_sheet.write(row, 1, metrics['sku_counts']['total'], info_format)
             row += 1
             overview_sheet.write(row, 0, 'SKU dengan Profit > 0:')
-            profitable_sku = len(summary_data[summary_data['Profit'] > 0])
-            overview_sheet.write(row, 1, profitable_sku, info_format)
+            overview_sheet.write(row, 1, metrics['sku_counts']['profitable'], info_format)
             row += 1
             overview_sheet.write(row, 0, 'SKU dengan Margin > 20%:')
-            high_margin_sku = len(summary_data[summary_data['Profit Margin %'] > 20])
-            overview_sheet.write(row, 1, high_margin_sku, info_format)
+            overview_sheet.write(row, 1, metrics['sku_counts']['high_margin'], info_format)
             row += 1
             overview_sheet.write(row, 0, 'SKU dengan Margin < 10%:')
-            low_margin_sku = len(summary_data[summary_data['Profit Margin %'] < 10])
-            overview_sheet.write(row, 1, low_margin_sku, info_format)
+            overview_sheet.write(row, 1, metrics['sku_counts']['low_margin'], info_format)
             row += 2
             
             # Catatan penting
@@ -432,29 +401,13 @@ class IncomeApp:
             # ANALISIS AFFILIATE VS TOKO
             # =================================================================
             
-            # Ambil data income untuk analisis affiliate
-            if 'income_data' in st.session_state and st.session_state.income_data is not None:
-                income = st.session_state.income_data
-                
-                # Refund Analysis
-                refund_df = income[income['Customer refund'] < 0]
-                refunded_ids = set(refund_df['Order/adjustment ID'].unique())
-                
-                # Affiliate vs Store Analysis
-                base = income[~income['Order/adjustment ID'].isin(refunded_ids)].copy()
-                aff = base[base['Affiliate commission'] < 0]
-                tok = base[base['Affiliate commission'] == 0]
-                
-                def calc_metrics(df):
-                    rev = df['Total settlement amount'].sum()
-                    fees = df['Total fees'].sum()
-                    pct = (fees / rev * 100) if rev > 0 else 0
-                    return len(df), fees, pct, rev
-                
-                aff_cnt, aff_fee, aff_pct, aff_rev = calc_metrics(aff)
-                tok_cnt, tok_fee, tok_pct, tok_rev = calc_metrics(tok)
+            # Metrik income (refund, affiliate, komisi) dari bundle
+            if income_metrics is not None:
+                aff = income_metrics['affiliate']
+                tok = income_metrics['store']
                 
                 # Buat lembar Analisis Affiliate vs Toko
+                step('Analisis Affiliate vs Toko')
                 affiliate_sheet = workbook.add_worksheet('Analisis Affiliate vs Toko')
                 affiliate_sheet.set_column('A:B', 30)
                 affiliate_sheet.set_column('C:D', 20)
@@ -467,14 +420,13 @@ class IncomeApp:
                 affiliate_sheet.write(row, 0, 'ANALISIS REFUND', header_format)
                 row += 1
                 affiliate_sheet.write(row, 0, 'Total Order Refund:')
-                affiliate_sheet.write(row, 1, refund_df['Order/adjustment ID'].nunique(), number_format)
+                affiliate_sheet.write(row, 1, income_metrics['refund_orders'], number_format)
                 row += 1
                 affiliate_sheet.write(row, 0, 'Total Nilai Refund:')
-                affiliate_sheet.write(row, 1, abs(refund_df['Customer refund'].sum()), currency_format)
+                affiliate_sheet.write(row, 1, income_metrics['refund_value'], currency_format)
                 row += 1
-                refund_rate = (len(refunded_ids) / income['Order/adjustment ID'].nunique() * 100) if len(income) > 0 else 0
                 affiliate_sheet.write(row, 0, 'Tingkat Refund:')
-                affiliate_sheet.write(row, 1, refund_rate / 100, percent_format)
+                affiliate_sheet.write(row, 1, income_metrics['refund_rate'] / 100, percent_format)
                 row += 2
                 
                 # Affiliate vs Store Comparison
@@ -482,6 +434,7 @@ class IncomeApp:
                 row += 1
                 
                 # Header untuk tabel perbandingan
+                channel_header_row = row
                 affiliate_sheet.write(row, 0, 'Metrik', header_format)
                 affiliate_sheet.write(row, 1, 'Order via Affiliate', header_format)
                 affiliate_sheet.write(row, 2, 'Order Toko Langsung', header_format)
@@ -489,27 +442,30 @@ class IncomeApp:
                 row += 1
                 
                 affiliate_sheet.write(row, 0, 'Jumlah Order')
-                affiliate_sheet.write(row, 1, aff_cnt, number_format)
-                affiliate_sheet.write(row, 2, tok_cnt, number_format)
-                affiliate_sheet.write(row, 3, aff_cnt + tok_cnt, number_format)
+                affiliate_sheet.write(row, 1, aff['orders'], number_format)
+                affiliate_sheet.write(row, 2, tok['orders'], number_format)
+                affiliate_sheet.write(row, 3, aff['orders'] + tok['orders'], number_format)
                 row += 1
                 
+                channel_rows = [row]
                 affiliate_sheet.write(row, 0, 'Total Revenue')
-                affiliate_sheet.write(row, 1, aff_rev, currency_format)
-                affiliate_sheet.write(row, 2, tok_rev, currency_format)
-                affiliate_sheet.write(row, 3, aff_rev + tok_rev, currency_format)
+                affiliate_sheet.write(row, 1, aff['revenue'], currency_format)
+                affiliate_sheet.write(row, 2, tok['revenue'], currency_format)
+                affiliate_sheet.write(row, 3, aff['revenue'] + tok['revenue'], currency_format)
                 row += 1
                 
+                channel_rows.append(row)
                 affiliate_sheet.write(row, 0, 'Total Fee')
-                affiliate_sheet.write(row, 1, aff_fee, currency_format)
-                affiliate_sheet.write(row, 2, tok_fee, currency_format)
-                affiliate_sheet.write(row, 3, aff_fee + tok_fee, currency_format)
+                affiliate_sheet.write(row, 1, aff['fees'], currency_format)
+                affiliate_sheet.write(row, 2, tok['fees'], currency_format)
+                affiliate_sheet.write(row, 3, aff['fees'] + tok['fees'], currency_format)
                 row += 1
                 
                 affiliate_sheet.write(row, 0, 'Rata-rata Fee %')
-                affiliate_sheet.write(row, 1, aff_pct / 100, percent_format)
-                affiliate_sheet.write(row, 2, tok_pct / 100, percent_format)
-                affiliate_sheet.write(row, 3, ((aff_fee + tok_fee) / (aff_rev + tok_rev) * 100) / 100, percent_format)
+                affiliate_sheet.write(row, 1, aff['fee_pct'] / 100, percent_format)
+                affiliate_sheet.write(row, 2, tok['fee_pct'] / 100, percent_format)
+                affiliate_sheet.write(row, 3, ((aff['fees'] + tok['fees']) / (aff['revenue'] + tok['revenue']) * 100) / 100,
+                                      percent_format)
                 row += 2
                 
                 # =================================================================
@@ -517,6 +473,7 @@ class IncomeApp:
                 # =================================================================
                 
                 # Buat lembar Breakdown Komisi & Fee
+                step('Breakdown Komisi & Fee')
                 commission_sheet = workbook.add_worksheet('Breakdown Komisi & Fee')
                 commission_sheet.set_column('A:B', 30)
                 commission_sheet.set_column('C:C', 20)
@@ -525,31 +482,25 @@ class IncomeApp:
                 commission_sheet.merge_range(f'A{row+1}:C{row+1}', 'BREAKDOWN KOMISI & FEE', title_format)
                 row += 2
                 
-                all_cols = ['Dynamic Commission', 'Affiliate commission', 'TikTok Shop commission fee']
-                available = [c for c in all_cols if c in base.columns]
-                
-                if available:
+                if income_metrics['commissions']:
                     commission_sheet.write(row, 0, 'JENIS KOMISI/FEE', header_format)
                     commission_sheet.write(row, 1, 'TOTAL (Rp)', header_format)
                     commission_sheet.write(row, 2, 'PERSENTASE', header_format)
                     row += 1
+                    fee_first_row = row
                     
-                    for col in available:
-                        total = abs(base[col].sum())
-                        percentage = (total / base['Total settlement amount'].sum() * 100) if base['Total settlement amount'].sum() > 0 else 0
-                        
+                    for col, total, percentage in income_metrics['commissions']:
                         commission_sheet.write(row, 0, col.replace('commission', 'Komisi').replace('fee', 'Fee'))
                         commission_sheet.write(row, 1, total, currency_format)
                         commission_sheet.write(row, 2, percentage / 100, percent_format)
                         row += 1
                     
-                    # Total fees
-                    total_fee_all = base['Total fees'].sum()
-                    total_percentage = (total_fee_all / base['Total settlement amount'].sum() * 100) if base['Total settlement amount'].sum() > 0 else 0
+                    fee_last_row = row - 1
                     
+                    # Total fees
                     commission_sheet.write(row, 0, 'TOTAL FEE KESELURUHAN', header_format)
-                    commission_sheet.write(row, 1, total_fee_all, currency_format)
-                    commission_sheet.write(row, 2, total_percentage / 100, percent_format)
+                    commission_sheet.write(row, 1, income_metrics['total_fees'], currency_format)
+                    commission_sheet.write(row, 2, income_metrics['total_fee_pct'] / 100, percent_format)
                 else:
                     commission_sheet.write(row, 0, 'Data breakdown komisi tidak tersedia', header_format)
                 
@@ -558,6 +509,7 @@ class IncomeApp:
                 # =================================================================
                 
                 # Buat lembar Detail Sumber Order & Fee
+                step('Detail Sumber Order & Fee')
                 order_detail_sheet = workbook.add_worksheet('Detail Sumber Order & Fee')
                 order_detail_sheet.set_column('A:A', 20)  # Order ID
                 order_detail_sheet.set_column('B:C', 15)  # Revenue columns
@@ -569,25 +521,12 @@ class IncomeApp:
                 order_detail_sheet.merge_range(f'A{row+1}:H{row+1}', 'DETAIL SUMBER ORDER & FEE', title_format)
                 row += 2
                 
-                cols_show = ['Order/adjustment ID', 'Total revenue', 'Total settlement amount', 'Total fees']
-                commission_cols = ['Dynamic Commission', 'Affiliate commission', 'TikTok Shop commission fee']
-                cols_show.extend([c for c in commission_cols if c in base.columns])
-                
-                # Prepare display data
-                aff_display = aff[cols_show].copy() if not aff.empty else pd.DataFrame()
-                tok_display = tok[cols_show].copy() if not tok.empty else pd.DataFrame()
-                
-                if not aff_display.empty:
-                    aff_display['Sumber'] = 'Affiliate'
-                if not tok_display.empty:
-                    tok_display['Sumber'] = 'Toko'
-                
-                if not aff_display.empty or not tok_display.empty:
-                    df_orders = pd.concat([aff_display, tok_display], ignore_index=True)
-                    
+                df_orders = income_metrics['orders']
+                available_commissions = income_metrics['commission_columns']
+                if df_orders is not None:
                     # Write headers
                     headers = ['Order ID', 'Total Revenue', 'Settlement Amount', 'Total Fees']
-                    commission_headers = [c.replace('commission', 'Komisi').replace('fee', 'Fee') for c in commission_cols if c in base.columns]
+                    commission_headers = [c.replace('commission', 'Komisi').replace('fee', 'Fee') for c in available_commissions]
                     headers.extend(commission_headers)
                     headers.append('Sumber')
                     
@@ -595,53 +534,68 @@ class IncomeApp:
                         order_detail_sheet.write(row, i, header, header_format)
                     row += 1
                     
-                    # Write data
-                    for _, order_row in df_orders.iterrows():
-                        col = 0
-                        order_detail_sheet.write(row, col, order_row['Order/adjustment ID'])
-                        col += 1
-                        order_detail_sheet.write(row, col, order_row['Total revenue'], currency_format)
-                        col += 1
-                        order_detail_sheet.write(row, col, order_row['Total settlement amount'], currency_format)
-                        col += 1
-                        order_detail_sheet.write(row, col, order_row['Total fees'], currency_format)
-                        col += 1
-                        
-                        # Commission columns
-                        for comm_col in commission_cols:
-                            if comm_col in order_row:
-                                order_detail_sheet.write(row, col, abs(order_row[comm_col]), currency_format)
-                            col += 1
-                        
-                        order_detail_sheet.write(row, col, order_row['Sumber'])
-                        row += 1
+                    # Write data: per baris dari array kolom (tanpa iterrows)
+                    order_detail_sheet.set_column(1, 3 + len(available_commissions), None, currency_format)
+                    columns = [
+                        df_orders['Order/adjustment ID'],
+                        df_orders['Total revenue'],
+                        df_orders['Total settlement amount'],
+                        df_orders['Total fees'],
+                    ]
+                    columns.extend(df_orders[c].abs() for c in available_commissions)
+                    columns.append(df_orders['Sumber'])
+                    row = write_rows(order_detail_sheet, row, columns, on_chunk=step)
                 else:
                     order_detail_sheet.write(row, 0, 'Tidak ada data order yang tersedia', header_format)
             
             # Tulis lembar lainnya
-            summary_data.to_excel(writer, index=False, sheet_name='Ringkasan per Produk')
-            summary_by_sku.to_excel(writer, index=False, sheet_name='Ringkasan per SKU')
-            daily_sales.to_excel(writer, index=False, sheet_name='Penjualan Harian')
-            top_products.to_excel(writer, index=False, sheet_name='Produk Teratas')
+            for sheet_name, frame in (
+                ('Ringkasan per Produk', summary_data),
+                ('Ringkasan per SKU', metrics['summary_by_sku']),
+                ('Penjualan Harian', metrics['daily_sales']),
+                ('Produk Teratas', metrics['top_products']),
+            ):
+                step(sheet_name)
+                write_frame(workbook, sheet_name, frame, header_format, on_chunk=step)
             
             # Daftar biaya produk
             if cost_data:
+                step('Daftar Biaya Produk')
                 cost_df = pd.DataFrame(list(cost_data.items()), columns=["Product Name", "Cost per Unit"])
                 cost_df = cost_df.sort_values(by="Product Name")
-                cost_df.to_excel(writer, index=False, sheet_name='Daftar Biaya Produk')
+                write_frame(workbook, 'Daftar Biaya Produk', cost_df, header_format, on_chunk=step)
+            
+            # Grafik native Excel dari rentang lembar di atas (tanpa gambar)
+            if REPORT_CONFIG.get("charts", True):
+                step('Grafik')
+                daily_sales = metrics['daily_sales']
+                if 'Daily_Revenue' in daily_sales.columns:
+                    add_daily_revenue_chart(
+                        workbook, 'Penjualan Harian', len(daily_sales),
+                        daily_sales.columns.get_loc('Order Date'), daily_sales.columns.get_loc('Daily_Revenue')
+                    )
+                top_products = metrics['top_products']
+                if not top_products.empty:
+                    add_top_products_chart(
+                        workbook, 'Produk Teratas', len(top_products), top_products.columns.get_loc('Product Name'),
+                        {name: top_products.columns.get_loc(name) for name in ('Revenue', 'Profit')}
+                    )
+                if income_metrics is not None:
+                    if income_metrics['commissions']:
+                        add_fee_breakdown_chart(workbook, 'Breakdown Komisi & Fee', fee_first_row, fee_last_row)
+                    add_channel_chart(workbook, 'Analisis Affiliate vs Toko', channel_header_row, channel_rows)
         
-        output.seek(0)
-        return output
+        if output is None:
+            target.seek(0)
+        return target
 
-    def generate_ai_summary(self, summary_df):
-        """Generate AI summary untuk ChatGPT"""
-        if st.session_state.merged_data is None:
+    def generate_ai_summary(self, summary_df, metrics):
+        """Generate AI summary untuk ChatGPT (total dari bundle metrik yang sama dengan laporan)"""
+        if metrics is None:
             return "Data belum diproses."
 
-        unique_orders = st.session_state.merged_data.drop_duplicates(subset=['Order ID'])
-        total_r = unique_orders['Total settlement amount'].sum()
-        total_cost = summary_df['Total Cost'].sum()
-        total_p = total_r - total_cost
+        total_r = metrics['totals']['revenue']
+        total_p = metrics['totals']['profit']
         avg_m = summary_df['Profit Margin %'].mean()
 
         top = summary_df.nlargest(5, 'Profit')[['Product Name', 'Profit', 'Profit Margin %']]
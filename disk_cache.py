@@ -0,0 +1,48 @@
+import os
+
+
+def write_entry(cache_dir, path, write, max_bytes, suffix):
+    """Tulis satu entri cache secara atomik lalu jalankan eviction LRU
+
+    write(tmp_path) menulis isi ke file sementara; file baru menggantikan
+    entri lama lewat os.replace sehingga pembaca tidak melihat file setengah
+    jadi. Mengembalikan False jika penulisan gagal (cache dilewati).
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    evict_lru(cache_dir, max_bytes, suffix)
+    return True
+
+
+def evict_lru(cache_dir, max_bytes, suffix):
+    """Hapus file `suffix` paling lama dipakai (mtime) sampai total ukuran di bawah batas"""
+    if not os.path.isdir(cache_dir):
+        return
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(suffix):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
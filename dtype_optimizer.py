@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+from config import DTYPE_CONFIG
+
+# Batas integer yang masih aman di float64 tanpa kehilangan presisi
+_FLOAT_SAFE_INT = 2 ** 53
+
+
+def memory_bytes(df):
+    """Ukuran DataFrame di memori (deep, termasuk isi string)"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _is_text(series):
+    return series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+
+
+def _to_id(series):
+    """ID ke int64 jika semua nilai angka bulat, selain itu ke string ringkas"""
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return series if series.isna().any() else series.astype('int64')
+
+    if pd.api.types.is_float_dtype(series.dtype):
+        values = series.dropna()
+        if np.array_equal(values, np.round(values)):
+            return series.astype('Int64')
+        return series
+
+    text = series.astype('string').str.strip()
+    present = text.dropna()
+    if len(present) and present.str.fullmatch(r'-?\d{1,18}').all():
+        numbers = pd.to_numeric(text, errors='coerce')
+        return numbers.astype('Int64') if numbers.isna().any() else numbers.astype('int64')
+    return text
+
+
+def _to_datetime(series, fmt):
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series
+    parsed = pd.to_datetime(series, format=fmt, errors='coerce')
+    # Hanya dipakai jika semua nilai terisi berhasil di-parse
+    if parsed.notna().sum() == series.notna().sum():
+        return parsed
+    return series
+
+
+def _to_compact_number(series):
+    """Angka float ke int64 jika semuanya bulat, atau float32 jika tidak ada nilai yang berubah"""
+    values = series.to_numpy()
+    finite = np.isfinite(values)
+    if finite.all() and np.array_equal(values, np.round(values)) and np.abs(values).max(initial=0) < _FLOAT_SAFE_INT:
+        return series.astype('int64')
+    as_float32 = values.astype('float32')
+    if np.array_equal(as_float32.astype('float64'), values, equal_nan=True):
+        return series.astype('float32')
+    return series
+
+
+def optimize_dtypes(df):
+    """Normalisasi tipe kolom supaya hemat memori
+
+    ID -> int64/string, teks berulang -> category, tanggal -> datetime64,
+    angka float -> int64/float32 jika tidak ada nilai yang berubah.
+    Laporan ukuran sebelum/sesudah disimpan di df.attrs["dtype_report"].
+    """
+    before = memory_bytes(df)
+    if not DTYPE_CONFIG["enabled"]:
+        df.attrs["dtype_report"] = {"before": before, "after": before}
+        return df
+
+    out = df.copy()
+    id_columns = set(DTYPE_CONFIG["id_columns"])
+    date_formats = DTYPE_CONFIG["date_formats"]
+    max_ratio = DTYPE_CONFIG["category_max_ratio"]
+
+    for col in out.columns:
+        series = out[col]
+        if col in id_columns:
+            out[col] = _to_id(series)
+        elif col in date_formats:
+            out[col] = _to_datetime(series, date_formats[col])
+        elif pd.api.types.is_float_dtype(series.dtype):
+            out[col] = _to_compact_number(series)
+        elif _is_text(series) and len(series) > 0:
+            if series.nunique(dropna=True) <= max_ratio * len(series):
+                out[col] = series.astype('category')
+            else:
+                out[col] = series.astype('string')
+
+    out.attrs["dtype_report"] = {"before": before, "after": memory_bytes(out)}
+    return out
+
+
+def describe_memory(df):
+    """Teks singkat penghematan memori untuk ditampilkan di UI"""
+    report = df.attrs.get("dtype_report")
+    if not report:
+        return ""
+    before_mb = report["before"] / 1024 / 1024
+    after_mb = report["after"] / 1024 / 1024
+    saved = (1 - report["after"] / report["before"]) * 100 if report["before"] > 0 else 0
+    return f"🧠 Memori: {before_mb:,.2f} MB → {after_mb:,.2f} MB ({saved:.0f}% lebih hemat)"
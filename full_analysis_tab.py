@@ -3,6 +3,8 @@ import pandas as pd
 import plotly.express as px
 from datetime import datetime
 from data_processor import IncomeApp
+from analysis_cube import build_cube, slice_cube
+from costing import build_cost_table
 
 # Fungsi utama untuk tab Analisis Lengkap
 
@@ -14,56 +16,52 @@ def show_full_analysis_tab():
     summary_new = st.session_state.get("summary_data")
     summary_old = st.session_state.get("old_summary")
 
+    # Cube agregasi dari process_data (dibangun ulang hanya jika belum ada)
+    def get_cube(slot, merged_slot):
+        cache = st.session_state.get("process_cache")
+        cube = cache.artifacts(slot).get("cube") if cache is not None else None
+        if cube is None and merged_slot is not None:
+            cube = build_cube(merged_slot, build_cost_table(st.session_state.get("cost_data")))
+        return cube
+
     # Gabungkan data lama+baru jika mode Compare, jika tidak pakai data baru saja
     if mode == "Compare Lama vs Baru" and merged_old is not None and merged_new is not None:
-        merged = pd.concat([merged_old, merged_new], ignore_index=True)
+        cube = pd.concat([get_cube("lama", merged_old), get_cube("baru", merged_new)], ignore_index=True)
         if summary_old is not None and summary_new is not None:
             summary = pd.concat([summary_old, summary_new], ignore_index=True)
         else:
             summary = summary_new
     elif merged_new is not None:
-        merged = merged_new.copy()
+        cube = get_cube("baru", merged_new)
         summary = summary_new
     else:
-        merged = None
+        cube = None
         summary = None
 
-    if merged is None or merged.empty:
+    if cube is None or cube.empty:
         st.info("ℹ️ Silakan proses dan upload data terlebih dahulu.")
         return
 
-    # --- Otomatis deteksi kolom tanggal, produk, qty ---
-    possible_date_cols = [
-        'Order created time(UTC)', 'Order creation time', 'Order Creation Time', 
-        'Creation Time', 'Date', 'Order Date', 'Order created time', 'Created time'
-    ]
-    date_col = next((col for col in possible_date_cols if col in merged.columns), None)
-    if date_col:
-        merged['Order Date'] = pd.to_datetime(merged[date_col]).dt.date
-    else:
-        merged['Order Date'] = None
-
-    product_col = 'Product Name' if 'Product Name' in merged.columns else None
-    qty_col = 'Quantity' if 'Quantity' in merged.columns else None
-    if not qty_col:
-        merged['Qty'] = 1
-        qty_col = 'Qty'
-    var_col = 'Variation' if 'Variation' in merged.columns else None
+    product_col = 'Product Name'
+    qty_col = 'Quantity'
+    has_dates = cube['Order Date'].notna().any()
+    by_product = slice_cube(cube, product_col, [qty_col])
+    by_date_product = slice_cube(cube, ['Order Date', product_col], [qty_col]) if has_dates else None
+    if by_date_product is not None:
+        by_date_product['Order Date'] = by_date_product['Order Date'].dt.date
 
     # PIE CHART: Penjualan per Produk
     st.markdown("### 🥧 Distribusi Penjualan per Produk")
-    if product_col and qty_col:
-        pie_df = merged.groupby(product_col)[qty_col].sum().reset_index()
-        fig_pie = px.pie(pie_df, names=product_col, values=qty_col, title='Proporsi Penjualan per Produk')
+    if not by_product.empty:
+        fig_pie = px.pie(by_product, names=product_col, values=qty_col, title='Proporsi Penjualan per Produk')
         st.plotly_chart(fig_pie, use_container_width=True)
     else:
         st.warning('Kolom produk/qty tidak ditemukan di data.')
 
     # TIMELINE: Produk terjual per hari
     st.markdown("### 📅 Timeline Penjualan Harian")
-    if product_col and qty_col and merged['Order Date'].notnull().all():
-        timeline_group = merged.groupby(['Order Date', product_col])[qty_col].sum().reset_index()
-        fig_timeline = px.line(timeline_group, x='Order Date', y=qty_col, color=product_col, markers=True,
+    if by_date_product is not None and not by_date_product.empty:
+        fig_timeline = px.line(by_date_product, x='Order Date', y=qty_col, color=product_col, markers=True,
                                title='Timeline Penjualan per Produk')
         st.plotly_chart(fig_timeline, use_container_width=True)
     else:
@@ -71,17 +69,16 @@ def show_full_analysis_tab():
 
     # TABEL: Produk Terlaris
     st.markdown("### 🏆 Produk Terlaris")
-    if product_col and qty_col:
-        top_products = merged.groupby(product_col)[qty_col].sum().reset_index().sort_values(qty_col, ascending=False)
+    if not by_product.empty:
+        top_products = by_product.sort_values(qty_col, ascending=False)
         st.dataframe(top_products, use_container_width=True)
     else:
         st.warning('Kolom produk/qty tidak ditemukan di data.')
 
     # TABEL: Detail Penjualan per Produk per Tanggal
     st.markdown("### 📋 Detail Penjualan per Produk per Tanggal")
-    if product_col and qty_col and merged['Order Date'].notnull().all():
-        detail_table = merged.groupby(['Order Date', product_col])[qty_col].sum().reset_index()
-        st.dataframe(detail_table, use_container_width=True)
+    if by_date_product is not None and not by_date_product.empty:
+        st.dataframe(by_date_product, use_container_width=True)
     else:
         st.warning('Kolom tanggal/produk/qty tidak ditemukan di data.')
 
@@ -136,11 +133,11 @@ def show_full_analysis_tab():
     produk_pilihan = st.selectbox("Pilih produk untuk prediksi", ["(Total Semua Produk)"] + produk_list)
     periode = st.selectbox("Pilih periode prediksi", ["Bulanan", "Mingguan"])
 
-    if product_col and qty_col and merged['Order Date'].notnull().all():
-        df_pred = merged.copy()
+    if has_dates:
+        df_pred = cube[cube['Order Date'].notna()]
         if produk_pilihan != "(Total Semua Produk)":
             df_pred = df_pred[df_pred[product_col] == produk_pilihan]
-        df_pred['Order Date'] = pd.to_datetime(df_pred['Order Date'])
+        df_pred = df_pred[['Order Date', qty_col]].copy()
         if periode == "Bulanan":
             df_pred['Periode'] = df_pred['Order Date'].dt.to_period('M').dt.to_timestamp()
         else:
@@ -0,0 +1,335 @@
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from operator import itemgetter
+import numpy as np
+import pandas as pd
+from config import ANALYSIS_COLUMNS, DTYPE_CONFIG, INGEST_CACHE_CONFIG, INGEST_CONFIG
+from disk_cache import write_entry, evict_lru
+from dtype_optimizer import optimize_dtypes, describe_memory
+
+# Naikkan versi ini jika cara parse berubah supaya cache lama tidak terpakai
+INGEST_CACHE_VERSION = 3
+
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Engine pandas.read_excel -> modul Python yang dibutuhkan
+ENGINE_MODULES = {
+    "calamine": "python_calamine",
+    "openpyxl": "openpyxl",
+    "xlrd": "xlrd",
+}
+
+# Kolom teks hasil streaming disimpan sebagai string Arrow jika pyarrow ada
+STRING_DTYPE = pd.StringDtype("pyarrow") if PARQUET_AVAILABLE else object
+
+# Salinan di memori untuk file yang baru dipakai, supaya rerun Streamlit
+# mendapat objek DataFrame yang sama tanpa membaca disk
+_MEMORY_CACHE = OrderedDict()
+_MEMORY_CACHE_SIZE = 8
+
+
+def _read_file_bytes(file):
+    """Ambil isi file upload / path / file-like sebagai bytes"""
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            return f.read()
+    if hasattr(file, 'getvalue'):
+        return file.getvalue()
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    return file.read()
+
+
+def _cache_path(key):
+    return os.path.join(INGEST_CACHE_CONFIG["dir"], f"{key}.parquet")
+
+
+def _cache_get(key):
+    """Baca frame dari cache Parquet (None jika tidak ada)"""
+    if not PARQUET_AVAILABLE:
+        return None
+    path = _cache_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path)
+        # Sentuh mtime supaya file ini dianggap baru dipakai (LRU)
+        os.utime(path, None)
+        return df
+    except Exception:
+        return None
+
+
+def _cache_put(key, df):
+    """Simpan frame ke cache Parquet lalu jalankan eviction"""
+    if not PARQUET_AVAILABLE:
+        return
+    # Kolom dengan tipe campuran tidak bisa ditulis ke Parquet; write_entry melewati cache
+    write_entry(INGEST_CACHE_CONFIG["dir"], _cache_path(key),
+                lambda path: df.to_parquet(path, index=False), _max_bytes(), '.parquet')
+
+
+def _max_bytes():
+    return INGEST_CACHE_CONFIG["max_mb"] * 1024 * 1024
+
+
+def evict_cache(max_bytes=None):
+    """Hapus file cache paling lama dipakai sampai total ukuran di bawah batas"""
+    evict_lru(INGEST_CACHE_CONFIG["dir"], _max_bytes() if max_bytes is None else max_bytes, '.parquet')
+
+
+def clear_memory_cache():
+    """Kosongkan salinan di memori (cache Parquet di disk tetap ada)"""
+    _MEMORY_CACHE.clear()
+
+
+def available_engines():
+    """Daftar engine Excel dari INGEST_CONFIG yang modulnya terpasang"""
+    return [
+        engine for engine in INGEST_CONFIG["engines"]
+        if engine in ENGINE_MODULES and importlib.util.find_spec(ENGINE_MODULES[engine]) is not None
+    ]
+
+
+def _projection(kind):
+    """Kolom yang dibaca untuk jenis file ini (None = semua kolom)"""
+    if not INGEST_CONFIG["prune_columns"]:
+        return None
+    return sorted(ANALYSIS_COLUMNS[kind])
+
+
+def _parse_excel(data, kind, skip_units_row):
+    """Parse bytes Excel dengan engine tercepat yang tersedia, fallback ke engine berikutnya"""
+    columns = _projection(kind)
+    usecols = None
+    if columns is not None:
+        wanted = set(columns)
+        usecols = lambda c: str(c).strip() in wanted
+
+    last_error = None
+    for engine in available_engines():
+        try:
+            start = time.perf_counter()
+            # Export pesanan punya baris deskripsi kolom tepat di bawah header
+            df = pd.read_excel(
+                io.BytesIO(data),
+                header=0,
+                skiprows=[1] if skip_units_row else None,
+                usecols=usecols,
+                engine=engine
+            )
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            last_error = e
+            continue
+        df.columns = [str(c).strip() for c in df.columns]
+        return df, engine, elapsed
+
+    if last_error is not None:
+        raise last_error
+    raise ValueError("Tidak ada engine Excel yang tersedia (pasang python-calamine atau openpyxl)")
+
+
+def _is_blank(value):
+    return value is None or (isinstance(value, str) and value.strip() == '')
+
+
+def _typed_chunk(values):
+    """Ubah satu potongan nilai kolom menjadi array bertipe (angka, tanggal, atau teks)"""
+    values = [None if _is_blank(v) else v for v in values]
+    present = [v for v in values if v is not None]
+    if not present:
+        return np.full(len(values), np.nan)
+
+    if all(isinstance(v, datetime) for v in present):
+        return pd.to_datetime(pd.Series(values, dtype=object)).to_numpy()
+
+    try:
+        numbers = pd.to_numeric(pd.Series(present, dtype=object))
+    except (ValueError, TypeError):
+        numbers = None
+    if numbers is not None:
+        if numbers.dtype.kind in 'iu' and numbers.between(-2 ** 63, 2 ** 63 - 1).all():
+            # ID 18-19 digit harus tetap integer, float64 akan kehilangan presisi
+            if len(present) == len(values):
+                return numbers.to_numpy(dtype='int64')
+            return pd.array(values, dtype='Int64')
+        if numbers.dtype.kind in 'iuf':
+            return pd.to_numeric(pd.Series(values, dtype=object)).to_numpy(dtype='float64')
+
+    return pd.array([None if v is None else str(v).strip() for v in values], dtype=STRING_DTYPE)
+
+
+def _finish_column(chunks):
+    """Gabungkan potongan array satu kolom menjadi satu kolom bertipe"""
+    def is_null(c):
+        return isinstance(c, np.ndarray) and c.dtype == np.float64 and np.isnan(c).all()
+
+    def is_int(c):
+        return (isinstance(c, np.ndarray) and c.dtype == np.int64) or str(getattr(c, 'dtype', '')) == 'Int64'
+
+    def is_float(c):
+        return isinstance(c, np.ndarray) and c.dtype == np.float64
+
+    if not chunks:
+        return np.array([], dtype='float64')
+    if all(is_int(c) or is_null(c) for c in chunks) and any(is_int(c) for c in chunks):
+        parts = [pd.array(c, dtype='Int64') if not is_null(c) else pd.array([None] * len(c), dtype='Int64') for c in chunks]
+        merged = pd.concat([pd.Series(p) for p in parts], ignore_index=True)
+        return merged.astype('int64') if merged.notna().all() else merged
+    if all(is_int(c) or is_float(c) for c in chunks):
+        return np.concatenate([np.asarray(c, dtype='float64') for c in chunks])
+
+    series = pd.concat([pd.Series(c) for c in chunks], ignore_index=True)
+    if all(is_null(c) or str(getattr(c, 'dtype', '')) == str(STRING_DTYPE) for c in chunks):
+        return series.astype(STRING_DTYPE)
+    return series
+
+
+def stream_excel(data, kind, skip_units_row, chunk_size=None):
+    """Baca sheet pertama baris demi baris (openpyxl read-only), hanya kolom yang diproyeksikan
+
+    Baris dikumpulkan per potongan lalu langsung diubah ke array bertipe, sehingga
+    memori puncak mengikuti jumlah kolom yang dipakai, bukan lebar file export.
+    """
+    from openpyxl import load_workbook
+
+    chunk_size = chunk_size or INGEST_CONFIG["stream_chunk_rows"]
+    columns = _projection(kind)
+    start = time.perf_counter()
+
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(c).strip() if c is not None else '' for c in next(rows, ())]
+        if columns is None:
+            names = [h for h in header if h]
+        else:
+            wanted = set(columns)
+            names = [h for h in header if h in wanted]
+        positions = [header.index(name) for name in names]
+        if skip_units_row:
+            next(rows, None)
+
+        pick = itemgetter(*positions) if len(positions) > 1 else (lambda row: (row[positions[0]],))
+        width = max(positions) + 1 if positions else 0
+        chunks = {name: [] for name in names}
+        buffer = []
+
+        def flush():
+            for name, values in zip(names, zip(*buffer)):
+                chunks[name].append(_typed_chunk(values))
+            buffer.clear()
+
+        for row in rows:
+            if not positions:
+                break
+            if len(row) < width:
+                row = tuple(row) + (None,) * (width - len(row))
+            values = pick(row)
+            if all(_is_blank(v) for v in values):
+                continue
+            buffer.append(values)
+            if len(buffer) >= chunk_size:
+                flush()
+        if buffer:
+            flush()
+    finally:
+        workbook.close()
+
+    df = pd.DataFrame({name: _finish_column(chunks[name]) for name in names})
+    return df, "openpyxl-stream", time.perf_counter() - start
+
+
+def _use_streaming(data, file_name):
+    """Tentukan apakah file dibaca dengan mode streaming"""
+    reader = INGEST_CONFIG["reader"]
+    if file_name and not file_name.lower().endswith('.xlsx'):
+        return False
+    if reader == "stream":
+        return True
+    if reader == "auto":
+        return len(data) >= INGEST_CONFIG["stream_threshold_mb"] * 1024 * 1024
+    return False
+
+
+def _set_stats(df, source, engine, seconds):
+    rows = len(df)
+    df.attrs["ingest_stats"] = {
+        "source": source,
+        "engine": engine,
+        "seconds": seconds,
+        "rows": rows,
+        "columns": len(df.columns),
+        "rows_per_sec": rows / seconds if seconds > 0 else 0.0,
+    }
+
+
+def describe_load(df):
+    """Teks singkat statistik parse file untuk ditampilkan di UI"""
+    stats = df.attrs.get("ingest_stats")
+    if not stats:
+        return ""
+    if stats["source"] != "excel":
+        text = f"⚡ Dari cache {stats['source']} · {stats['seconds']:.2f} dtk"
+    else:
+        text = (
+            f"⏱️ {stats['engine']} · {stats['seconds']:.2f} dtk · "
+            f"{stats['rows_per_sec']:,.0f} baris/dtk · {stats['columns']} kolom"
+        )
+    memory = describe_memory(df)
+    return f"{text} · {memory}" if memory else text
+
+
+def _load_excel(file, kind, skip_units_row):
+    start = time.perf_counter()
+    data = _read_file_bytes(file)
+    digest = hashlib.sha256(data).hexdigest()
+    streaming = _use_streaming(data, getattr(file, 'name', str(file)))
+    # Pengaturan yang memengaruhi hasil parse: kolom, normalisasi tipe, dan cara baca
+    settings = json.dumps({
+        'columns': _projection(kind),
+        'dtypes': DTYPE_CONFIG,
+        'reader': 'stream' if streaming else available_engines(),
+    }, sort_keys=True, default=str)
+    settings_hash = hashlib.sha256(settings.encode("utf-8")).hexdigest()[:12]
+    key = f"{kind}-v{INGEST_CACHE_VERSION}-{settings_hash}-{digest}"
+
+    if key in _MEMORY_CACHE:
+        _MEMORY_CACHE.move_to_end(key)
+        df = _MEMORY_CACHE[key]
+        _set_stats(df, "memori", None, time.perf_counter() - start)
+        return df
+
+    df = _cache_get(key)
+    if df is not None:
+        _set_stats(df, "parquet", None, time.perf_counter() - start)
+    else:
+        if streaming:
+            df, engine, elapsed = stream_excel(data, kind, skip_units_row)
+        else:
+            df, engine, elapsed = _parse_excel(data, kind, skip_units_row)
+        df = optimize_dtypes(df)
+        _set_stats(df, "excel", engine, elapsed)
+        _cache_put(key, df)
+
+    _MEMORY_CACHE[key] = df
+    while len(_MEMORY_CACHE) > _MEMORY_CACHE_SIZE:
+        _MEMORY_CACHE.popitem(last=False)
+    return df
+
+
+def load_pesanan(file):
+    """Load file Excel pesanan (engine tercepat + cache berbasis SHA-256 isi file)"""
+    return _load_excel(file, "pesanan", skip_units_row=True)
+
+
+def load_income(file):
+    """Load file Excel income (engine tercepat + cache berbasis SHA-256 isi file)"""
+    return _load_excel(file, "income", skip_units_row=False)
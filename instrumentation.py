@@ -0,0 +1,85 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import psutil
+    _PROCESS = psutil.Process()
+except ImportError:
+    _PROCESS = None
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss_bytes():
+    """Memori resident proses saat ini (None jika tidak bisa dibaca di OS ini)"""
+    if _PROCESS is not None:
+        return _PROCESS.memory_info().rss
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _rows(obj):
+    return len(obj) if obj is not None and hasattr(obj, '__len__') else obj
+
+
+class RunTrace:
+    """Jejak satu run: durasi, jumlah baris masuk/keluar, dan selisih memori per tahap"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.stages = []
+        self.metrics = {}
+        self.warnings = []
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Ukur satu tahap; isi record['rows_out'] di dalam blok (DataFrame atau angka)"""
+        record = {'stage': name, 'rows_in': _rows(rows_in), 'rows_out': None}
+        mem_before = rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = round(time.perf_counter() - start, 6)
+            mem_after = rss_bytes()
+            record['memory_delta_mb'] = (
+                round((mem_after - mem_before) / 1024 / 1024, 2)
+                if mem_before is not None and mem_after is not None else None
+            )
+            record['rows_out'] = _rows(record['rows_out'])
+            self.stages.append(record)
+
+    def metric(self, key, value):
+        """Simpan angka ringkasan run (mis. total revenue per tahap untuk rekonsiliasi)"""
+        self.metrics[key] = value.item() if hasattr(value, 'item') else value
+
+    def warn(self, message):
+        self.warnings.append(message)
+
+    @property
+    def total_seconds(self):
+        return sum(record['seconds'] for record in self.stages)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'started_at': self.started_at,
+            'total_seconds': round(self.total_seconds, 6),
+            'stages': self.stages,
+            'metrics': self.metrics,
+            'warnings': self.warnings,
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, ensure_ascii=False, default=str)
+
+    def describe(self):
+        """Satu baris ringkasan durasi tiap tahap"""
+        return ", ".join(f"{r['stage']} {r['seconds'] * 1000:.0f}ms" for r in self.stages)
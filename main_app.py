@@ -1,12 +1,14 @@
 import streamlit as st
 import pandas as pd
-import json
-import os
 from datetime import datetime, timedelta
 
 # Import modul-modul yang sudah dibuat
-from config import PAGE_CONFIG, CUSTOM_CSS, get_google_credentials
+from config import PAGE_CONFIG, CUSTOM_CSS, REPORT_CONFIG, get_google_credentials
 from data_processor import IncomeApp
+from process_cache import ProcessCache
+from report_cache import report_key, cached_report
+from report_jobs import get_report_worker
+from cost_store import get_cost_store
 from ui_components import show_header, show_sidebar_status, show_data_upload_section, show_metrics_dashboard, show_cost_management
 from tabs import show_dashboard_tab, show_cost_management_tab, show_analytics_tab, show_detail_data_tab, show_compare_data_tab
 
@@ -24,6 +26,14 @@ def initialize_session_state():
         st.session_state.summary_data = None
     if 'mode' not in st.session_state:
         st.session_state.mode = "Single Data"
+    if 'process_cache' not in st.session_state:
+        st.session_state.process_cache = ProcessCache()
+
+def process_cached(app, slot, pesanan_data, income_data):
+    """Proses data lewat cache, hanya dihitung ulang jika input berubah"""
+    return st.session_state.process_cache.get_or_process(
+        slot, app, pesanan_data, income_data, st.session_state.cost_data, app.cost_history, app.variant_costs
+    )
 
 def process_data_logic():
     """Logika untuk memproses data sesuai mode"""
@@ -36,30 +46,134 @@ def process_data_logic():
         # 1. Data lama (checkpoint) – hanya dipakai di tab Compare
         if ("old_pesanan_data" in st.session_state and "old_income_data" in st.session_state and
             st.session_state.old_pesanan_data is not None and st.session_state.old_income_data is not None):
-            st.session_state.old_merged, st.session_state.old_summary = app.process_data(
+            st.session_state.old_merged, st.session_state.old_summary = process_cached(
+                app, "lama",
                 st.session_state.old_pesanan_data,
-                st.session_state.old_income_data,
-                st.session_state.cost_data
+                st.session_state.old_income_data
             )
         # 2. Data baru (fresh) – dipakai semua tab utama
         if ("pesanan_data" in st.session_state and "income_data" in st.session_state and
             st.session_state.pesanan_data is not None and st.session_state.income_data is not None):
-            st.session_state.merged_data, st.session_state.summary_data = app.process_data(
+            st.session_state.merged_data, st.session_state.summary_data = process_cached(
+                app, "baru",
                 st.session_state.pesanan_data,
-                st.session_state.income_data,
-                st.session_state.cost_data
+                st.session_state.income_data
             )
     else:  # Single Data
         if ("pesanan_data" in st.session_state and "income_data" in st.session_state and
             st.session_state.pesanan_data is not None and st.session_state.income_data is not None):
-            st.session_state.merged_data, st.session_state.summary_data = app.process_data(
+            st.session_state.merged_data, st.session_state.summary_data = process_cached(
+                app, "baru",
                 st.session_state.pesanan_data,
-                st.session_state.income_data,
-                st.session_state.cost_data
+                st.session_state.income_data
             )
     
     return app
 
+def show_trace_warnings(slot):
+    """Tampilkan alasan proses berhenti (dari trace process_data)"""
+    trace = st.session_state.process_cache.artifacts(slot).get("trace")
+    if trace is not None:
+        for message in trace.warnings:
+            st.caption(f"⚠️ {message}")
+
+def show_performance_panel(cache):
+    """Panel durasi, jumlah baris, dan memori per tahap process_data terakhir"""
+    traces = {slot: cache.artifacts(slot).get("trace") for slot in ("baru", "lama")}
+    traces = {slot: trace for slot, trace in traces.items() if trace is not None}
+    if not traces:
+        return
+    
+    with st.expander("⏱️ Performance", expanded=False):
+        for slot, trace in traces.items():
+            st.markdown(f"**Data {slot}** · {trace.total_seconds * 1000:,.0f} ms · {trace.started_at}")
+            st.dataframe(
+                pd.DataFrame(trace.stages)[['stage', 'seconds', 'rows_in', 'rows_out', 'memory_delta_mb']],
+                use_container_width=True,
+                hide_index=True
+            )
+            if trace.metrics:
+                st.json(trace.metrics, expanded=False)
+            st.download_button(
+                label=f"📄 Unduh trace {slot} (JSON)",
+                data=trace.to_json(),
+                file_name=f"trace_{slot}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json",
+                key=f"trace_download_{slot}",
+                use_container_width=True
+            )
+
+def submit_report(app):
+    """Kirim pembuatan laporan ke worker latar; data yang sama memakai job/hasil yang sudah ada"""
+    merged = st.session_state.merged_data
+    summary = st.session_state.summary_data
+    cost_data = dict(st.session_state.cost_data)
+    income = st.session_state.get("income_data")
+    metrics = st.session_state.process_cache.artifacts("baru").get("metrics")
+    key = report_key(merged, summary, cost_data, income)
+    
+    def build(job):
+        # Berjalan di thread worker: semua input diteruskan, tidak membaca st.session_state.
+        # Laporan yang sama (data, biaya, versi template) diambil dari cache disk.
+        data, job.cached = cached_report(key, lambda: app.create_excel_report(
+            merged, summary, cost_data, income_data=income, metrics=metrics, progress=job.checkpoint
+        ).read())
+        return data
+    
+    get_report_worker().submit(key, build)
+    st.session_state.report_key = key
+
+def _report_progress(key):
+    """Progres dan tombol batal selama job laporan masih berjalan"""
+    worker = get_report_worker()
+    job = worker.get(key)
+    if job is None or not job.active:
+        # Job selesai: satu rerun penuh supaya hasilnya tampil tanpa polling lagi
+        st.rerun()
+        return
+    st.progress(job.progress, text=f"⏳ Menyusun laporan: {job.stage or 'menunggu antrean'}")
+    if st.button("❌ Batalkan Laporan", key="cancel_report", use_container_width=True):
+        worker.cancel(key)
+        st.rerun()
+
+def _report_result(job):
+    """Tombol unduh atau status akhir job laporan"""
+    if job.status == "done":
+        st.download_button(
+            label="💾 Unduh Excel",
+            data=job.result,
+            file_name=f"income_report_{datetime.fromtimestamp(job.finished_at).strftime('%Y%m%d_%H%M%S')}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            key="download_report",
+            use_container_width=True
+        )
+        source = "dari cache" if job.cached else f"{job.seconds:.1f} detik"
+        st.caption(f"✅ Laporan siap ({source}, {len(job.result) / 1024:,.0f} KB)")
+    elif job.status == "cancelled":
+        st.info("ℹ️ Pembuatan laporan dibatalkan")
+    else:
+        st.error(f"Kesalahan: {job.error}")
+
+# Selama job aktif, progres diperbarui otomatis tiap poll_seconds (st.fragment);
+# versi Streamlit lama memakai tombol perbarui manual
+if hasattr(st, "fragment"):
+    _poll_report_progress = st.fragment(run_every=REPORT_CONFIG["poll_seconds"])(_report_progress)
+else:
+    def _poll_report_progress(key):
+        _report_progress(key)
+        if st.button("🔄 Perbarui Status", use_container_width=True):
+            st.rerun()
+
+def show_report_status(key):
+    """Progres (dengan polling) saat job aktif; setelah selesai dirender sekali tanpa polling"""
+    job = get_report_worker().get(key)
+    if job is None:
+        return
+    if job.active:
+        _poll_report_progress(key)
+    else:
+        _report_result(job)
+
 def show_sidebar_actions(app):
     """Menampilkan aksi di sidebar"""
     st.markdown("---")
@@ -72,19 +186,19 @@ def show_sidebar_actions(app):
             # Proses data lama (checkpoint)
             if ("old_pesanan_data" in st.session_state and "old_income_data" in st.session_state and
                 st.session_state.old_pesanan_data is not None and st.session_state.old_income_data is not None):
-                st.session_state.old_merged, st.session_state.old_summary = app.process_data(
+                st.session_state.old_merged, st.session_state.old_summary = process_cached(
+                    app, "lama",
                     st.session_state.old_pesanan_data,
-                    st.session_state.old_income_data,
-                    st.session_state.cost_data
+                    st.session_state.old_income_data
                 )
             
             # Proses data baru (fresh) - ini yang dipakai untuk semua UI
             if ("pesanan_data" in st.session_state and "income_data" in st.session_state and
                 st.session_state.pesanan_data is not None and st.session_state.income_data is not None):
-                st.session_state.merged_data, st.session_state.summary_data = app.process_data(
+                st.session_state.merged_data, st.session_state.summary_data = process_cached(
+                    app, "baru",
                     st.session_state.pesanan_data,
-                    st.session_state.income_data,
-                    st.session_state.cost_data
+                    st.session_state.income_data
                 )
                 st.success("✅ Data lama dan baru diproses!")
                 st.rerun()
@@ -95,10 +209,10 @@ def show_sidebar_actions(app):
             if (st.session_state.pesanan_data is not None and st.session_state.income_data is not None and
                 not st.session_state.pesanan_data.empty and not st.session_state.income_data.empty):
                 with st.spinner("Memproses data..."):
-                    merged, summary = app.process_data(
-                        st.session_state.pesanan_data, 
-                        st.session_state.income_data, 
-                        st.session_state.cost_data
+                    merged, summary = process_cached(
+                        app, "baru",
+                        st.session_state.pesanan_data,
+                        st.session_state.income_data
                     )
                     
                     if merged is not None:
@@ -108,37 +222,46 @@ def show_sidebar_actions(app):
                         st.rerun()
                     else:
                         st.error("❌ Tidak ditemukan data yang cocok")
+                        show_trace_warnings("baru")
             else:
                 st.warning("⚠️ Unggah kedua file terlebih dahulu")
 
     if st.session_state.summary_data is not None:
         if st.button("📥 Ekspor Laporan", use_container_width=True):
-            try:
-                excel_data = app.create_excel_report(
-                    st.session_state.merged_data,
-                    st.session_state.summary_data,
-                    st.session_state.cost_data
-                )
-                
-                st.download_button(
-                    label="💾 Unduh Excel",
-                    data=excel_data,
-                    file_name=f"income_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    use_container_width=True
-                )
-            except Exception as e:
-                st.error(f"Kesalahan: {str(e)}")
+            submit_report(app)
+        if st.session_state.get("report_key") is not None:
+            show_report_status(st.session_state.report_key)
 
     # Cache info
-    if os.path.exists("cost_data_cache.json"):
-        try:
-            with open("cost_data_cache.json", 'r') as f:
-                cache_data = json.load(f)
-                cache_age = (datetime.now() - datetime.fromisoformat(cache_data['timestamp']))
-                st.caption(f"📊 Cache: {cache_age.seconds//60} menit lalu")
-        except:
-            pass
+    store = get_cost_store()
+    cache_age = store.cache_age_seconds()
+    if cache_age is not None:
+        caption = f"📊 Cache: {int(cache_age // 60)} menit lalu"
+        if store.refreshing:
+            caption += " · memperbarui…"
+        elif store.last_refresh is not None:
+            refresh = store.last_refresh
+            caption += f" · refresh {refresh['latency_ms']:,.0f} ms" if not refresh['error'] else " · refresh gagal"
+        st.caption(caption)
+    
+    # Kiriman biaya ke sheet yang gagal (dicoba ulang otomatis di latar)
+    sync = store.last_sync
+    if sync is not None and sync['error']:
+        st.caption(f"⚠️ Sinkron biaya gagal ({sync['error']}) · {store.pending} perubahan tertunda · "
+                   f"dicoba lagi {sync['next_retry'][11:]}")
+    
+    # Status koneksi penyimpanan biaya (dicek hanya saat diminta, tidak tiap rerun)
+    if st.button("🔌 Cek Koneksi Biaya", use_container_width=True):
+        store.health_check()
+    if store.last_health is not None:
+        health = store.last_health
+        status = "terhubung" if health['ok'] else f"gagal ({health['error']})"
+        st.caption(f"🔌 {health['backend']}: {status} · {health['latency_ms']:,.0f} ms · {health['checked_at'][11:]}")
+    
+    # Statistik cache proses
+    cache = st.session_state.process_cache
+    st.caption(f"🧮 Cache proses: {cache.hits} hit / {cache.misses} miss")
+    show_performance_panel(cache)
     
     st.markdown("---")
     
@@ -0,0 +1,111 @@
+import re
+import unicodedata
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+
+NGRAM_SIZE = 3
+# Skor minimal agar sebuah nama diusulkan sebagai padanan
+MIN_SCORE = 0.6
+# n-gram yang muncul di lebih dari fraksi katalog ini (dan minimal PRUNE_MIN_NAMES nama)
+# terlalu umum untuk membedakan nama, jadi tidak diindeks
+MAX_GRAM_SHARE = 0.5
+PRUNE_MIN_NAMES = 1000
+
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+
+
+def normalize_name(name):
+    """Nama produk dalam bentuk kanonik: huruf kecil, tanpa aksen/tanda baca, spasi tunggal"""
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    return _NON_WORD.sub(' ', text.lower()).strip()
+
+
+def ngrams(text, n=NGRAM_SIZE):
+    """Himpunan n-gram karakter, dengan spasi sebagai batas di awal & akhir"""
+    padded = f" {text} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class NameMatcher:
+    """Indeks n-gram karakter untuk mencari nama produk terdekat di katalog biaya
+
+    Setiap n-gram memetakan ke daftar nama yang memuatnya (inverted index), jadi
+    satu pencarian hanya membandingkan nama yang berbagi n-gram dengan query,
+    bukan seluruh katalog. Nama yang sama setelah normalisasi cocok langsung.
+    """
+
+    def __init__(self, names, n=NGRAM_SIZE, max_gram_share=MAX_GRAM_SHARE):
+        self.n = n
+        self.names = list(dict.fromkeys(str(name) for name in names))
+        self.exact = {}
+        name_grams = []
+        postings = defaultdict(list)
+        for idx, name in enumerate(self.names):
+            normalized = normalize_name(name)
+            self.exact.setdefault(normalized, idx)
+            grams = ngrams(normalized, n)
+            name_grams.append(grams)
+            for gram in grams:
+                postings[gram].append(idx)
+
+        limit = max(PRUNE_MIN_NAMES, int(len(self.names) * max_gram_share))
+        self.stop_grams = {gram for gram, ids in postings.items() if len(ids) > limit}
+        self.postings = {
+            gram: np.asarray(ids, dtype='int32') for gram, ids in postings.items() if gram not in self.stop_grams
+        }
+        # Skor hanya dihitung atas n-gram yang diindeks
+        self.gram_counts = np.array([len(grams - self.stop_grams) for grams in name_grams], dtype='float64')
+
+    def match(self, query, limit=3, min_score=MIN_SCORE):
+        """Daftar (nama katalog, skor) terbaik untuk query, skor 1.0 = sama setelah normalisasi"""
+        normalized = normalize_name(query)
+        exact = self.exact.get(normalized)
+        if exact is not None:
+            return [(self.names[exact], 1.0)]
+
+        grams = ngrams(normalized, self.n) - self.stop_grams
+        if not grams:
+            return []
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not hits:
+            return []
+        # Jumlah n-gram bersama per kandidat; hanya nama yang muncul di posting list yang dinilai
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.names))
+        candidates = np.flatnonzero(shared)
+        common = shared[candidates].astype('float64')
+        counts = self.gram_counts[candidates]
+        # Rata-rata Dice (kemiripan keseluruhan) dan containment (nama yang
+        # terpotong/bersufiks tetap mendapat skor tinggi)
+        dice = 2.0 * common / (len(grams) + counts)
+        containment = common / np.maximum(1.0, np.minimum(len(grams), counts))
+        scores = (dice + containment) / 2
+
+        keep = candidates[scores >= min_score]
+        keep_scores = scores[scores >= min_score]
+        order = np.argsort(-keep_scores, kind='stable')[:limit]
+        return [(self.names[keep[i]], round(float(keep_scores[i]), 3)) for i in order]
+
+    def suggest(self, queries, cost_data, min_score=MIN_SCORE):
+        """Usulan biaya untuk produk tanpa biaya: satu baris per query yang punya padanan"""
+        rows = []
+        for query in queries:
+            candidates = self.match(query, limit=1, min_score=min_score)
+            if candidates:
+                name, score = candidates[0]
+                rows.append({
+                    'Product Name': query,
+                    'Suggested Match': name,
+                    'Score': score,
+                    'Suggested Cost': float(cost_data.get(name, 0.0)),
+                })
+        return pd.DataFrame(rows, columns=['Product Name', 'Suggested Match', 'Score', 'Suggested Cost'])
+
+
+def suggest_costs(unmatched, cost_data, min_score=MIN_SCORE):
+    """Bangun indeks dari katalog biaya lalu usulkan padanan untuk produk tanpa biaya"""
+    if not unmatched or not cost_data:
+        return pd.DataFrame(columns=['Product Name', 'Suggested Match', 'Score', 'Suggested Cost'])
+    return NameMatcher(cost_data.keys()).suggest(unmatched, cost_data, min_score=min_score)
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import weakref
+import pandas as pd
+
+# Memo fingerprint per objek DataFrame (id -> (weakref, fingerprint)).
+# DataFrame hasil upload diperlakukan immutable, jadi hash cukup dihitung sekali.
+_FINGERPRINT_MEMO = {}
+
+
+def fingerprint_frame(df):
+    """Fingerprint isi DataFrame (kolom, bentuk, dan nilai)"""
+    if df is None:
+        return "none"
+
+    key = id(df)
+    memo = _FINGERPRINT_MEMO.get(key)
+    if memo is not None and memo[0]() is df:
+        return memo[1]
+
+    h = hashlib.sha256()
+    h.update(repr(list(df.columns)).encode("utf-8"))
+    h.update(repr(df.shape).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    fingerprint = h.hexdigest()
+
+    try:
+        ref = weakref.ref(df, lambda _ref, k=key: _FINGERPRINT_MEMO.pop(k, None))
+        _FINGERPRINT_MEMO[key] = (ref, fingerprint)
+    except TypeError:
+        pass
+    return fingerprint
+
+
+def fingerprint_costs(cost_data):
+    """Fingerprint dictionary biaya produk"""
+    payload = json.dumps(cost_data or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ProcessCache:
+    """Cache hasil process_data per slot (mis. 'baru' dan 'lama')"""
+
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, pesanan_data, income_data, cost_data, cost_history=None, variant_costs=None):
+        return (
+            fingerprint_frame(pesanan_data),
+            fingerprint_frame(income_data),
+            fingerprint_costs(cost_data),
+            fingerprint_frame(cost_history),
+            fingerprint_frame(variant_costs),
+        )
+
+    def get_or_process(self, slot, app, pesanan_data, income_data, cost_data, cost_history=None,
+                       variant_costs=None):
+        """Pakai ulang merged/summary jika input tidak berubah, selain itu proses ulang"""
+        key = self.make_key(pesanan_data, income_data, cost_data, cost_history, variant_costs)
+        entry = self.entries.get(slot)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1], entry[2]
+
+        self.misses += 1
+        merged, summary = app.process_data(pesanan_data, income_data, cost_data, cost_history, variant_costs)
+        artifacts = dict(getattr(app, 'last_artifacts', {}))
+        self.entries[slot] = (key, merged, summary, artifacts)
+        return merged, summary
+
+    def artifacts(self, slot):
+        """Hasil sampingan process_data untuk slot ini (dict kosong jika belum ada)"""
+        entry = self.entries.get(slot)
+        return entry[3] if entry is not None else {}
+
+    def clear(self):
+        self.entries.clear()
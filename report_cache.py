@@ -0,0 +1,70 @@
+import hashlib
+import os
+from config import REPORT_CACHE_CONFIG
+from disk_cache import write_entry, evict_lru
+from process_cache import fingerprint_frame, fingerprint_costs
+from report_writer import REPORT_TEMPLATE_VERSION
+
+
+def report_key(merged_data, summary_data, cost_data, income_data=None):
+    """Kunci laporan: fingerprint data, biaya, dan versi template laporan"""
+    h = hashlib.sha256()
+    for part in (
+        f"template-{REPORT_TEMPLATE_VERSION}",
+        fingerprint_frame(merged_data),
+        fingerprint_frame(summary_data),
+        fingerprint_costs(cost_data),
+        fingerprint_frame(income_data),
+    ):
+        h.update(part.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(REPORT_CACHE_CONFIG["dir"], f"{key}.xlsx")
+
+
+def get_report(key):
+    """Bytes laporan tersimpan untuk kunci ini (None jika belum ada)"""
+    path = _cache_path(key)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        # Sentuh mtime supaya file ini dianggap baru dipakai (LRU)
+        os.utime(path, None)
+        return data
+    except OSError:
+        return None
+
+
+def _write_bytes(data):
+    def write(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+    return write
+
+
+def _max_bytes():
+    return REPORT_CACHE_CONFIG["max_mb"] * 1024 * 1024
+
+
+def put_report(key, data):
+    """Simpan bytes laporan lalu jalankan eviction"""
+    write_entry(REPORT_CACHE_CONFIG["dir"], _cache_path(key), _write_bytes(data), _max_bytes(), '.xlsx')
+
+
+def evict_reports(max_bytes=None):
+    """Hapus laporan paling lama dipakai sampai total ukuran di bawah batas"""
+    evict_lru(REPORT_CACHE_CONFIG["dir"], _max_bytes() if max_bytes is None else max_bytes, '.xlsx')
+
+
+def cached_report(key, build):
+    """Bytes laporan dari cache, atau build() lalu simpan. Mengembalikan (bytes, dari_cache)"""
+    if REPORT_CACHE_CONFIG["enabled"]:
+        data = get_report(key)
+        if data is not None:
+            return data, True
+    data = build()
+    if REPORT_CACHE_CONFIG["enabled"]:
+        put_report(key, data)
+    return data, False
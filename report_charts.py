@@ -0,0 +1,78 @@
+# Grafik native Excel (xlsxwriter) yang membaca rentang sel di lembar laporan.
+# Tidak ada gambar yang dirender: Excel menggambar grafik dari data yang sudah ditulis,
+# jadi ukuran file dan waktu pembuatan hampir tidak bertambah.
+
+CHART_STYLE = 10
+
+
+def _chartsheet(workbook, name, chart):
+    sheet = workbook.add_chartsheet(name)
+    sheet.set_chart(chart)
+    return sheet
+
+
+def add_daily_revenue_chart(workbook, sheet_name, last_row, date_col, revenue_col):
+    """Grafik garis pendapatan harian dari lembar Penjualan Harian (baris 1..last_row)"""
+    chart = workbook.add_chart({'type': 'line'})
+    chart.add_series({
+        'name': 'Pendapatan Harian',
+        'categories': [sheet_name, 1, date_col, last_row, date_col],
+        'values': [sheet_name, 1, revenue_col, last_row, revenue_col],
+        'marker': {'type': 'circle', 'size': 4},
+    })
+    chart.set_title({'name': 'Pendapatan Harian'})
+    chart.set_x_axis({'name': 'Tanggal', 'date_axis': True, 'num_format': 'dd/mm/yyyy'})
+    chart.set_y_axis({'name': 'Pendapatan (Rp)', 'num_format': '#,##0'})
+    chart.set_legend({'none': True})
+    chart.set_style(CHART_STYLE)
+    return _chartsheet(workbook, 'Grafik Pendapatan Harian', chart)
+
+
+def add_top_products_chart(workbook, sheet_name, last_row, name_col, value_cols):
+    """Grafik batang produk teratas; value_cols: {nama seri: indeks kolom}"""
+    chart = workbook.add_chart({'type': 'bar'})
+    for series_name, col in value_cols.items():
+        chart.add_series({
+            'name': series_name,
+            'categories': [sheet_name, 1, name_col, last_row, name_col],
+            'values': [sheet_name, 1, col, last_row, col],
+        })
+    chart.set_title({'name': 'Produk Teratas berdasarkan Profit'})
+    # Produk dengan profit terbesar di atas
+    chart.set_y_axis({'reverse': True})
+    chart.set_x_axis({'name': 'Rp', 'num_format': '#,##0'})
+    chart.set_legend({'position': 'bottom'})
+    chart.set_style(CHART_STYLE)
+    return _chartsheet(workbook, 'Grafik Produk Teratas', chart)
+
+
+def add_fee_breakdown_chart(workbook, sheet_name, first_row, last_row):
+    """Grafik pie komisi & fee dari lembar Breakdown Komisi & Fee (kolom A: jenis, B: total)"""
+    chart = workbook.add_chart({'type': 'pie'})
+    chart.add_series({
+        'name': 'Breakdown Komisi & Fee',
+        'categories': [sheet_name, first_row, 0, last_row, 0],
+        'values': [sheet_name, first_row, 1, last_row, 1],
+        'data_labels': {'percentage': True, 'leader_lines': True},
+    })
+    chart.set_title({'name': 'Breakdown Komisi & Fee'})
+    chart.set_legend({'position': 'right'})
+    chart.set_style(CHART_STYLE)
+    return _chartsheet(workbook, 'Grafik Komisi & Fee', chart)
+
+
+def add_channel_chart(workbook, sheet_name, header_row, metric_rows):
+    """Grafik kolom affiliate vs toko; metric_rows: baris metrik (kolom A: nama, B-C: nilai)"""
+    chart = workbook.add_chart({'type': 'column'})
+    for row in metric_rows:
+        chart.add_series({
+            'name': [sheet_name, row, 0],
+            'categories': [sheet_name, header_row, 1, header_row, 2],
+            'values': [sheet_name, row, 1, row, 2],
+            'data_labels': {'value': True, 'num_format': '#,##0'},
+        })
+    chart.set_title({'name': 'Affiliate vs Toko Langsung'})
+    chart.set_y_axis({'name': 'Rp', 'num_format': '#,##0'})
+    chart.set_legend({'position': 'bottom'})
+    chart.set_style(CHART_STYLE)
+    return _chartsheet(workbook, 'Grafik Affiliate vs Toko', chart)
@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import REPORT_CONFIG
+from report_writer import REPORT_STEPS
+
+
+class ReportCancelled(Exception):
+    """Pembuatan laporan dibatalkan sebelum selesai"""
+
+
+class ReportJob:
+    """Satu pembuatan laporan di latar: status, progres per lembar, dan hasil (bytes)"""
+
+    def __init__(self, key):
+        self.key = key
+        self.status = "queued"
+        self.stage = None
+        self.progress = 0.0
+        self.result = None
+        self.cached = False
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    def checkpoint(self, stage=None):
+        """Dipanggil create_excel_report tiap lembar/potongan baris; raise jika dibatalkan"""
+        if self._cancel.is_set():
+            raise ReportCancelled()
+        if stage is not None:
+            self.stage = stage
+            if stage in REPORT_STEPS:
+                self.progress = REPORT_STEPS.index(stage) / len(REPORT_STEPS)
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    @property
+    def seconds(self):
+        end = self.finished_at or time.time()
+        return end - self.created_at
+
+
+class ReportWorker:
+    """Pool thread untuk membuat laporan tanpa memblokir script Streamlit
+
+    Job disimpan per kunci (fingerprint data), jadi klik ulang atau rerun dengan
+    data yang sama memakai job yang sedang berjalan/hasil yang sudah jadi. Hanya
+    `max_results` job terakhir yang disimpan.
+    """
+
+    def __init__(self, max_workers=1, max_results=8):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self.max_results = max_results
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key, build):
+        """Jadwalkan build(job) -> bytes; kembalikan job yang sudah ada untuk kunci yang sama"""
+        with self._lock:
+            job = self.jobs.get(key)
+            if job is not None and (job.active or job.status == "done"):
+                self.jobs.move_to_end(key)
+                return job
+            job = ReportJob(key)
+            self.jobs[key] = job
+            self._evict()
+        self.executor.submit(self._run, job, build)
+        return job
+
+    def _run(self, job, build):
+        if job._cancel.is_set():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            return
+        job.status = "running"
+        try:
+            job.result = build(job)
+            job.status = "done"
+            job.progress = 1.0
+        except ReportCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+
+    def _evict(self):
+        finished = [key for key, job in self.jobs.items() if not job.active]
+        while len(self.jobs) > self.max_results and finished:
+            del self.jobs[finished.pop(0)]
+
+    def get(self, key):
+        with self._lock:
+            return self.jobs.get(key)
+
+    def cancel(self, key):
+        job = self.get(key)
+        if job is not None and job.active:
+            job.cancel()
+        return job
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_report_worker():
+    """Worker laporan bersama untuk semua rerun dan sesi di proses ini"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = ReportWorker(
+                max_workers=REPORT_CONFIG.get("workers", 1),
+                max_results=REPORT_CONFIG.get("max_results", 8)
+            )
+        return _worker
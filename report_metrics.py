@@ -0,0 +1,193 @@
+import pandas as pd
+from costing import build_cost_table, compute_profit, average_unit_costs
+from analysis_cube import build_cube, slice_cube, find_date_column
+
+# Kolom komisi/fee income yang dirinci (jika ada di data)
+COMMISSION_COLUMNS = ['Dynamic Commission', 'Affiliate commission', 'TikTok Shop commission fee']
+
+
+def _period(merged_data):
+    """(awal, akhir) periode data dari kolom tanggal; None jika tidak tersedia"""
+    date_column = find_date_column(merged_data)
+    if not date_column:
+        return None
+    try:
+        dates = pd.to_datetime(merged_data[date_column])
+    except Exception:
+        return None
+    start, end = dates.min(), dates.max()
+    if pd.isna(start) or pd.isna(end):
+        return None
+    return start, end
+
+
+def orders_per_sku(merged_data, skus):
+    """Jumlah Order/adjustment ID unik per Seller SKU, urut sesuai `skus`"""
+    if 'Seller SKU' not in merged_data.columns:
+        return pd.Series(0, index=skus.index, dtype='int64')
+    counts = merged_data.groupby(
+        merged_data['Seller SKU'].astype('string'), observed=True
+    )['Order/adjustment ID'].nunique()
+    return skus.astype('string').map(counts).fillna(0).astype('int64')
+
+
+def _channel_metrics(df):
+    rev = df['Total settlement amount'].sum()
+    fees = df['Total fees'].sum()
+    pct = (fees / rev * 100) if rev > 0 else 0
+    return {'orders': len(df), 'fees': fees, 'fee_pct': pct, 'revenue': rev}
+
+
+def build_income_metrics(income_data):
+    """Metrik refund, affiliate vs toko, dan komisi dari data income mentah"""
+    income = income_data
+
+    # Penghasilan dari baris yang tidak refund
+    clean_income = income[income['Customer refund'] >= 0]
+    gross_revenue = clean_income['Total revenue'].sum() if 'Total revenue' in clean_income.columns else 0
+
+    # Refund
+    refund_df = income[income['Customer refund'] < 0]
+    refunded_ids = set(refund_df['Order/adjustment ID'].unique())
+    total_ids = income['Order/adjustment ID'].nunique()
+
+    # Affiliate vs toko (order yang di-refund tidak dihitung)
+    base = income[~income['Order/adjustment ID'].isin(refunded_ids)]
+    aff = base[base['Affiliate commission'] < 0]
+    tok = base[base['Affiliate commission'] == 0]
+    base_revenue = base['Total settlement amount'].sum()
+
+    available = [c for c in COMMISSION_COLUMNS if c in base.columns]
+    commissions = []
+    for col in available:
+        total = abs(base[col].sum())
+        commissions.append((col, total, (total / base_revenue * 100) if base_revenue > 0 else 0))
+    total_fees = base['Total fees'].sum()
+
+    # Daftar order per sumber (nilai mentah; format diserahkan ke laporan/tab)
+    cols_show = ['Order/adjustment ID', 'Total revenue', 'Total settlement amount', 'Total fees'] + available
+    parts = []
+    for label, frame in (('Affiliate', aff), ('Toko', tok)):
+        if not frame.empty:
+            parts.append(frame[cols_show].assign(Sumber=label))
+    orders = pd.concat(parts, ignore_index=True) if parts else None
+
+    return {
+        'gross_revenue': gross_revenue,
+        'net_revenue': clean_income['Total settlement amount'].sum(),
+        'net_fees': clean_income['Total fees'].sum(),
+        'refunds': refund_df[['Order/adjustment ID', 'Customer refund']],
+        'refund_orders': refund_df['Order/adjustment ID'].nunique(),
+        'refund_value': abs(refund_df['Customer refund'].sum()),
+        'refund_rate': (len(refunded_ids) / total_ids * 100) if len(income) > 0 else 0,
+        'affiliate': _channel_metrics(aff),
+        'store': _channel_metrics(tok),
+        'commission_columns': available,
+        'commissions': commissions,
+        'total_fees': total_fees,
+        'total_fee_pct': (total_fees / base_revenue * 100) if base_revenue > 0 else 0,
+        'orders': orders,
+    }
+
+
+def build_report_metrics(merged_data, summary_data, cost_data=None, cube=None, income_data=None):
+    """Semua angka laporan & dashboard dihitung sekali dari hasil process_data
+
+    Laporan Excel dan tab UI hanya memformat isi bundle ini, jadi angka di
+    layar dan di file selalu sama. income_data (mentah, termasuk refund)
+    opsional; tanpa itu bagian 'income' bernilai None.
+    """
+    if cube is None:
+        cube = build_cube(merged_data, build_cost_table(cost_data or {}))
+
+    # Gunakan Order/adjustment ID sebagai primary key
+    unique_orders = merged_data.drop_duplicates(subset=['Order/adjustment ID'])
+    total_orders = unique_orders['Order/adjustment ID'].nunique()
+    total_revenue = unique_orders['Total settlement amount'].sum()
+
+    # Ringkasan berdasarkan SKU (diambil dari cube, revenue hasil alokasi)
+    summary_by_sku = (
+        slice_cube(cube, 'Seller SKU', ['Quantity', 'Lines', 'Revenue', 'Cost'])
+        .rename(columns={
+            'Quantity': 'Total Quantity',
+            'Lines': 'Total Orders',
+            'Revenue': 'Total Revenue'
+        })
+    )
+    # Jumlah order unik tidak bisa dijumlahkan dari cube (satu order bisa punya beberapa
+    # baris/variasi di SKU yang sama), jadi dihitung langsung dari merged_data
+    summary_by_sku['Total Orders'] = orders_per_sku(merged_data, summary_by_sku['Seller SKU'])
+    summary_by_sku = compute_profit(
+        summary_by_sku,
+        average_unit_costs(summary_by_sku.pop('Cost'), summary_by_sku['Total Quantity']),
+        qty_col='Total Quantity',
+        revenue_col='Total Revenue'
+    )
+
+    total_cost = summary_by_sku['Total Cost'].sum()
+    total_profit = total_revenue - total_cost
+
+    # Penjualan harian
+    date_column = find_date_column(merged_data)
+    daily_sales = (
+        slice_cube(cube, 'Order Date', ['Quantity', 'Orders', 'Revenue'])
+        .rename(columns={
+            'Quantity': 'Daily_Quantity',
+            'Orders': 'Daily_Orders',
+            'Revenue': 'Daily_Revenue'
+        })
+    )
+    if daily_sales.empty:
+        daily_sales = pd.DataFrame({
+            'Order Date': ['Data tidak tersedia' if date_column else 'Kolom tanggal tidak ditemukan'],
+            'Daily Quantity': [0],
+            'Daily Orders': [0],
+            'Daily Revenue': [0]
+        })
+    else:
+        daily_sales['Order Date'] = daily_sales['Order Date'].dt.date
+        daily_sales['Daily_Orders'] = daily_sales['Daily_Orders'].round().astype('int64')
+
+    # Produk terbaik berdasarkan profit
+    top_products = (
+        slice_cube(cube, 'Product Name', ['Quantity', 'Revenue', 'Cost'])
+        .rename(columns={'Quantity': 'TotalQty'})
+    )
+    top_products = compute_profit(
+        top_products,
+        average_unit_costs(top_products.pop('Cost'), top_products['TotalQty']),
+        cost_col='Cost',
+        total_cost_col='Total_Cost',
+        margin_col='Profit_Margin',
+        shares=False
+    ).nlargest(10, 'Profit')
+
+    totals = {
+        'orders': total_orders,
+        'quantity': cube['Quantity'].sum(),
+        'revenue': total_revenue,
+        'cost': total_cost,
+        'profit': total_profit,
+        'share_60': total_profit * 0.6,
+        'share_40': total_profit * 0.4,
+        'avg_order_value': total_revenue / total_orders if total_orders > 0 else 0,
+        'avg_profit_per_order': total_profit / total_orders if total_orders > 0 else 0,
+        'profit_margin': (total_profit / total_revenue * 100) if total_revenue > 0 else 0,
+    }
+
+    sku_counts = {
+        'total': len(summary_data),
+        'profitable': int((summary_data['Profit'] > 0).sum()),
+        'high_margin': int((summary_data['Profit Margin %'] > 20).sum()),
+        'low_margin': int((summary_data['Profit Margin %'] < 10).sum()),
+    }
+
+    return {
+        'totals': totals,
+        'period': _period(merged_data),
+        'sku_counts': sku_counts,
+        'summary_by_sku': summary_by_sku,
+        'daily_sales': daily_sales,
+        'top_products': top_products,
+        'income': build_income_metrics(income_data) if income_data is not None else None,
+    }
@@ -0,0 +1,98 @@
+import io
+import tempfile
+import pandas as pd
+import xlsxwriter
+from config import REPORT_CONFIG
+
+# Jumlah baris yang dikonversi ke nilai Python sekaligus saat menulis lembar besar
+CHUNK_ROWS = 10000
+
+# Naikkan versi ini jika isi/format laporan berubah supaya laporan lama di cache tidak terpakai
+REPORT_TEMPLATE_VERSION = 3
+
+# Tahap pembuatan laporan berurutan (agregasi lalu tiap lembar), untuk progres
+REPORT_STEPS = [
+    'Agregasi',
+    'Ringkasan',
+    'Analisis Affiliate vs Toko',
+    'Breakdown Komisi & Fee',
+    'Detail Sumber Order & Fee',
+    'Ringkasan per Produk',
+    'Ringkasan per SKU',
+    'Penjualan Harian',
+    'Produk Teratas',
+    'Daftar Biaya Produk',
+    'Grafik',
+]
+
+
+def use_streaming(*frames):
+    """Mode streaming dipakai otomatis jika salah satu tabel melewati batas baris"""
+    limit = REPORT_CONFIG["streaming_min_rows"]
+    return any(frame is not None and len(frame) >= limit for frame in frames)
+
+
+def open_workbook(output=None, streaming=False):
+    """Buka workbook xlsxwriter, kembalikan (workbook, target)
+
+    Mode biasa menyusun seluruh isi di memori (BytesIO). Mode streaming memakai
+    constant_memory: tiap baris langsung ditulis ke file sementara dan dilepas
+    dari memori, dan hasil akhirnya di-spool ke disk jika melebihi
+    spool_max_bytes. Pada mode streaming, baris setiap lembar wajib ditulis urut.
+    """
+    if output is None:
+        if streaming:
+            output = tempfile.SpooledTemporaryFile(max_size=REPORT_CONFIG["spool_max_bytes"])
+        else:
+            output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {
+        'constant_memory': streaming,
+        'in_memory': not streaming,
+        'tmpdir': REPORT_CONFIG.get("tmpdir") or tempfile.gettempdir(),
+        'default_date_format': 'yyyy-mm-dd',
+        'strings_to_numbers': False,
+        'strings_to_urls': False,
+    })
+    return workbook, output
+
+
+def _cell_values(series):
+    """Kolom sebagai list nilai Python; NaN/NaT jadi None (sel kosong)"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def write_rows(worksheet, first_row, columns, first_col=0, cell_format=None, chunk_rows=CHUNK_ROWS,
+               on_chunk=None):
+    """Tulis data per baris dari kolom-kolom Series (urut, aman untuk constant_memory)
+
+    Kolom dikonversi ke nilai Python per potongan `chunk_rows` baris, jadi memori
+    tambahan tidak tumbuh dengan ukuran tabel. on_chunk() dipanggil sebelum tiap
+    potongan (mis. untuk membatalkan). Mengembalikan baris kosong berikutnya.
+    """
+    row = first_row
+    total = len(columns[0]) if columns else 0
+    for start in range(0, total, chunk_rows):
+        if on_chunk is not None:
+            on_chunk()
+        chunk = [_cell_values(column.iloc[start:start + chunk_rows]) for column in columns]
+        for row_values in zip(*chunk):
+            worksheet.write_row(row, first_col, row_values, cell_format)
+            row += 1
+    return row
+
+
+def write_frame(workbook, sheet_name, frame, header_format=None, column_formats=None, width=18, on_chunk=None):
+    """Lembar berisi DataFrame (header + baris), ditulis baris demi baris
+
+    column_formats: {nama kolom: format} dipasang sebagai format default kolom,
+    jadi tidak perlu format per sel.
+    """
+    worksheet = workbook.add_worksheet(sheet_name)
+    column_formats = column_formats or {}
+    for index, column in enumerate(frame.columns):
+        worksheet.set_column(index, index, width, column_formats.get(column))
+    worksheet.write_row(0, 0, [str(column) for column in frame.columns], header_format)
+    write_rows(worksheet, 1, [frame[column] for column in frame.columns], on_chunk=on_chunk)
+    return worksheet
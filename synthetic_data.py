@@ -0,0 +1,230 @@
+"""Generator export TikTok Shop sintetis (pesanan + income) untuk benchmark dan uji skala
+
+Header, format tanggal, dan tata letak file sama dengan export asli: semua sel
+berupa teks, file pesanan punya baris keterangan di baris ke-2, dan header
+income membawa spasi di belakang seperti aslinya.
+"""
+import numpy as np
+import pandas as pd
+
+PESANAN_COLUMNS = [
+    'Order ID', 'Order Status', 'Order Substatus', 'Cancelation/Return Type', 'Normal or Pre-order',
+    'SKU ID', 'Seller SKU', 'Product Name', 'Variation', 'Quantity', 'Sku Quantity of return',
+    'SKU Unit Original Price', 'SKU Subtotal Before Discount', 'SKU Platform Discount',
+    'SKU Seller Discount', 'SKU Subtotal After Discount', 'Shipping Fee After Discount',
+    'Original Shipping Fee', 'Shipping Fee Seller Discount', 'Shipping Fee Platform Discount',
+    'Payment platform discount', 'Buyer Service Fee', 'Handling Fee', 'Shipping Insurance',
+    'Item Insurance', 'Order Amount', 'Order Refund Amount', 'Created Time', 'Paid Time', 'RTS Time',
+    'Shipped Time', 'Delivered Time', 'Cancelled Time', 'Cancel By', 'Cancel Reason',
+    'Fulfillment Type', 'Warehouse Name', 'Tracking ID', 'Delivery Option', 'Shipping Provider Name',
+    'Buyer Message', 'Buyer Username', 'Recipient', 'Phone #', 'Zipcode', 'Country', 'Province',
+    'Regency and City', 'Districts', 'Villages', 'Detail Address', 'Additional address information',
+    'Payment Method', 'Weight(kg)', 'Product Category', 'Package ID', 'Purchase Channel',
+    'Seller Note', 'Checked Status', 'Checked Marked by', 'Tokopedia Invoice Number'
+]
+
+INCOME_COLUMNS = [
+    'Order/adjustment ID  ', 'Type ', 'Order created time(UTC)', 'Order settled time(UTC)', 'Currency',
+    'Total settlement amount', 'Total revenue', 'Subtotal after seller discounts',
+    'Subtotal before discounts', 'Seller discounts', 'Refund subtotal after seller discounts',
+    'Refund subtotal before seller discounts', 'Refund of seller discounts', 'Total fees',
+    'TikTok Shop commission fee', 'Flat fee', 'Sales fee', 'Pre-Order Service Fee', 'Mall service fee',
+    'Payment fee', 'Shipping cost', 'Shipping costs passed on to the logistics provider',
+    'Replacement shipping fee (passed on to the customer)',
+    'Exchange shipping fee (passed on to the customer)', 'Shipping cost borne by the platform',
+    'Shipping cost paid by the customer', 'Refunded shipping cost paid by the customer',
+    'Return shipping costs (passed on to the customer)', 'Shipping cost subsidy',
+    'Affiliate commission ', 'Affiliate partner commission ', 'Affiliate Shop Ads commission\t',
+    'SFP service fee', 'Dynamic Commission', 'LIVE Specials Service Fee', 'Voucher Xtra Service Fee',
+    'EAMS Program service fee', 'Brand Crazy Deals/Flash Sale service fee',
+    'Bonus cashback service fee', 'DT Handling Fee', 'PayLater Handling Fee', 'Ajustment amount',
+    'Related order ID  ', None, 'Customer payment', 'Customer refund',
+    'Seller co-funded voucher discount', 'Refund of seller co-funded voucher discount',
+    'Platform discounts', 'Refund of platform discounts', 'Platform co-funded voucher discounts',
+    'Refund of platform co-funded voucher discounts', 'Seller shipping cost discount',
+    'Estimated package weight (g)', 'Actual package weight (g)', 'Shopping center items', 'Order Source'
+]
+
+VARIATIONS = ['Hitam', 'Merah Tua', 'Coklat', 'Cream', 'Navy', 'Hijau Army']
+CATEGORIES = ['Dompet', 'Tas', 'Aksesoris']
+PROVINCES = ['DKI Jakarta', 'Jawa Barat', 'Jawa Tengah', 'Jawa Timur', 'Banten', 'Bali']
+PAYMENT_METHODS = ['Transfer bank', 'Bayar di tempat', 'DANA', 'ShopeePay', 'PayLater']
+
+# Persentase fee terhadap subtotal setelah diskon (negatif = potongan)
+COMMISSION_RATE = 0.08
+DYNAMIC_COMMISSION_RATE = 0.055
+AFFILIATE_RATE = 0.10
+
+
+def make_catalog(n_products=40, seed=0):
+    """Katalog produk sintetis: nama, SKU per variasi, harga, dan biaya per unit"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n_products):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        name = f"DESMARÉ {category} Sintetis {i + 1:03d} – Wanita Elegan"
+        price = int(rng.integers(60, 400)) * 1000
+        cost = round(price * rng.uniform(0.15, 0.4), -3)
+        for j in range(int(rng.integers(1, 4))):
+            variation = VARIATIONS[(i + j) % len(VARIATIONS)]
+            rows.append({
+                'Product Name': name,
+                'Variation': variation,
+                'Seller SKU': f"sx-{i + 1:03d}-{variation.split()[0].lower()}",
+                'SKU ID': str(1731718781194000000 + i * 100 + j),
+                'Product Category': category,
+                'price': price,
+                'cost': cost,
+            })
+    return pd.DataFrame(rows)
+
+
+def catalog_costs(catalog):
+    """Dictionary biaya {nama produk: biaya per unit} dari katalog"""
+    return catalog.drop_duplicates('Product Name').set_index('Product Name')['cost'].astype(float).to_dict()
+
+
+def _fmt_times(times, fmt):
+    return pd.DatetimeIndex(times).strftime(fmt).to_numpy(dtype=object)
+
+
+def _as_text(values):
+    return np.asarray(values).astype('int64').astype(str).astype(object)
+
+
+def generate_exports(n_lines, catalog=None, seed=0, start_date='2025-07-01', days=30,
+                     multi_item_rate=0.3, refund_rate=0.03, affiliate_rate=0.35,
+                     cancel_rate=0.05, duplicate_rate=0.01, order_id_start=579600000000000000):
+    """Buat pasangan (pesanan, income) sintetis dengan sekitar n_lines baris pesanan
+
+    Order bisa berisi beberapa item, sebagian dibatalkan (tidak muncul di income),
+    sebagian direfund, sebagian lewat affiliate, dan sebagian kecil baris pesanan
+    tercetak dua kali seperti pada export yang tumpang tindih.
+    """
+    rng = np.random.default_rng(seed)
+    catalog = make_catalog(seed=seed) if catalog is None else catalog
+
+    # Jumlah item per order: 1, atau 2-4 untuk order multi-item
+    n_orders = max(1, int(n_lines / (1 + multi_item_rate * 2)))
+    items = np.where(rng.random(n_orders) < multi_item_rate, rng.integers(2, 5, n_orders), 1)
+    order_ids = order_id_start + np.arange(n_orders, dtype='int64') * 7919 + rng.integers(0, 7919, n_orders)
+
+    created = (pd.Timestamp(start_date)
+               + pd.to_timedelta(rng.integers(0, days * 86400, n_orders), unit='s'))
+    status = np.where(rng.random(n_orders) < cancel_rate, 'Dibatalkan', 'Selesai')
+    shipping = rng.integers(8, 25, n_orders) * 1000
+
+    # Baris pesanan
+    line_order = np.repeat(np.arange(n_orders), items)
+    sku = rng.integers(0, len(catalog), len(line_order))
+    product = catalog.iloc[sku].reset_index(drop=True)
+    qty = rng.choice([1, 1, 1, 2, 3], len(line_order))
+    price = product['price'].to_numpy()
+    before = price * qty
+    seller_discount = np.round(before * rng.uniform(0, 0.6, len(line_order)), -3)
+    after = before - seller_discount
+
+    pesanan = pd.DataFrame({col: None for col in PESANAN_COLUMNS}, index=range(len(line_order)))
+    pesanan['Order ID'] = _as_text(order_ids[line_order])
+    pesanan['Order Status'] = status[line_order]
+    pesanan['Order Substatus'] = status[line_order]
+    pesanan['Normal or Pre-order'] = 'Normal'
+    for col in ['SKU ID', 'Seller SKU', 'Product Name', 'Variation', 'Product Category']:
+        pesanan[col] = product[col].to_numpy()
+    pesanan['Quantity'] = _as_text(qty)
+    pesanan['Sku Quantity of return'] = '0'
+    pesanan['SKU Unit Original Price'] = _as_text(price)
+    pesanan['SKU Subtotal Before Discount'] = _as_text(before)
+    pesanan['SKU Platform Discount'] = '0'
+    pesanan['SKU Seller Discount'] = _as_text(seller_discount)
+    pesanan['SKU Subtotal After Discount'] = _as_text(after)
+    pesanan['Original Shipping Fee'] = _as_text(shipping[line_order])
+    pesanan['Shipping Fee After Discount'] = '0'
+    pesanan['Shipping Fee Platform Discount'] = _as_text(shipping[line_order])
+    pesanan['Created Time'] = _fmt_times(created[line_order], '%d/%m/%Y %H:%M:%S')
+    pesanan['Paid Time'] = _fmt_times(created[line_order] + pd.Timedelta(minutes=1), '%d/%m/%Y %H:%M:%S')
+    pesanan['Fulfillment Type'] = 'Fulfillment by seller'
+    pesanan['Delivery Option'] = 'Pengiriman standar'
+    pesanan['Shipping Provider Name'] = 'J&T Express'
+    pesanan['Country'] = 'Indonesia'
+    pesanan['Province'] = rng.choice(PROVINCES, len(line_order))
+    pesanan['Payment Method'] = rng.choice(PAYMENT_METHODS, len(line_order))
+    pesanan['Purchase Channel'] = 'TikTok'
+    pesanan['Checked Status'] = 'Unchecked'
+
+    if duplicate_rate > 0:
+        dup = rng.random(len(pesanan)) < duplicate_rate
+        pesanan = pd.concat([pesanan, pesanan[dup]], ignore_index=True)
+
+    # Baris income: satu per order yang tidak dibatalkan
+    subtotal = np.bincount(line_order, weights=after, minlength=n_orders)
+    subtotal_before = np.bincount(line_order, weights=before, minlength=n_orders)
+    settled = status == 'Selesai'
+    n_settled = int(settled.sum())
+    subtotal, subtotal_before = subtotal[settled], subtotal_before[settled]
+
+    affiliate = rng.random(n_settled) < affiliate_rate
+    refund = rng.random(n_settled) < refund_rate
+    commission = -np.round(subtotal * COMMISSION_RATE)
+    dynamic = -np.round(subtotal * DYNAMIC_COMMISSION_RATE)
+    affiliate_fee = np.where(affiliate, -np.round(subtotal * AFFILIATE_RATE), 0)
+    total_fees = commission + dynamic + affiliate_fee
+    revenue = np.where(refund, 0, subtotal)
+    settlement = np.where(refund, 0, subtotal + total_fees)
+    customer_refund = np.where(refund, -subtotal, 0)
+
+    ids = _as_text(order_ids[settled])
+    created_settled = created[settled]
+    # Kolom tanpa header di export asli ditulis sebagai header kosong
+    income = pd.DataFrame('0', index=range(n_settled), columns=[col or '' for col in INCOME_COLUMNS])
+    income[''] = ''
+    income['Order/adjustment ID  '] = ids
+    income['Type '] = 'Order'
+    income['Order created time(UTC)'] = _fmt_times(created_settled, '%Y/%m/%d')
+    income['Order settled time(UTC)'] = _fmt_times(created_settled + pd.Timedelta(days=8), '%Y/%m/%d')
+    income['Currency'] = 'IDR'
+    income['Total settlement amount'] = _as_text(settlement)
+    income['Total revenue'] = _as_text(revenue)
+    income['Subtotal after seller discounts'] = _as_text(subtotal)
+    income['Subtotal before discounts'] = _as_text(subtotal_before)
+    income['Seller discounts'] = _as_text(subtotal - subtotal_before)
+    income['Refund subtotal after seller discounts'] = _as_text(-np.where(refund, subtotal, 0))
+    income['Total fees'] = _as_text(np.where(refund, 0, total_fees))
+    income['TikTok Shop commission fee'] = _as_text(np.where(refund, 0, commission))
+    income['Affiliate commission '] = _as_text(np.where(refund, 0, affiliate_fee))
+    income['Dynamic Commission'] = _as_text(np.where(refund, 0, dynamic))
+    income['Related order ID  '] = ids
+    income['Customer payment'] = _as_text(subtotal)
+    income['Customer refund'] = _as_text(customer_refund)
+    income['Shopping center items'] = '/'
+    income['Order Source'] = 'TikTok Shop'
+
+    return pesanan, income
+
+
+def generate_periods(n_lines, n_periods=2, overlap_rate=0.05, seed=0, days=30, **kwargs):
+    """Beberapa periode berurutan; sebagian order periode sebelumnya ikut muncul lagi (export tumpang tindih)"""
+    catalog = make_catalog(seed=seed)
+    periods = []
+    start = pd.Timestamp(kwargs.pop('start_date', '2025-06-01'))
+    for i in range(n_periods):
+        pesanan, income = generate_exports(
+            n_lines, catalog=catalog, seed=seed + i, start_date=start + pd.Timedelta(days=i * days),
+            days=days, order_id_start=579600000000000000 + i * 10 ** 12, **kwargs
+        )
+        if periods and overlap_rate > 0:
+            prev_pesanan, prev_income = periods[-1]
+            carried = prev_income.sample(frac=overlap_rate, random_state=seed + i)
+            carried_ids = set(carried['Order/adjustment ID  '])
+            pesanan = pd.concat([prev_pesanan[prev_pesanan['Order ID'].isin(carried_ids)], pesanan], ignore_index=True)
+            income = pd.concat([carried, income], ignore_index=True)
+        periods.append((pesanan, income))
+    return periods, catalog
+
+
+def write_exports(pesanan, income, pesanan_path, income_path):
+    """Tulis ke .xlsx dengan tata letak export asli (baris keterangan di file pesanan)"""
+    units_row = pd.DataFrame([[None] * len(pesanan.columns)], columns=pesanan.columns)
+    units_row['Order ID'] = 'Platform unique order ID.'
+    pd.concat([units_row, pesanan], ignore_index=True).to_excel(pesanan_path, index=False, engine='xlsxwriter')
+    income.to_excel(income_path, index=False, engine='xlsxwriter')
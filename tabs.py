@@ -4,6 +4,23 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from urllib.parse import quote
+from ingestion import load_pesanan, load_income, describe_load
+from config import FILE_PATTERNS
+from cost_import import read_cost_import, validate_cost_import, accepted_costs, summarize_import
+from report_metrics import build_report_metrics
+
+
+def current_metrics():
+    """Bundle metrik dari proses terakhir (sama dengan yang dipakai laporan Excel)"""
+    cache = st.session_state.get("process_cache")
+    metrics = cache.artifacts("baru").get("metrics") if cache is not None else None
+    if metrics is None and st.session_state.get("summary_data") is not None:
+        # Data dipasang tanpa lewat process_data: hitung dari session
+        metrics = build_report_metrics(
+            st.session_state.merged_data, st.session_state.summary_data,
+            st.session_state.get("cost_data"), income_data=st.session_state.get("income_data")
+        )
+    return metrics
 
 def show_dashboard_tab():
     """Tab Dashboard"""
@@ -26,8 +43,8 @@ def show_dashboard_tab():
 
         import re
         # Regex pattern
-        income_pattern = re.compile(r'income[_-](\d{8,})', re.IGNORECASE)
-        pesanan_pattern = re.compile(r'selesai[ _-]pesanan[-_]?([\d-]+)', re.IGNORECASE)
+        income_pattern = re.compile(FILE_PATTERNS["income"], re.IGNORECASE)
+        pesanan_pattern = re.compile(FILE_PATTERNS["pesanan"], re.IGNORECASE)
 
         detected = {
             'income': [],  # (file, tanggal)
@@ -51,26 +68,26 @@ def show_dashboard_tab():
         # Assign ke session_state dan tampilkan hasil deteksi
         if len(detected['pesanan']) == 2:
             try:
-                df_old_pesanan = pd.read_excel(detected['pesanan'][0][0], header=0, skiprows=[1])
-                df_old_pesanan.columns = [str(c).strip() for c in df_old_pesanan.columns]
+                df_old_pesanan = load_pesanan(detected['pesanan'][0][0])
                 st.session_state.old_pesanan_data = df_old_pesanan
-                df_new_pesanan = pd.read_excel(detected['pesanan'][1][0], header=0, skiprows=[1])
-                df_new_pesanan.columns = [str(c).strip() for c in df_new_pesanan.columns]
+                df_new_pesanan = load_pesanan(detected['pesanan'][1][0])
                 st.session_state.pesanan_data = df_new_pesanan
                 st.success(f"✅ Pesanan Lama: {detected['pesanan'][0][0].name}")
+                st.caption(describe_load(df_old_pesanan))
                 st.success(f"✅ Pesanan Baru: {detected['pesanan'][1][0].name}")
+                st.caption(describe_load(df_new_pesanan))
             except Exception as e:
                 st.error(f"❌ Gagal memuat file pesanan: {e}")
         if len(detected['income']) == 2:
             try:
-                df_old_income = pd.read_excel(detected['income'][0][0], header=0)
-                df_old_income.columns = [str(c).strip() for c in df_old_income.columns]
+                df_old_income = load_income(detected['income'][0][0])
                 st.session_state.old_income_data = df_old_income
-                df_new_income = pd.read_excel(detected['income'][1][0], header=0)
-                df_new_income.columns = [str(c).strip() for c in df_new_income.columns]
+                df_new_income = load_income(detected['income'][1][0])
                 st.session_state.income_data = df_new_income
                 st.success(f"✅ Income Lama: {detected['income'][0][0].name}")
+                st.caption(describe_load(df_old_income))
                 st.success(f"✅ Income Baru: {detected['income'][1][0].name}")
+                st.caption(describe_load(df_new_income))
             except Exception as e:
                 st.error(f"❌ Gagal memuat file income: {e}")
 
@@ -91,10 +108,10 @@ def show_dashboard_tab():
             )
             if pesanan_file:
                 try:
-                    df = pd.read_excel(pesanan_file, header=0, skiprows=[1])
-                    df.columns = [str(c).strip() for c in df.columns]
+                    df = load_pesanan(pesanan_file)
                     st.session_state.pesanan_data = df
                     st.markdown(f'<div class="status-success">✅ Pesanan dimuat: {len(df):,} baris</div>', unsafe_allow_html=True)
+                    st.caption(describe_load(df))
                     with st.expander("📋 Pratinjau"):
                         st.dataframe(df.head(), use_container_width=True)
                 except Exception as e:
@@ -112,10 +129,10 @@ def show_dashboard_tab():
             )
             if income_file:
                 try:
-                    df = pd.read_excel(income_file, header=0)
-                    df.columns = [str(c).strip() for c in df.columns]
+                    df = load_income(income_file)
                     st.session_state.income_data = df
                     st.markdown(f'<div class="status-success">✅ Pendapatan dimuat: {len(df):,} baris</div>', unsafe_allow_html=True)
+                    st.caption(describe_load(df))
                     with st.expander("📋 Pratinjau"):
                         st.dataframe(df.head(), use_container_width=True)
                 except Exception as e:
@@ -130,17 +147,16 @@ def show_dashboard_tab():
     if st.session_state.summary_data is not None:
         st.markdown("### 📊 Dasbor Kinerja")
         
-        # Hitung metrik kunci
-        # Gunakan Order/adjustment ID sebagai primary key (sesuai dengan logika baru)
-        unique_orders = st.session_state.merged_data.drop_duplicates(subset=['Order/adjustment ID'])
-        total_orders = unique_orders['Order/adjustment ID'].nunique()
-        total_revenue = unique_orders['Total settlement amount'].sum()
-        total_cost = st.session_state.summary_data['Total Cost'].sum()
-        total_profit = total_revenue - total_cost
-        total_share_60 = total_profit * 0.6
-        total_share_40 = total_profit * 0.4
-        avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
-        profit_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else 0
+        # Metrik kunci dari bundle yang sama dengan laporan Excel
+        totals = current_metrics()['totals']
+        total_orders = totals['orders']
+        total_revenue = totals['revenue']
+        total_cost = totals['cost']
+        total_profit = totals['profit']
+        total_share_60 = totals['share_60']
+        total_share_40 = totals['share_40']
+        avg_order_value = totals['avg_order_value']
+        profit_margin = totals['profit_margin']
         
         # Metrik utama
         col1, col2, col3, col4 = st.columns(4)
@@ -180,7 +196,7 @@ def show_dashboard_tab():
                 # Import app dari data_processor
                 from data_processor import IncomeApp
                 app = IncomeApp()
-                summary_text = app.generate_ai_summary(st.session_state.summary_data)
+                summary_text = app.generate_ai_summary(st.session_state.summary_data, current_metrics())
                 st.markdown("### 📋 Ringkasan Teks")
                 st.code(summary_text, language="text")
             else:
@@ -285,10 +301,10 @@ def show_cost_management_tab():
             )
             if pesanan_file:
                 try:
-                    df = pd.read_excel(pesanan_file, header=0, skiprows=[1])
-                    df.columns = [str(c).strip() for c in df.columns]
+                    df = load_pesanan(pesanan_file)
                     st.session_state.pesanan_data = df
                     st.success(f"✅ Pesanan dimuat: {len(df):,} baris")
+                    st.caption(describe_load(df))
                 except Exception as e:
                     st.error(f"❌ Kesalahan memuat file: {str(e)}")
 
@@ -302,10 +318,10 @@ def show_cost_management_tab():
             )
             if income_file:
                 try:
-                    df = pd.read_excel(income_file, header=0)
-                    df.columns = [str(c).strip() for c in df.columns]
+                    df = load_income(income_file)
                     st.session_state.income_data = df
                     st.success(f"✅ Pendapatan dimuat: {len(df):,} baris")
+                    st.caption(describe_load(df))
                 except Exception as e:
                     st.error(f"❌ Kesalahan memuat file: {str(e)}")
         
@@ -327,35 +343,12 @@ def show_cost_management_tab():
     
     with action_col1:
         uploaded_file = st.file_uploader(
-            "📁 Impor Biaya (JSON)",
-            type=['json'],
+            "📁 Impor Biaya (CSV/XLSX/JSON)",
+            type=['csv', 'xlsx', 'xls', 'json'],
             key="import_cost",
-            help="Upload file JSON hasil export sebelumnya",
+            help="Daftar harga dengan kolom product_name,cost_per_unit (seperti product_costs.csv) atau JSON hasil export",
             label_visibility="collapsed"
         )
-        
-        if uploaded_file is not None:
-            try:
-                import json
-                imported_data = json.load(uploaded_file)
-                if isinstance(imported_data, dict):
-                    # Validasi format
-                    valid_data = {k: float(v) for k, v in imported_data.items() 
-                                if isinstance(v, (int, float)) and v >= 0}
-                    
-                    # Konfirmasi import
-                    if st.button(f"✅ Import {len(valid_data)} produk?", type="primary", key="confirm_import"):
-                        st.session_state.cost_data.update(valid_data)
-                        app.save_cost_data(st.session_state.cost_data)
-                        st.success(f"✅ {len(valid_data)} biaya produk berhasil diimport!")
-                        st.rerun()
-                else:
-                    st.error("❌ Format file tidak valid. Harus berupa key-value JSON.")
-                    
-            except json.JSONDecodeError:
-                st.error("❌ File bukan JSON yang valid")
-            except Exception as e:
-                st.error(f"❌ Error: {str(e)}")
     
     with action_col2:
         if st.button("📤 Ekspor Biaya", help="Unduh data biaya saat ini"):
@@ -373,6 +366,103 @@ def show_cost_management_tab():
             st.session_state.cost_data = app.load_cost_data()
             st.rerun()
     
+    # Pratinjau import: validasi massal + selisih terhadap biaya saat ini, lalu satu penulisan batch
+    if uploaded_file is not None:
+        try:
+            imported = read_cost_import(uploaded_file, uploaded_file.name)
+            known_products = (
+                st.session_state.pesanan_data['Product Name'].astype(str).unique()
+                if 'Product Name' in st.session_state.pesanan_data.columns else None
+            )
+            report = validate_cost_import(imported, st.session_state.cost_data, known_products)
+            counts = summarize_import(report)
+            
+            st.markdown(f"**🔎 Pratinjau Import: {uploaded_file.name}** ({len(report):,} baris)")
+            count_cols = st.columns(len(counts))
+            for col, (status, count) in zip(count_cols, counts.items()):
+                col.metric(status.capitalize(), f"{count:,}")
+            
+            status_filter = st.multiselect(
+                "Tampilkan status",
+                options=list(report['Status'].cat.categories),
+                default=[status for status in ('baru', 'berubah', 'ditolak') if counts.get(status)],
+                key="import_status_filter"
+            )
+            st.dataframe(
+                report[report['Status'].isin(status_filter)],
+                use_container_width=True,
+                hide_index=True
+            )
+            
+            only_known = st.checkbox(
+                "Hanya produk yang ada di pesanan saat ini",
+                value=False,
+                key="import_only_known",
+                disabled='In Pesanan' not in report.columns
+            )
+            to_write = accepted_costs(report, only_known=only_known)
+            if to_write and st.button(f"✅ Import {len(to_write):,} biaya", type="primary", key="confirm_import"):
+                app.import_cost_data(to_write, skus=app.product_skus(st.session_state.pesanan_data))
+                st.session_state.cost_data.update(to_write)
+                st.success(f"✅ {len(to_write):,} biaya produk berhasil diimport!")
+                st.rerun()
+            elif not to_write:
+                st.info("ℹ️ Tidak ada biaya baru atau berubah untuk diimport")
+        except Exception as e:
+            st.error(f"❌ Error: {str(e)}")
+    
+    # Edit biaya dikirim ke sheet secara bertahap (hanya baris yang berubah)
+    if app.store is not None and app.store.pending:
+        st.caption(f"🔄 {app.store.pending} perubahan biaya menunggu sinkron ke Google Sheets")
+    
+    # Produk yang belum punya biaya (hasil join biaya terakhir)
+    cache = st.session_state.get("process_cache")
+    unmatched = cache.artifacts("baru").get("unmatched_products", []) if cache is not None else []
+    if unmatched:
+        st.warning(f"⚠️ {len(unmatched)} produk belum memiliki biaya (dihitung Rp 0)")
+        with st.expander("📋 Lihat produk tanpa biaya"):
+            st.dataframe(pd.DataFrame({"Product Name": unmatched}), use_container_width=True, hide_index=True)
+
+    # Usulan padanan nama dari katalog biaya; produk yang sudah diberi biaya disembunyikan
+    suggestions = cache.artifacts("baru").get("cost_suggestions") if cache is not None else None
+    if suggestions is not None and not suggestions.empty:
+        suggestions = suggestions[~suggestions['Product Name'].isin(st.session_state.cost_data.keys())]
+    if suggestions is not None and not suggestions.empty:
+        with st.expander(f"🧩 {len(suggestions)} usulan biaya dari nama produk yang mirip", expanded=True):
+            if st.button("✅ Terima Semua Usulan", key="accept_all_suggestions"):
+                accepted = dict(zip(suggestions['Product Name'], suggestions['Suggested Cost'].astype(float)))
+                st.session_state.cost_data.update(accepted)
+                app.import_cost_data(accepted, skus=app.product_skus(st.session_state.pesanan_data))
+                st.success(f"✅ {len(suggestions)} biaya produk ditambahkan dari usulan")
+                st.rerun()
+            for i, row in enumerate(suggestions.itertuples(index=False)):
+                s_col1, s_col2 = st.columns([5, 1])
+                with s_col1:
+                    st.markdown(f"**{row[0]}**")
+                    st.caption(f"≈ {row[1]} · skor {row[2]:.2f} · Rp {row[3]:,.0f}")
+                with s_col2:
+                    if st.button("✅ Pakai", key=f"accept_suggestion_{i}"):
+                        st.session_state.cost_data[row[0]] = float(row[3])
+                        app.upsert_cost(row[0], row[3],
+                                        seller_sku=app.product_skus(st.session_state.pesanan_data).get(row[0]))
+                        st.success(f"✅ Biaya disimpan untuk {row[0]}")
+                        st.rerun()
+
+    # Sumber biaya tiap baris pesanan (SKU+variasi → SKU → nama produk)
+    cost_tiers = cache.artifacts("baru").get("cost_tiers") if cache is not None else None
+    if cost_tiers:
+        tier_labels = {
+            'sku_variation': "🏷️ SKU + Variasi",
+            'sku': "🔖 SKU",
+            'product_dated': "📅 Produk (riwayat)",
+            'product': "📦 Produk",
+            'missing': "❓ Tanpa biaya",
+        }
+        tier_cols = st.columns(len(tier_labels))
+        for col, (tier, label) in zip(tier_cols, tier_labels.items()):
+            hits = cost_tiers.get(tier, {'lines': 0, 'rate': 0.0})
+            col.metric(label, f"{hits['rate']:.1f}%", f"{hits['lines']:,} baris", delta_color="off")
+
     st.markdown("---")
     
     # Form manajemen biaya
@@ -415,7 +505,8 @@ def show_cost_management_tab():
             if st.button("💾 Simpan Biaya", type="primary"):
                 if selected_product and cost_input >= 0:
                     st.session_state.cost_data[selected_product] = cost_input
-                    app.save_cost_data(st.session_state.cost_data)
+                    app.upsert_cost(selected_product, cost_input,
+                                    seller_sku=app.product_skus(st.session_state.pesanan_data).get(selected_product))
                     st.success(f"✅ Biaya disimpan untuk {selected_product}")
                     st.rerun()
                 else:
@@ -425,7 +516,7 @@ def show_cost_management_tab():
             if st.button("🗑️ Hapus Biaya", type="secondary"):
                 if selected_product in st.session_state.cost_data:
                     del st.session_state.cost_data[selected_product]
-                    app.save_cost_data(st.session_state.cost_data)
+                    app.delete_costs([selected_product])
                     st.success(f"✅ Biaya dihapus untuk {selected_product}")
                     st.rerun()
                 else:
@@ -870,15 +961,13 @@ def show_detail_data_tab():
     # =================================================================
     st.subheader("💰 Ringkasan Keuangan")
     
-    income = st.session_state.income_data
-    if income is not None and not income.empty:
-        # Gunakan data income langsung (yang lebih akurat)
-        # Filter income yang tidak refund
-        clean_income = income[income['Customer refund'] >= 0]
-        
-        penghasilan_kotor = clean_income['Total revenue'].sum()
-        penghasilan_bersih = clean_income['Total settlement amount'].sum()
-        total_fees = clean_income['Total fees'].sum()
+    metrics = current_metrics()
+    income_metrics = metrics['income'] if metrics is not None else None
+    if income_metrics is not None and st.session_state.income_data is not None and not st.session_state.income_data.empty:
+        # Gunakan data income langsung (yang lebih akurat), hanya baris yang tidak refund
+        penghasilan_kotor = income_metrics['gross_revenue']
+        penghasilan_bersih = income_metrics['net_revenue']
+        total_fees = income_metrics['net_fees']
         
         col1, col2, col3 = st.columns(3)
         
@@ -984,28 +1073,23 @@ def show_detail_data_tab():
     # =================================================================
     # 4. REFUND & AFFILIATE ANALYSIS
     # =================================================================
-    if st.session_state.income_data is not None:
-        income = st.session_state.income_data
-
+    if income_metrics is not None:
         # Refund Analysis
         st.subheader("💸 Analisis Refund")
         
-        refund_df = income[income['Customer refund'] < 0]
-        refunded_ids = set(refund_df['Order/adjustment ID'].unique())
-        total_refund = refund_df['Customer refund'].sum()
+        refund_df = income_metrics['refunds']
 
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("🔄 Total Order Refund", refund_df['Order/adjustment ID'].nunique())
+            st.metric("🔄 Total Order Refund", income_metrics['refund_orders'])
         with col2:
-            st.metric("💸 Total Nilai Refund", f"Rp {abs(total_refund):,.0f}")
+            st.metric("💸 Total Nilai Refund", f"Rp {income_metrics['refund_value']:,.0f}")
         with col3:
-            refund_rate = (len(refunded_ids) / income['Order/adjustment ID'].nunique() * 100) if len(income) > 0 else 0
-            st.metric("📊 Tingkat Refund", f"{refund_rate:.2f}%")
+            st.metric("📊 Tingkat Refund", f"{income_metrics['refund_rate']:.2f}%")
 
         if not refund_df.empty:
             with st.expander("📋 Detail Order yang Di-refund"):
-                refund_display = refund_df[['Order/adjustment ID', 'Customer refund']].drop_duplicates()
+                refund_display = refund_df.drop_duplicates()
                 refund_display['Customer refund'] = refund_display['Customer refund'].apply(lambda x: f"Rp {abs(x):,.0f}")
                 refund_display = refund_display.sort_values('Order/adjustment ID')
                 st.dataframe(refund_display, use_container_width=True, hide_index=True)
@@ -1015,49 +1099,37 @@ def show_detail_data_tab():
         # Affiliate vs Store Analysis
         st.subheader("🤝 Analisis Affiliate vs Toko")
         
-        base = income[~income['Order/adjustment ID'].isin(refunded_ids)].copy()
-        aff = base[base['Affiliate commission'] < 0]
-        tok = base[base['Affiliate commission'] == 0]
-
-        def calc_metrics(df):
-            rev = df['Total settlement amount'].sum()
-            fees = df['Total fees'].sum()
-            pct = (fees / rev * 100) if rev > 0 else 0
-            return len(df), fees, pct, rev
-
-        aff_cnt, aff_fee, aff_pct, aff_rev = calc_metrics(aff)
-        tok_cnt, tok_fee, tok_pct, tok_rev = calc_metrics(tok)
+        aff = income_metrics['affiliate']
+        tok = income_metrics['store']
 
         # Create comparison tables
         col1, col2 = st.columns(2)
         
         with col1:
             st.markdown("**🤝 Order via Affiliate**")
-            st.metric("Jumlah Order", f"{aff_cnt} pesanan")
-            st.metric("Total Revenue", f"Rp {aff_rev:,.0f}")
-            st.metric("Total Fee (TikTok + Affiliate)", f"Rp {aff_fee:,.0f}")
-            st.metric("Rata-rata Fee", f"{aff_pct:.2f}%")
+            st.metric("Jumlah Order", f"{aff['orders']} pesanan")
+            st.metric("Total Revenue", f"Rp {aff['revenue']:,.0f}")
+            st.metric("Total Fee (TikTok + Affiliate)", f"Rp {aff['fees']:,.0f}")
+            st.metric("Rata-rata Fee", f"{aff['fee_pct']:.2f}%")
 
         with col2:
             st.markdown("**🏪 Order Toko Langsung**")
-            st.metric("Jumlah Order", f"{tok_cnt} pesanan")
-            st.metric("Total Revenue", f"Rp {tok_rev:,.0f}")
-            st.metric("Total Fee (TikTok saja)", f"Rp {tok_fee:,.0f}")
-            st.metric("Rata-rata Fee", f"{tok_pct:.2f}%")
+            st.metric("Jumlah Order", f"{tok['orders']} pesanan")
+            st.metric("Total Revenue", f"Rp {tok['revenue']:,.0f}")
+            st.metric("Total Fee (TikTok saja)", f"Rp {tok['fees']:,.0f}")
+            st.metric("Rata-rata Fee", f"{tok['fee_pct']:.2f}%")
 
         st.divider()
 
         # Commission Breakdown
         st.subheader("💳 Breakdown Komisi & Fee")
         
-        all_cols = ['Dynamic Commission', 'Affiliate commission', 'TikTok Shop commission fee']
-        available = [c for c in all_cols if c in base.columns]
+        commissions = income_metrics['commissions']
 
-        if available:
-            cols = st.columns(len(available) + 1)
+        if commissions:
+            cols = st.columns(len(commissions) + 1)
             
-            for i, col in enumerate(available):
-                total = abs(base[col].sum())
+            for i, (col, total, _) in enumerate(commissions):
                 with cols[i]:
                     st.metric(
                         label=col.replace('commission', 'komisi').replace('fee', 'fee'),
@@ -1065,9 +1137,8 @@ def show_detail_data_tab():
                     )
             
             # Total fees
-            total_fee_all = base['Total fees'].sum()
             with cols[-1]:
-                st.metric("💰 Total Fee Keseluruhan", f"Rp {total_fee_all:,.0f}")
+                st.metric("💰 Total Fee Keseluruhan", f"Rp {income_metrics['total_fees']:,.0f}")
         else:
             st.info("ℹ️ Data breakdown komisi tidak tersedia")
 
@@ -1076,21 +1147,9 @@ def show_detail_data_tab():
         # Order Source Table
         st.subheader("📊 Detail Sumber Order & Fee")
         
-        cols_show = ['Order/adjustment ID', 'Total revenue', 'Total settlement amount', 'Total fees']
-        commission_cols = ['Dynamic Commission', 'Affiliate commission', 'TikTok Shop commission fee']
-        cols_show.extend([c for c in commission_cols if c in base.columns])
-
-        # Prepare display data
-        aff_display = aff[cols_show].copy() if not aff.empty else pd.DataFrame()
-        tok_display = tok[cols_show].copy() if not tok.empty else pd.DataFrame()
-        
-        if not aff_display.empty:
-            aff_display['Sumber'] = '🤝 Affiliate'
-        if not tok_display.empty:
-            tok_display['Sumber'] = '🏪 Toko'
-
-        if not aff_display.empty or not tok_display.empty:
-            df_orders = pd.concat([aff_display, tok_display], ignore_index=True)
+        if income_metrics['orders'] is not None:
+            df_orders = income_metrics['orders'].copy()
+            df_orders['Sumber'] = df_orders['Sumber'].map({'Affiliate': '🤝 Affiliate', 'Toko': '🏪 Toko'})
             
             # Format currency columns
             currency_cols = [c for c in df_orders.columns if c in ['Total settlement amount', 'Total fees', 'Total revenue', 'Dynamic Commission', 'Affiliate commission', 'TikTok Shop commission fee']]
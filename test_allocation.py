@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+from allocation import allocate_order_lines, LINE_SHARE_COLUMN
+from data_processor import IncomeApp
+
+
+def test_order_values_split_by_line_subtotal():
+    merged = pd.DataFrame({
+        'row': [0, 0, 0, 1, 1],
+        'SKU Subtotal After Discount': [100.0, 300.0, 0.0, 0.0, 0.0],
+        'Total settlement amount': [80.0, 80.0, 80.0, 50.0, 50.0],
+        'Total fees': [-8.0, -8.0, -8.0, -4.0, -4.0],
+    })
+    allocated = allocate_order_lines(merged, 'row')
+
+    np.testing.assert_allclose(allocated['Line settlement amount'], [20.0, 60.0, 0.0, 25.0, 25.0])
+    # Order tanpa subtotal dibagi rata per baris
+    np.testing.assert_allclose(allocated[LINE_SHARE_COLUMN], [0.25, 0.75, 0.0, 0.5, 0.5])
+    totals = allocated.groupby('row')[['Line settlement amount', 'Line fees']].sum()
+    np.testing.assert_allclose(totals['Line settlement amount'], [80.0, 50.0])
+    np.testing.assert_allclose(totals['Line fees'], [-8.0, -4.0])
+
+
+def test_allocated_revenue_reconciles_to_income(synthetic_exports):
+    pesanan, income, costs = synthetic_exports(n_lines=3000, seed=1)
+    app = IncomeApp(cost_data=costs)
+    merged, _ = app.process_data(pesanan, income, costs)
+
+    metrics = app.last_artifacts['trace'].metrics
+    # Setiap order punya beberapa baris pesanan, jumlah hasil alokasi tetap sama dengan income
+    assert merged['Order/adjustment ID'].duplicated().any()
+    assert merged['Line settlement amount'].sum() == pytest.approx(metrics['income_revenue'], rel=1e-9)
+    assert metrics['revenue_difference'] == pytest.approx(0.0, abs=1e-6)
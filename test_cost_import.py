@@ -0,0 +1,39 @@
+import io
+import pandas as pd
+import pytest
+from cost_import import read_cost_import, validate_cost_import, accepted_costs, summarize_import
+
+
+def test_invalid_rows_are_rejected_with_reasons():
+    csv = io.StringIO(
+        "product_name,cost_per_unit\n"
+        "A,10\n"
+        "B,abc\n"
+        ",5\n"
+        "C,-1\n"
+        "D,7\n"
+        "D,8\n"
+        "E,3\n"
+    )
+    frame = read_cost_import(csv, file_name='costs.csv')
+    report = validate_cost_import(frame, {'A': 10.0, 'E': 2.0}, known_products=['A', 'D'])
+
+    rejected = report[report['Status'] == 'ditolak'].set_index('Row')['Issue'].to_dict()
+    assert rejected == {
+        3: 'biaya bukan angka',
+        4: 'nama produk kosong',
+        5: 'biaya negatif',
+        6: 'duplikat (dipakai baris terakhir)',
+    }
+    assert list(report.loc[report['Status'] != 'ditolak', 'Status']) == ['sama', 'baru', 'berubah']
+    assert accepted_costs(report) == {'D': 8.0, 'E': 3.0}
+    assert accepted_costs(report, only_known=True) == {'D': 8.0}
+    summary = summarize_import(report)
+    assert summary['ditolak'] == 4 and summary['tidak ada di pesanan'] == 1
+
+
+def test_import_without_required_columns_is_refused():
+    frame = pd.DataFrame({'name': ['A'], 'price': [1]})
+    buffer = io.StringIO(frame.to_csv(index=False))
+    with pytest.raises(ValueError, match='Product Name, Cost per Unit'):
+        read_cost_import(buffer, file_name='costs.csv')
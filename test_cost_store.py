@@ -0,0 +1,24 @@
+import pytest
+from cost_store import CostStore, SQLiteCostStore
+
+
+def test_cost_store_is_abstract():
+    with pytest.raises(TypeError):
+        CostStore()
+
+
+def test_sqlite_upsert_and_delete_touch_only_their_rows(tmp_path):
+    store = SQLiteCostStore(str(tmp_path / "costs.db"))
+    store.bulk_upsert([('A', 10.0, 'SKU-A'), ('B', 20.0, None)])
+
+    statements = []
+    store._conn.set_trace_callback(statements.append)
+    store.upsert('B', 25.0, seller_sku='SKU-B')
+    store.delete(['A'])
+    store._conn.set_trace_callback(None)
+
+    # Tidak ada pembacaan seluruh tabel untuk edit satu baris
+    assert not any(sql.lstrip().upper().startswith('SELECT') for sql in statements)
+    assert store.load() == {'B': 25.0}
+    row = store._conn.execute("SELECT seller_sku FROM product_costs WHERE product_name = 'B'").fetchone()
+    assert row == ('SKU-B',)
@@ -0,0 +1,134 @@
+import threading
+import time
+from cost_store import InMemoryWorksheet, GoogleSheetsCostStore, COST_HEADER
+from cost_sync import SheetSync
+
+
+class RecordingWorksheet(InMemoryWorksheet):
+    """InMemoryWorksheet yang juga mencatat argumen delete_rows"""
+
+    def __init__(self, rows=None):
+        super().__init__(rows)
+        self.deleted = []
+
+    def delete_rows(self, start_index, end_index=None):
+        self.deleted.append((start_index, end_index))
+        super().delete_rows(start_index, end_index)
+
+
+class FlakyWorksheet(InMemoryWorksheet):
+    """batch_update gagal sebanyak `failures` kali pertama"""
+
+    def __init__(self, rows=None, failures=1):
+        super().__init__(rows)
+        self.failures = failures
+
+    def batch_update(self, data):
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("quota exceeded")
+        super().batch_update(data)
+
+
+class BlockingReadWorksheet(InMemoryWorksheet):
+    """get_all_values menunggu `gate` jika `blocking` aktif"""
+
+    def __init__(self, rows=None):
+        super().__init__(rows)
+        self.blocking = False
+        self.reading = threading.Event()
+        self.gate = threading.Event()
+
+    def get_all_values(self):
+        if self.blocking:
+            self.reading.set()
+            self.gate.wait(5)
+        return super().get_all_values()
+
+
+def _rows(costs):
+    return [list(COST_HEADER)] + [[name, cost] for name, cost in costs.items()]
+
+
+def _reload(sheet):
+    return GoogleSheetsCostStore(lambda: sheet, backend="memory", use_cache=False).refresh()
+
+
+def test_flush_sends_one_batch_update_bottom_up_deletes_and_one_append():
+    initial = {'A': 10.0, 'B': 20.0, 'C': 30.0, 'D': 40.0, 'E': 50.0}
+    sheet = RecordingWorksheet(_rows(initial))
+    sync = SheetSync(lambda: sheet, COST_HEADER, window_seconds=60)
+
+    target = {'A': 11.0, 'C': 30.0, 'E': 55.0, 'F': 60.0, 'G': 70.0}
+    assert sync.stage(target) == 6  # A, E berubah; B, D dihapus; F, G baru
+    del sheet.calls[:]
+
+    assert sync.flush()
+    assert sheet.calls == ['batch_update', 'delete_rows', 'delete_rows', 'append_rows']
+    # Baris 5 (D) dihapus sebelum baris 3 (B) supaya nomor baris tetap valid
+    assert sheet.deleted == [(5, 5), (3, 3)]
+    assert sync.pending == 0
+    assert _reload(sheet) == target
+
+
+def test_failed_flush_keeps_edits_and_retries_with_backoff():
+    sheet = FlakyWorksheet(_rows({'A': 10.0}), failures=1)
+    sync = SheetSync(lambda: sheet, COST_HEADER, window_seconds=60, retry_seconds=0.05)
+
+    sync.stage({'A': 12.0})
+    assert not sync.flush()
+    assert sync.pending == 1
+    assert sync.last_sync['error'] == "quota exceeded"
+
+    # Timer percobaan ulang mengirim edit tanpa edit baru dari pengguna
+    deadline = time.monotonic() + 5
+    while sync.pending and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert sync.pending == 0
+    assert sync.last_sync['error'] is None
+    assert _reload(sheet) == {'A': 12.0}
+
+
+def test_edits_staged_while_offline_are_sent_after_reconnect():
+    sheet = InMemoryWorksheet(_rows({'A': 10.0}))
+    online = {'up': False}
+
+    def connect():
+        if not online['up']:
+            raise ConnectionError("offline")
+        return sheet
+
+    store = GoogleSheetsCostStore(connect, backend="memory", use_cache=False, retry_seconds=0.05)
+    store.save({'A': 10.0, 'B': 5.0})
+    assert store.pending == 2
+    assert store.last_sync['error'] == "Worksheet tidak tersedia"
+
+    online['up'] = True
+    deadline = time.monotonic() + 5
+    while store.pending and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert store.pending == 0
+    assert _reload(sheet) == {'A': 10.0, 'B': 5.0}
+
+
+def test_refresh_started_before_save_does_not_overwrite_the_edit():
+    sheet = BlockingReadWorksheet(_rows({'A': 10.0}))
+    store = GoogleSheetsCostStore(lambda: sheet, backend="memory", use_cache=False, sync_window_seconds=60)
+    assert store.refresh() == {'A': 10.0}
+
+    sheet.blocking = True
+    refresh = threading.Thread(target=store.refresh)
+    refresh.start()
+    assert sheet.reading.wait(5)
+    save = threading.Thread(target=store.save, args=({'A': 10.0, 'B': 5.0},))
+    save.start()
+    deadline = time.monotonic() + 5
+    while store._generation == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    sheet.gate.set()
+    refresh.join(5)
+    save.join(5)
+
+    assert store.load() == {'A': 10.0, 'B': 5.0}
+    assert store.flush()
+    assert _reload(sheet) == {'A': 10.0, 'B': 5.0}
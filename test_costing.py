@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from costing import asof_costs, build_cost_history, build_cost_table, build_variant_cost_table, resolve_line_costs
+
+
+def test_blank_variation_matching_sku_record_counts_as_sku_tier():
+    variant_table = build_variant_cost_table([
+        {'seller_sku': 'S1', 'variation': 'Merah', 'cost_per_unit': 12.0},
+        {'seller_sku': 'S1', 'variation': '', 'cost_per_unit': 10.0},
+    ])
+    unit_costs, tiers = resolve_line_costs(
+        pd.Series(['P', 'P', 'P', 'P']),
+        build_cost_table({'P': 5.0}),
+        skus=pd.Series(['S1', 'S1', 'S1', 'S2']),
+        variations=pd.Series(['Merah', '', None, 'Biru']),
+        variant_table=variant_table,
+    )
+    np.testing.assert_array_equal(unit_costs, [12.0, 10.0, 10.0, 5.0])
+    assert list(tiers) == ['sku_variation', 'sku', 'sku', 'product']
+
+
+def test_asof_costs_use_latest_record_on_or_before_order_date():
+    history = build_cost_history([
+        {'product_name': 'P', 'cost_per_unit': 10.0, 'valid_from': '2024-01-01'},
+        {'product_name': 'P', 'cost_per_unit': 12.0, 'valid_from': '2024-03-01'},
+        {'product_name': 'Q', 'cost_per_unit': 7.0, 'valid_from': '2024-02-01'},
+    ])
+    costs = asof_costs(
+        pd.Series(['P', 'P', 'P', 'Q', 'P']),
+        pd.Series(['2024-02-15', '2024-03-01', '2024-05-01', '2024-01-15', '2023-12-31']),
+        history,
+    )
+    # Q dan P sebelum record pertama belum punya biaya yang berlaku
+    np.testing.assert_array_equal(costs, [10.0, 12.0, 12.0, np.nan, np.nan])
+
+
+def test_lines_without_dated_cost_fall_back_to_current_cost():
+    history = build_cost_history([
+        {'product_name': 'P', 'cost_per_unit': 10.0, 'valid_from': '2024-01-01'},
+    ])
+    unit_costs, tiers = resolve_line_costs(
+        pd.Series(['P', 'P', 'R', 'Z']),
+        build_cost_table({'P': 15.0, 'R': 3.0}),
+        dates=pd.Series(['2024-06-01', '2023-06-01', '2024-06-01', '2024-06-01']),
+        history=history,
+    )
+    np.testing.assert_array_equal(unit_costs, [10.0, 15.0, 3.0, np.nan])
+    assert list(tiers) == ['product_dated', 'product', 'product', 'missing']
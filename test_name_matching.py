@@ -0,0 +1,34 @@
+from name_matching import NameMatcher, MIN_SCORE, suggest_costs
+
+
+def test_suffixed_name_matches_and_unrelated_name_is_rejected():
+    matcher = NameMatcher(['CÉLIA by DESMARÉ', 'Kaos Polos Hitam', 'Topi Baseball'])
+
+    assert matcher.match('celia  by desmare') == [('CÉLIA by DESMARÉ', 1.0)]
+    [(name, score)] = matcher.match('CÉLIA by DESMARÉ - 50ml')
+    assert name == 'CÉLIA by DESMARÉ' and MIN_SCORE <= score < 1.0
+    assert matcher.match('Sepatu Lari') == []
+
+
+def test_min_score_filters_weaker_candidates():
+    matcher = NameMatcher(['Kaos Polos Hitam', 'Kaos Polos Putih'])
+    candidates = matcher.match('Kaos Polos Hitam XL', min_score=0.0)
+    assert [name for name, _ in candidates] == ['Kaos Polos Hitam', 'Kaos Polos Putih']
+
+    weak = candidates[1][1]
+    threshold = (candidates[0][1] + weak) / 2
+    assert matcher.match('Kaos Polos Hitam XL', min_score=threshold) == candidates[:1]
+    assert suggest_costs(['Kaos Polos Hitam XL'], {'Kaos Polos Putih': 5.0}, min_score=threshold).empty
+
+
+def test_ties_keep_catalogue_order():
+    for names in (['Kaos Merah A', 'Kaos Merah B'], ['Kaos Merah B', 'Kaos Merah A']):
+        candidates = NameMatcher(names).match('Kaos Merah')
+        assert [name for name, _ in candidates] == names
+        assert candidates[0][1] == candidates[1][1]
+
+    # Nama yang sama setelah normalisasi: record pertama di katalog yang dipakai
+    matcher = NameMatcher(['Kaos Merah', 'KAOS merah', 'Kaos Biru'])
+    assert matcher.match('kaos-merah') == [('Kaos Merah', 1.0)]
+    suggestions = matcher.suggest(['kaos merah!'], {'Kaos Merah': 10.0, 'KAOS merah': 12.0})
+    assert suggestions[['Suggested Match', 'Suggested Cost']].values.tolist() == [['Kaos Merah', 10.0]]
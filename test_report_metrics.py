@@ -0,0 +1,25 @@
+import io
+import pandas as pd
+from data_processor import IncomeApp
+
+
+def _processed(synthetic_exports):
+    pesanan, income, costs = synthetic_exports()
+    app = IncomeApp(cost_data=costs)
+    merged, summary = app.process_data(pesanan, income, costs)
+    return app, merged, summary, costs
+
+
+def test_sku_total_orders_counts_distinct_orders(synthetic_exports):
+    app, merged, summary, costs = _processed(synthetic_exports)
+
+    # Definisi awal: Order/adjustment ID unik per Seller SKU
+    baseline = merged.groupby('Seller SKU', observed=True)['Order/adjustment ID'].nunique()
+    baseline.index = baseline.index.astype(str)
+
+    report = app.create_excel_report(merged, summary, costs, metrics=app.last_artifacts['metrics'])
+    sheet = pd.read_excel(io.BytesIO(report.read()), sheet_name='Ringkasan per SKU')
+    reported = sheet.set_index(sheet['Seller SKU'].astype(str))['Total Orders']
+
+    assert set(reported.index) == set(baseline.index)
+    assert (reported == baseline.reindex(reported.index)).all()
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from config import CUSTOM_CSS
+from ingestion import load_pesanan, load_income, describe_load
 
 def show_header():
     """Menampilkan header aplikasi"""
@@ -59,12 +60,12 @@ def show_data_upload_section():
             if file is not None:
                 try:
                     if "pesanan" in key:
-                        df = pd.read_excel(file, header=0, skiprows=[1])
+                        df = load_pesanan(file)
                     else:
-                        df = pd.read_excel(file, header=0)
-                    df.columns = [str(c).strip() for c in df.columns]
+                        df = load_income(file)
                     st.session_state[key] = df
                     st.success(f"✅ {key.replace('_',' ').title()} : {len(df)} baris")
+                    st.caption(describe_load(df))
                 except Exception as e:
                     st.error(f"❌ {key}: {e}")
 
@@ -81,10 +82,10 @@ def show_data_upload_section():
             )
             if pesanan_file:
                 try:
-                    df = pd.read_excel(pesanan_file, header=0, skiprows=[1])
-                    df.columns = [str(c).strip() for c in df.columns]
+                    df = load_pesanan(pesanan_file)
                     st.session_state.pesanan_data = df
                     st.markdown(f'<div class="status-success">✅ Pesanan dimuat: {len(df):,} baris</div>', unsafe_allow_html=True)
+                    st.caption(describe_load(df))
                     with st.expander("📋 Pratinjau"):
                         st.dataframe(df.head(), use_container_width=True)
                 except Exception as e:
@@ -102,10 +103,10 @@ def show_data_upload_section():
             )
             if income_file:
                 try:
-                    df = pd.read_excel(income_file, header=0)
-                    df.columns = [str(c).strip() for c in df.columns]
+                    df = load_income(income_file)
                     st.session_state.income_data = df
                     st.markdown(f'<div class="status-success">✅ Pendapatan dimuat: {len(df):,} baris</div>', unsafe_allow_html=True)
+                    st.caption(describe_load(df))
                     with st.expander("📋 Pratinjau"):
                         st.dataframe(df.head(), use_container_width=True)
                 except Exception as e: